@@ -6,7 +6,11 @@
 import os
 import re
 import glob
+import operator
+import time
 import traceback
+from functools import lru_cache
+from typing import Callable
 from logger import Logger
 from dataclasses import dataclass
 from bnip.lexer import BNipSections
@@ -15,12 +19,12 @@ from bnip.transpile import (
     prepare_bnip_expression,
     transpile_bnip_expression,
     get_section_from_tokens,
+    compile_transpiled,
     BNIPExpression,
     bnip_expressions,
-    load_bnip_expression,
+    generate_expression_object,
 )
 
-# ! The below imports are necessary, they are used within the eval statements. Your text editor probably is not showing them as not in use.
 from bnip.NTIPAliasQuality import NTIPAliasQuality
 from bnip.NTIPAliasClass import NTIPAliasClass
 from bnip.NTIPAliasClassID import NTIPAliasClassID
@@ -28,6 +32,20 @@ from bnip.NTIPAliasFlag import NTIPAliasFlag
 from bnip.NTIPAliasStat import NTIPAliasStat
 from bnip.NTIPAliasType import NTIPAliasType
 from bnip.utils import find_unique_or_set_base
+from bnip.rule_index import RuleIndex
+from bnip.ruleset import (
+    CompiledRuleset,
+    RulePlan,
+    NO_CONDITION,
+    RULESET_CACHE_DIR,
+    generate_ruleset_source,
+    load_ruleset_module,
+    ruleset_key,
+    ruleset_path,
+    write_ruleset_module,
+)
+from bnip.rule_cache import load_rule_file, remove_unused_rule_files, rule_file_key, save_rule_file
+from config import Config
 
 
 
@@ -41,11 +59,39 @@ def should_keep(item_data) -> tuple[bool, str]:
             str: The raw expression to use for the keep condition.
 
     """
-    for expression in bnip_expressions:
-        if eval(expression.transpiled):
+    if (ruleset := _current_ruleset()) is not None:
+        return ruleset.keep(item_data)
+    for expression in _get_rule_index().candidates(item_data):
+        if expression.keep_fn(item_data):
             return True, expression.raw
     return False, ""
 
+_rule_index: RuleIndex | None = None
+
+def _get_rule_index() -> RuleIndex:
+    # * Rebuilt whenever bnip_expressions is replaced or expressions are added, e.g. when tests patch the expressions
+    global _rule_index
+    if _rule_index is None or not _rule_index.is_current(bnip_expressions):
+        _rule_index = RuleIndex(bnip_expressions)
+    return _rule_index
+
+_ruleset: CompiledRuleset | None = None
+
+def _current_ruleset() -> CompiledRuleset | None:
+    # * The compiled ruleset is only used as long as bnip_expressions is the list it was compiled from
+    if _ruleset is not None and _ruleset.is_current(bnip_expressions):
+        return _ruleset
+    return None
+
+_COMPARISON_OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    "<": operator.lt,
+    ">=": operator.ge,
+    "<=": operator.le,
+}
+
 def _gold_pickup(item_data: dict, expression: BNIPExpression) -> bool | None:
     res = None
     for i, token in enumerate(expression.tokens):
@@ -57,24 +103,54 @@ def _gold_pickup(item_data: dict, expression: BNIPExpression) -> bool | None:
         ):
             try:
                 read_gold = int(item_data["Amount"])
-                operator = expression.tokens[i + 1].value
+                compare = _COMPARISON_OPERATORS[expression.tokens[i + 1].value]
                 desired_gold = int(expression.tokens[i + 2].value)
-                res = eval(f"{read_gold} {operator} {desired_gold}")
+                res = compare(read_gold, desired_gold)
             except Exception as e:
                 Logger.warning(f"Error evaluating gold pickup condition: {e}")
             break
     return res
 
 
-def _handle_pick_eth_sockets(item_data: dict, expression: BNIPExpression) -> tuple[bool, str]:
-    """Handles the pick condition for eth and sockets.
+def _gold_condition(expression: BNIPExpression) -> str | None:
+    # * The comparison _gold_pickup() does with the gold amount, e.g. ">= 500", for the compiled ruleset
+    if "[gold]" not in expression.raw.lower():
+        return None
+    for i, token in enumerate(expression.tokens):
+        if token.type == TokenType.KeywordNTIPAliasStat and token.value == str(NTIPAliasStat["gold"]):
+            try:
+                if expression.tokens[i + 1].value in _COMPARISON_OPERATORS:
+                    return f"{expression.tokens[i + 1].value} {int(expression.tokens[i + 2].value)}"
+            except Exception:
+                pass
+            return None
+    return None
+
+
+@lru_cache(maxsize=None)
+def _pickup_without_ethereal_transpiled(raw: str) -> str | None:
+    # * The pickup condition of raw without its ethereal flag check
+    raw = raw.replace("&& [flag]", "[flag]").replace("|| [flag]", "[flag]")
+    raw = re.sub(r"\[flag\] (==|!=)\sethereal", "", raw)
+    # print(f"Modified raw expression: {raw}")
+    return transpile_bnip_expression(raw.split("#")[0], isPickUpPhase=True)
+
+
+@lru_cache(maxsize=None)
+def _pickup_without_ethereal(raw: str) -> Callable[[dict], bool] | None:
+    # * Compiled once per expression
+    return compile_transpiled(_pickup_without_ethereal_transpiled(raw))
+
+
+def _eth_sockets(expression: BNIPExpression) -> tuple[int, int, bool]:
+    """Finds out whether the expression asks for ethereal and socketed items.
         Args:
-            item_data (dict): The item data.
             expression (BNIPExpression): The expression to use.
         Returns:
-            tuple[bool, str]: A tuple containing the following:
-                bool: Whether or not to keep the item.
-                BNIPExpression: The expression object that was used to evaluate the condition.
+            tuple[int, int, bool]: A tuple containing the following:
+                int: -1 = not ethereal, 0 = not set, 1 = ethereal.
+                int: -1 = no sockets, 0 = not set, 1 = sockets.
+                bool: Whether or not the expression mentions ethereal.
         """
     expression_raw = prepare_bnip_expression(expression.raw)
     all_tokens = expression.tokens
@@ -103,8 +179,10 @@ def _handle_pick_eth_sockets(item_data: dict, expression: BNIPExpression) -> tup
                 else:
                     soc = -1
                 break
+    return eth, soc, eth_keyword_present
 
 
+def _ignore_pickup(color: str, eth: int, soc: int) -> bool:
     # pickup table:
     # * w = white, g = gray
     #         -1 eth  0 eth   1 eth
@@ -113,22 +191,33 @@ def _handle_pick_eth_sockets(item_data: dict, expression: BNIPExpression) -> tup
     #  1 soc    g       g       g
 
     ignore = 0
-    if item_data["Color"] == "white":
+    if color == "white":
         ignore = eth == 1 or soc == 1
-    elif item_data["Color"] == "gray":
+    elif color == "gray":
         ignore = eth == soc == -1
+    return ignore
+
 
-    pick_eval_expr = expression.should_pickup
+def _handle_pick_eth_sockets(item_data: dict, expression: BNIPExpression) -> tuple[bool, Callable[[dict], bool]]:
+    """Handles the pick condition for eth and sockets.
+        Args:
+            item_data (dict): The item data.
+            expression (BNIPExpression): The expression to use.
+        Returns:
+            tuple[bool, Callable]: A tuple containing the following:
+                bool: Whether or not to ignore the item.
+                Callable: The compiled pickup condition to evaluate for the item.
+        """
+    eth, soc, eth_keyword_present = _eth_sockets(expression)
+    ignore = _ignore_pickup(item_data["Color"], eth, soc)
+
+    pick_eval_fn = expression.should_pickup_fn
     # print(f"color: {item_data['Color']}, eth: {eth}, soc: {soc}, ignore: {ignore}")
     if not ignore and eth_keyword_present:
         # remove ethereal from expression
-        raw = expression.raw.replace("&& [flag]", "[flag]").replace("|| [flag]", "[flag]")
-        raw = re.sub(r"\[flag\] (==|!=)\sethereal", "", raw)
-        # print(f"Modified raw expression: {raw}")
-        pick_eval_expr = transpile_bnip_expression(raw.split("#")[0], isPickUpPhase=True)
-        # print(f"Modified transpiled expression: {pick_eval_expr}")
+        pick_eval_fn = _pickup_without_ethereal(expression.raw)
 
-    return ignore, pick_eval_expr
+    return ignore, pick_eval_fn
 
 
 def should_pickup(item_data) -> tuple[bool, str]:
@@ -140,8 +229,9 @@ def should_pickup(item_data) -> tuple[bool, str]:
             bool: Whether or not to keep the item.
             str: The raw expression to use for the keep condition.
     """
+    if (ruleset := _current_ruleset()) is not None:
+        return ruleset.pickup(item_data)
 
-    pick_eval_expr = ""
     item_is_gold = item_data["BaseItem"]["DisplayName"] == "Gold"
 
     for expression in bnip_expressions:
@@ -151,13 +241,13 @@ def should_pickup(item_data) -> tuple[bool, str]:
                 if (res := _gold_pickup(item_data, expression)) is not None:
                     return res, expression.raw
             # check eth / sockets
-            pick_eval_expr = expression.should_pickup
+            pick_eval_fn = expression.should_pickup_fn
             if any(substring == item_data["Color"] for substring in ["white", "gray"]):
-                ignore, pick_eval_expr = _handle_pick_eth_sockets(item_data, expression)
+                ignore, pick_eval_fn = _handle_pick_eth_sockets(item_data, expression)
                 if ignore:
                     continue
 
-            property_condition = eval(pick_eval_expr) # * This string in the eval uses the item_data that is being passed in
+            property_condition = pick_eval_fn(item_data)
             if property_condition:
                 return True, expression.raw
 
@@ -181,37 +271,62 @@ def should_id(item_data) -> bool:
             [name] == ring && [quality] == rare -> True
             [name] == ring && [quality] == rare # [strength] == 5 -> Falsep
     """
+    if (ruleset := _current_ruleset()) is not None:
+        return ruleset.id(item_data)
     for expression in bnip_expressions:
         if expression and expression.should_id_transpiled:
             split_expression = expression.raw.split("#")
             if "[idname]" in expression.raw.lower():
                 return True
             if len(split_expression) == 1:
-                if eval(expression.should_id_transpiled):
+                if expression.should_id_fn(item_data):
                     return False
     return True
 
-def _load_bnip_expressions(filepath):
+# * (rule file, line number, error) of the lines that failed to load, stored in the compiled ruleset to print them again
+rule_file_errors: list[tuple[str, int, str]] = []
+
+def _load_bnip_expressions(filepath, cache_dir: str | None = None) -> tuple[str | None, bool]:
     """
-        Loads the BNIP expressions from the file.
+        Loads the BNIP expressions from the file, the errors of its lines are printed and added to rule_file_errors.
         Args:
             filepath (str): The path to the file.
+            cache_dir (str | None): Directory of the cached expressions of the rule files, None to always parse the file.
         Returns:
-            None
+            tuple[str | None, bool]: The cache key of the file and whether its expressions were loaded from the cache.
     """
-    with open(filepath, "r", encoding="utf-8") as f:
-        for i, line in enumerate(f):
-            line = line.strip()
-            if line == "" or line.startswith("//"): # Empty or comment line
-                continue
-            try:
-                load_bnip_expression(line)
-            except Exception as e:
-                filepath = filepath.replace("\\", "/")
-                file = filepath.split('/config/')[1]
-                print(f"{file}:{e}:line {i + 1}") # TODO look at these errors
-                if False and traceback.print_exc(): # * Switch between True and False for debugging
-                    break
+    key = rule_file_key(filepath) if cache_dir else None
+    cached = load_rule_file(cache_dir, key) if key else None
+    if cached is not None:
+        expressions, errors = cached
+        bnip_expressions.extend(expressions)
+    else:
+        expressions, errors = [], []
+        with open(filepath, "r", encoding="utf-8") as f:
+            for i, line in enumerate(f):
+                line = line.strip()
+                if line == "" or line.startswith("//"): # Empty or comment line
+                    continue
+                try:
+                    if (expression := generate_expression_object(line)) is not None:
+                        expressions.append(expression)
+                except Exception as e:
+                    errors.append((i + 1, str(e)))
+                    if False and traceback.print_exc(): # * Switch between True and False for debugging
+                        break
+        bnip_expressions.extend(expressions)
+        if key:
+            save_rule_file(cache_dir, key, expressions, errors)
+    file = filepath.replace("\\", "/").split('/config/')[-1]
+    errors = [(file, line_number, error) for line_number, error in errors]
+    rule_file_errors.extend(errors)
+    _print_rule_file_errors(errors)
+    return key, cached is not None
+
+
+def _print_rule_file_errors(errors: list[tuple[str, int, str]]):
+    for file, line_number, error in errors:
+        print(f"{file}:{error}:line {line_number}") # TODO look at these errors
 
 
 default_bnip_file_path = f"{os.getcwd()}/config/default.bnip"
@@ -233,20 +348,85 @@ if os.path.isfile(os.path.join(bnip_path, '.nipignore')):
                 if remove_file in bnip_file_paths:
                     bnip_file_paths.remove(remove_file)
 
-num_files = 0
-# load all nip expressions
-if len(bnip_file_paths) > 0:
-    num_files = len(bnip_file_paths)
-    for bnip_file_path in bnip_file_paths:
-        _load_bnip_expressions(bnip_file_path)
-# fallback to default nip file if no custom nip files specified or existing files are excluded
+def _rule_plan(expression: BNIPExpression) -> RulePlan:
+    """
+        Evaluates everything of the checks of should_keep(), should_pickup() and should_id() that does not depend on
+        the item, for the compiled ruleset.
+        Args:
+            expression (BNIPExpression): The expression to use.
+        Returns:
+            RulePlan: The conditions of the expression.
+    """
+    prop, stat = expression.transpiled, None
+    stat_tokens = get_section_from_tokens(expression.tokens)[BNipSections.STAT]
+    if stat_tokens and expression.should_id_transpiled and (stat_transpiled := transpile_bnip_expression(stat_tokens)):
+        if f"{expression.should_id_transpiled}and{stat_transpiled}" == expression.transpiled:
+            prop, stat = expression.should_id_transpiled, stat_transpiled
+
+    pickup_condition = expression.should_pickup or NO_CONDITION
+    eth, soc, eth_keyword_present = _eth_sockets(expression)
+    pickup = {"": pickup_condition}
+    for color in ["white", "gray"]:
+        if _ignore_pickup(color, eth, soc):
+            pickup[color] = None
+        elif eth_keyword_present:
+            pickup[color] = _pickup_without_ethereal_transpiled(expression.raw) or NO_CONDITION
+        else:
+            pickup[color] = pickup_condition
+
+    identify = bool(expression.should_id_transpiled) and "[idname]" in expression.raw.lower()
+    return RulePlan(
+        raw=expression.raw,
+        prop=prop,
+        stat=stat,
+        identify=identify,
+        id_condition=expression.should_id_transpiled if expression.should_id_transpiled and not identify and len(expression.raw.split("#")) == 1 else None,
+        gold=_gold_condition(expression),
+        pickup=pickup,
+    )
+
+
+load_start = time.perf_counter()
+rule_file_paths = bnip_file_paths if len(bnip_file_paths) > 0 else [default_bnip_file_path]
+num_files = len(rule_file_paths)
+bnip_cache_path = os.path.join(bnip_path, RULESET_CACHE_DIR)
+
+# * With an unchanged compiled ruleset the rule files are not lexed and transpiled, bnip_expressions stays empty
+ruleset_module = None
+if compile_ruleset := Config().advanced_options["bnip_compile_ruleset"]:
+    ruleset_file = ruleset_path(bnip_cache_path, ruleset_key(rule_file_paths))
+    ruleset_module = load_ruleset_module(ruleset_file)
+
+if ruleset_module is not None:
+    Logger.info(f"Loaded compiled ruleset of {num_files} nip files with {len(ruleset_module.RAW)} total expressions.")
+    _print_rule_file_errors(ruleset_module.ERRORS)
 else:
-    num_files = 1
-    _load_bnip_expressions(default_bnip_file_path)
-    Logger.warning("No .bnip files in config/nip/, fallback to default.bnip")
-Logger.info(f"Loaded {num_files} nip files with {len(bnip_expressions)} total expressions.")
+    # load all nip expressions, rule files that did not change since the last start come from the cache
+    cache_keys = []
+    num_parsed = 0
+    for bnip_file_path in rule_file_paths:
+        key, from_cache = _load_bnip_expressions(bnip_file_path, bnip_cache_path)
+        cache_keys.append(key)
+        num_parsed += not from_cache
+    remove_unused_rule_files(bnip_cache_path, cache_keys)
+    # fallback to default nip file if no custom nip files specified or existing files are excluded
+    if len(bnip_file_paths) == 0:
+        Logger.warning("No .bnip files in config/nip/, fallback to default.bnip")
+    Logger.info(f"Loaded {num_files} nip files ({num_parsed} parsed, {num_files - num_parsed} cached) with {len(bnip_expressions)} total expressions.")
 
 bnip_expressions = sorted(bnip_expressions, key=lambda x: len(x.raw))
+_rule_index = RuleIndex(bnip_expressions)
+
+if compile_ruleset and ruleset_module is None:
+    try:
+        ruleset_source = generate_ruleset_source([_rule_plan(expression) for expression in bnip_expressions], rule_file_paths, rule_file_errors)
+    except Exception as e:
+        Logger.warning(f"Could not compile bnip ruleset, checking the expressions one by one: {e}")
+    else:
+        ruleset_module = write_ruleset_module(ruleset_file, ruleset_source)
+if ruleset_module is not None:
+    _ruleset = CompiledRuleset(ruleset_module, bnip_expressions)
+Logger.info(f"Loading the nip rules took {time.perf_counter() - load_start:.2f}s")
 
 if __name__ == "__main__":
     print(transpile_bnip_expression("[name] == ring && [quality] == rare # [strength] == 5"))
@@ -24,6 +24,64 @@ SYMBOLS = [">", "=> ", "<", "<=", "=", "!", "", "", ",", "&", "|", "#"]
 MATH_SYMBOLS = ["(", ")", "^", "*", "/", "\\", "+", "-"]
 CHARS = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_'"
 
+# * What the lexer reads starting at a character, "-" is a math operator after MINUS_OPERATOR_AFTER, otherwise the sign
+# * of a number
+CHAR_KINDS = {
+    **{char: "chars" for char in CHARS},
+    "[": "bracket",
+    **{char: "math" for char in MATH_SYMBOLS},
+    **{char: "symbol" for char in SYMBOLS if char},
+    **{char: "whitespace" for char in WHITESPACE},
+    **{char: "digits" for char in DIGITS},
+    "-": "minus",
+}
+# * All lexemes longer than one character in one pattern, the one found at a position has to match the kind of its
+# * first character
+MASTER_PATTERN = re.compile(
+    r"(?P<whitespace>[ \t\n\r\v\f]+)"
+    r"|(?P<decimal>-*[0-9]+\.[0-9]+)"
+    r"|(?P<shorthand_decimal>-*\.[0-9]+)"
+    r"|(?P<whole_number>-*[0-9]+)"
+    r"|(?P<logical>>=|<=|==|!=|&&|\|\||>|<|\#)"
+    r"|(?P<keyword>\[\w+\]|\[d+\])"
+    r"|(?P<word>\w+)"
+)
+# * Token type of each math operator
+MATH_OPERATORS = {
+    "+": TokenType.PLUS,
+    "-": TokenType.MINUS,
+    "*": TokenType.MULTIPLY,
+    "/": TokenType.DIVIDE,
+    "\\": TokenType.MODULO,
+    "^": TokenType.POW,
+    "(": TokenType.LPAREN,
+    ")": TokenType.RPAREN,
+}
+# * Token type and python operator of each logical operator
+LOGICAL_OPERATORS = {
+    ">": (TokenType.GT, ">"),
+    "<": (TokenType.LT, "<"),
+    ">=": (TokenType.GE, ">="),
+    "<=": (TokenType.LE, "<="),
+    "==": (TokenType.EQ, "=="),
+    "!=": (TokenType.NE, "!="),
+    "&&": (TokenType.AND, "and"),
+    "||": (TokenType.OR, "or"),
+    "#": (TokenType.SECTIONAND, "and"),
+}
+NUMBER_LEXEMES = {"decimal", "shorthand_decimal", "whole_number"}
+MINUS_OPERATOR_AFTER = {
+    TokenType.KeywordNTIPAliasClass,
+    TokenType.KeywordNTIPAliasFlag,
+    TokenType.KeywordNTIPAliasIDName,
+    TokenType.KeywordNTIPAliasMaxQuantity,
+    TokenType.KeywordNTIPAliasName,
+    TokenType.KeywordNTIPAliasQuality,
+    TokenType.KeywordNTIPAliasStat,
+    TokenType.KeywordNTIPAliasType,
+    TokenType.NUMBER,
+}
+
 class BNipSections(Enum):
     PROP = 1
     STAT = 2
@@ -33,7 +91,8 @@ class Lexer:
     def __init__(self):
         self.current_section: BNipSections = BNipSections.PROP
         self.current_token: str | None = ""
-        self.text_i: int = -1
+        self.text: str = ""
+        self.text_i: int = 0
         self.tokens: list[Token] = []
 
 
@@ -44,24 +103,6 @@ class Lexer:
             self.current_section = BNipSections.MAXQUANTITY
 
 
-    def _get_text(self):
-        return "".join(self.text)
-
-
-    def _get_current_iteration_of_text_raw(self):
-        """
-            Returns the self.text in a string type, and at its current iteration.
-        """
-        return self._get_text()[self.text_i:]
-
-    def _advance(self):
-        try:
-            self.text_i += 1
-            self.current_token = self.text[self.text_i]
-        except IndexError:
-            self.current_token = None
-
-
     def create_tokens(self, bnip_expression: str, starting_section: BNipSections = BNipSections.PROP):
         """Creates token from a bnip expression string
 
@@ -74,48 +115,43 @@ class Lexer:
                 BNipSyntaxError: If there is a syntax error in the bnip expression
         """
         self.current_section = starting_section
-        self.text = list(bnip_expression)
-        self._advance()
+        self.text = bnip_expression
+        self.text_i = 0
         self.tokens = []
-        while self.current_token != None:
-
-            if self.current_token == "-": # * Since - is a math symbol and a negative sign for numbers, we need to handle it differently.
-                NTIPAliasKeywords = [
-                    TokenType.KeywordNTIPAliasClass,
-                    TokenType.KeywordNTIPAliasFlag,
-                    TokenType.KeywordNTIPAliasIDName,
-                    TokenType.KeywordNTIPAliasMaxQuantity,
-                    TokenType.KeywordNTIPAliasName,
-                    TokenType.KeywordNTIPAliasQuality,
-                    TokenType.KeywordNTIPAliasStat,
-                    TokenType.KeywordNTIPAliasType,
-                ]
-                if self.tokens[-1].type in NTIPAliasKeywords + [TokenType.NUMBER]:
-                    self.tokens.append(self._create_math_operator())
-                    self._advance()
-                else:
-                    self.tokens.append(self._create_digits())
-                continue
-
-                    
-            if self.current_token in DIGITS:
-                self.tokens.append(self._create_digits())
-            elif self.current_token in WHITESPACE:
-                self._advance()
-            elif self.current_token in SYMBOLS:
-                self.tokens.append(self._create_logical_operator())
-            elif self.current_token in MATH_SYMBOLS:
+        while self.text_i < len(self.text):
+            self.current_token = self.text[self.text_i]
+            kind = CHAR_KINDS.get(self.current_token)
+
+            if kind == "minus": # * Since - is a math symbol and a negative sign for numbers, we need to handle it differently.
+                if self.tokens[-1].type in MINUS_OPERATOR_AFTER:
+                    self.tokens.append(Token(TokenType.MINUS, "-"))
+                    self.text_i += 1
+                    continue
+                kind = "digits"
+
+            found = MASTER_PATTERN.match(self.text, self.text_i)
+            lexeme = found.lastgroup if found else None
+            if kind == "whitespace":
+                self.text_i = found.end()
+            elif kind == "digits" and lexeme in NUMBER_LEXEMES:
+                self.tokens.append(self._create_digits(found))
+            elif kind == "symbol":
+                self.tokens.append(self._create_logical_operator(found))
+            elif kind == "math":
                 self.tokens.append(self._create_math_operator())
-                self._advance()
-            elif self.current_token == "[":
-                self.tokens.append(self._create_keyword_lookup())
-            elif self.current_token in CHARS:
-                self.tokens.append(self._create_d2r_image_data_lookup())
+            elif kind == "bracket":
+                self.tokens.append(self._create_keyword_lookup(found))
+            elif kind == "chars" and lexeme == "word":
+                self.tokens.append(self._create_d2r_image_data_lookup(found))
             elif self.current_section == BNipSections.PROP and self.text_i == 0 and self.current_token == "@":
                 self.tokens.append(Token(TokenType.NOTIFICATION, '@'))
-                self._advance()
+                self.text_i += 1
+            elif kind == "chars" and self.current_section == BNipSections.PROP and len(self.tokens) < 2:
+                raise BNipSyntaxError("BNIP_0x20", f"Bad token sequence: {self.text}", self.text)
             else:
-                raise BNipSyntaxError("BNIP_0x1", f"Unknown token: '{self.current_token}'", self._get_text())
+                # * Also digits that are no number (e.g. a single ".") and a "'" outside of a word, which the previous
+                # * lexer kept on reading as UNKNOWN tokens without moving on
+                raise BNipSyntaxError("BNIP_0x1", f"Unknown token: '{self.current_token}'", self.text)
         return self.tokens
 
     def detokenize(self, tokens: list[Token]) -> str:
@@ -191,72 +227,29 @@ class Lexer:
 
 
 
-    def _create_custom_digit_token(self, found_number, append_text="", append_front=False):
-        """
-            Creates a custom token for a number that allows for custom text to be appended to the front or back of the found number.
-        """
-        for _ in range(len(found_number)):
-            self._advance()
-        if append_text:
-            if append_front:
-                found_number = append_text + found_number
-            else:
-                found_number += append_text
-
+    def _create_digits(self, found: re.Match) -> Token:
+        found_number = found.group()
+        self.text_i = found.end()
+        if found.lastgroup == "shorthand_decimal":
+            found_number = "0" + found_number
         return Token(TokenType.NUMBER, float(found_number))
 
-    def _create_digits(self) -> Token:
-        found_decimal_number = re.match(r"^-*[0-9]+\.[0-9]+", self._get_current_iteration_of_text_raw())
-        if found_decimal_number:
-            return self._create_custom_digit_token(found_decimal_number.group(0))
-
-        shorthand_decimal_number = re.match(r"^-*\.[0-9]+", self._get_current_iteration_of_text_raw())
-        if shorthand_decimal_number:
-            return self._create_custom_digit_token(shorthand_decimal_number.group(0), "0", append_front=True)
-
-        found_whole_number = re.match(r"^-*[0-9]+", self._get_current_iteration_of_text_raw())
-        if found_whole_number:
-            return self._create_custom_digit_token(found_whole_number.group(0))
-        if self.current_token:
-            return Token(TokenType.UNKNOWN, self.current_token)
-        else:
-            return Token(TokenType.UNKNOWN, "")
-
 
     def _create_math_operator(self) -> Token:
-        symbol_map = {
-            '+': TokenType.PLUS,
-            '-': TokenType.MINUS,
-            '*': TokenType.MULTIPLY,
-            '/': TokenType.DIVIDE,
-            '\\': TokenType.MODULO,
-            '^': TokenType.POW,
-            "(": TokenType.LPAREN,
-            ")": TokenType.RPAREN
-        }
-
         symbol = self.current_token
+        self.text_i += 1
+        return Token(MATH_OPERATORS[symbol], symbol)
 
-        if symbol:
-            if symbol in symbol_map:
-                return Token(symbol_map[symbol], symbol)
-            return Token(TokenType.UNKNOWN, symbol)
-        return Token(TokenType.UNKNOWN, "")
-    def _create_keyword_lookup(self) -> Token:
+    def _create_keyword_lookup(self, found: re.Match | None) -> Token:
         """
             item data lookup i.e [name]
         """
-        lookup_key = ""
-        if self.text:
-            found_match = re.match(r"\[\w+\]|\[d+\]", self._get_current_iteration_of_text_raw()) # Finds the first match of [word] or [21234223892] (numbers :P)
-            if found_match:
-                found = found_match.group(0)
-                for char in found:
-                    if char.isalnum(): # is alpha numeric
-                        lookup_key += char
-                    self._advance()
-            else:
-                raise BNipSyntaxError("BNIP_0x2", "Missing ] after keyword", self._get_text())
+        if found is None or found.lastgroup != "keyword":
+            raise BNipSyntaxError("BNIP_0x2", "Missing ] after keyword", self.text)
+        self.text_i = found.end()
+        lookup_key = found.group()[1:-1]
+        if not lookup_key.isalnum():
+            lookup_key = "".join(char for char in lookup_key if char.isalnum())
         if lookup_key:
             if self.current_section == BNipSections.PROP:
                     match lookup_key:
@@ -283,7 +276,7 @@ class Lexer:
                                 return Token(TokenType.ValueNTIPAliasFlag, NTIPAliasFlag[lookup_key])
                             elif lookup_key in NTIPAliasType:
                                 return Token(TokenType.ValueNTIPAliasType, NTIPAliasType[lookup_key])
-                    Logger.warning(f"Unknown property lookup: \"{lookup_key}\" {''.join(self.text)}  {self.current_section}")
+                    Logger.warning(f"Unknown property lookup: \"{lookup_key}\" {self.text}  {self.current_section}")
 
                     return Token(TokenType.UNKNOWN, lookup_key)
             elif self.current_section == BNipSections.STAT:
@@ -294,23 +287,16 @@ class Lexer:
                     # for key in NTIPAliasStat:
                     #     if levenshtein(lookup_key, key) < 3:
                     #         spell_check = f", did you mean {key}?"
-                    # raise BNipSyntaxError("BNIP_0x3", f"Unknown NTIPStat lookup: {lookup_key}{spell_check}", self._get_text())
+                    # raise BNipSyntaxError("BNIP_0x3", f"Unknown NTIPStat lookup: {lookup_key}{spell_check}", self.text)
                     return Token(TokenType.UNKNOWN, lookup_key)
             elif self.current_section == BNipSections.MAXQUANTITY:
                 pass
 
         return Token(TokenType.UNKNOWN, lookup_key)
 
-    def _create_d2r_image_data_lookup(self) -> Token:
-        lookup_key = ""
-
-        found_lookup_key = re.match(r"^(\w+)\s*", self._get_current_iteration_of_text_raw())
-        # print(found_lookup_key, self._get_current_iteration_of_text_raw())
-        if found_lookup_key:
-            found = found_lookup_key.group(1).replace("'", "\\'") # Replace ' with escaped \'
-            for _ in range(len(found)):
-                self._advance()
-            lookup_key = found
+    def _create_d2r_image_data_lookup(self, found: re.Match) -> Token:
+        lookup_key = found.group()
+        self.text_i = found.end()
 
         if self.current_section == BNipSections.PROP:
             # TODO: The second checks (i.e NTIPAliasClass and self.tokens[-2].type == TokenType.CLASS:) seem a little misplaced, possibly put them inside the validation function that is inside transpiler.py and throw a warning accordingly.
@@ -328,7 +314,7 @@ class Lexer:
                 elif self.tokens[-2].type == TokenType.KeywordNTIPAliasIDName:
                     return Token(TokenType.ValueNTIPAliasIDName, lookup_key)
             else:
-                raise BNipSyntaxError("BNIP_0x20", f"Bad token sequence: {self._get_text()}", self._get_text())
+                raise BNipSyntaxError("BNIP_0x20", f"Bad token sequence: {self.text}", self.text)
             return Token(TokenType.UNKNOWN, lookup_key)
         elif self.current_section == BNipSections.STAT:
             if lookup_key in NTIPAliasStat:
@@ -337,35 +323,12 @@ class Lexer:
                 return Token(TokenType.UNKNOWN, lookup_key)
         return Token(TokenType.UNKNOWN, lookup_key)
 
-    def _create_logical_operator(self) -> Token:
-        char = self.current_token
-        logical_operator_map = {
-            ">": TokenType.GT,
-            "<": TokenType.LT,
-
-            ">=": TokenType.GE,
-            "<=": TokenType.LE,
-
-            "==": TokenType.EQ,
-            "!=": TokenType.NE,
-
-            "&&": TokenType.AND,
-            "||": TokenType.OR,
-
-            "#": TokenType.SECTIONAND
-        }
-
-        pattern = r"(>=|<=|==|!=|&&|\|\||>|<|\#)"
-
-        found = re.match(pattern, self._get_current_iteration_of_text_raw())
-        if found:
-            found_text = found.group(1)
-            if logical_operator_map[found_text] == TokenType.SECTIONAND:
+    def _create_logical_operator(self, found: re.Match | None) -> Token:
+        if found is not None and found.lastgroup == "logical":
+            token_type, pythonic_operator = LOGICAL_OPERATORS[found.group()]
+            if token_type == TokenType.SECTIONAND:
                 self._increment_section()
-            for _ in range(len(found_text)):
-                self._advance()
-
-            pythonic_operator = found_text.replace("#", "and").replace("||", "or").replace("&&", "and")
-            return Token(logical_operator_map[found_text], pythonic_operator)
+            self.text_i = found.end()
+            return Token(token_type, pythonic_operator)
         else:
-            raise BNipSyntaxError("BNIP_0x5", f"Invalid logical operator: '{char}'", self._get_text())
\ No newline at end of file
+            raise BNipSyntaxError("BNIP_0x5", f"Invalid logical operator: '{self.current_token}'", self.text)
@@ -0,0 +1,142 @@
+"""
+    Cache of the tokenized and transpiled expressions of each rule file, so only rule files that changed since the
+    last start are lexed and transpiled again.
+
+    Each rule file is stored as one json file named by the hash of its content and of the source of the lexer, the
+    transpiler and the alias tables, together with the errors of its lines to report them again when loading from the
+    cache.
+"""
+
+import glob
+import hashlib
+import importlib.util
+import json
+import marshal
+import os
+from functools import cache
+from logger import Logger
+from bnip.tokens import Token, TokenType
+from bnip.transpile import BNIPExpression, compile_transpiled
+
+# * Modules whose code decides the cached tokens and transpiled expressions, part of the keys of the rule files
+TRANSPILER_MODULES = (
+    "bnip.BNipExceptions",
+    "bnip.lexer",
+    "bnip.tokens",
+    "bnip.transpile",
+    "bnip.utils",
+    "bnip.UniqueAndSetData",
+    "bnip.NTIPAliasClass",
+    "bnip.NTIPAliasClassID",
+    "bnip.NTIPAliasFlag",
+    "bnip.NTIPAliasQuality",
+    "bnip.NTIPAliasStat",
+    "bnip.NTIPAliasType",
+)
+
+
+@cache
+def source_hash(module_names: tuple[str, ...]) -> str:
+    """
+        Returns the hash of the source of the modules, the compiled code if the source is not shipped (frozen builds).
+    """
+    key = hashlib.sha256()
+    for name in module_names:
+        loader = importlib.util.find_spec(name).loader
+        source = loader.get_source(name)
+        code = source.encode() if source is not None else marshal.dumps(loader.get_code(name))
+        key.update(f"\0{name}\0".encode() + hashlib.sha256(code).digest())
+    return key.hexdigest()
+
+
+def rule_file_key(file_path: str) -> str:
+    """
+        Returns the hash of the content of the rule file and the source of TRANSPILER_MODULES.
+    """
+    key = hashlib.sha256(f"{source_hash(TRANSPILER_MODULES)}\0".encode())
+    with open(file_path, "rb") as f:
+        key.update(f.read())
+    return key.hexdigest()[:32]
+
+
+def _cache_path(cache_dir: str, key: str) -> str:
+    return os.path.join(cache_dir, f"rules_{key}.json")
+
+
+def load_rule_file(cache_dir: str, key: str) -> tuple[list[BNIPExpression], list[tuple[int, str]]] | None:
+    """
+        Loads the expressions of a rule file from the cache.
+        Args:
+            cache_dir (str): The cache directory.
+            key (str): rule_file_key() of the rule file.
+        Returns:
+            The expressions and the (line number, error) of the lines that failed to load, None if not cached.
+    """
+    path = _cache_path(cache_dir, key)
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        expressions = [
+            BNIPExpression(
+                raw=expression["raw"],
+                tokens=[Token(TokenType[token_type], value) for token_type, value in expression["tokens"]],
+                transpiled=expression["transpiled"],
+                should_id_transpiled=expression["should_id_transpiled"],
+                should_pickup=expression["should_pickup"],
+                keep_fn=compile_transpiled(expression["transpiled"]),
+                should_id_fn=compile_transpiled(expression["should_id_transpiled"]),
+                should_pickup_fn=compile_transpiled(expression["should_pickup"]),
+            )
+            for expression in data["expressions"]
+        ]
+        return expressions, [(line, error) for line, error in data["errors"]]
+    except Exception as e:
+        Logger.warning(f"Could not load cached bnip rules {path}: {e}")
+        return None
+
+
+def save_rule_file(cache_dir: str, key: str, expressions: list[BNIPExpression], errors: list[tuple[int, str]]):
+    """
+        Stores the expressions of a rule file in the cache.
+        Args:
+            cache_dir (str): The cache directory.
+            key (str): rule_file_key() of the rule file.
+            expressions (list[BNIPExpression]): The expressions of the rule file, in the order of its lines.
+            errors (list[tuple[int, str]]): The line number and error of the lines that failed to load.
+    """
+    path = _cache_path(cache_dir, key)
+    data = {
+        "expressions": [
+            {
+                "raw": expression.raw,
+                "tokens": [[token.type.name, token.value] for token in expression.tokens],
+                "transpiled": expression.transpiled,
+                "should_id_transpiled": expression.should_id_transpiled,
+                "should_pickup": expression.should_pickup,
+            }
+            for expression in expressions
+        ],
+        "errors": errors,
+    }
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(f"{path}.tmp", path)
+    except (OSError, TypeError, ValueError) as e:
+        Logger.warning(f"Could not save cached bnip rules {path}: {e}")
+
+
+def remove_unused_rule_files(cache_dir: str, keys: list[str]):
+    """
+        Removes the cached rule files that are not in keys, i.e. of rule files that changed or were removed.
+    """
+    used = {_cache_path(cache_dir, key) for key in keys}
+    for path in glob.glob(os.path.join(cache_dir, "rules_*.json")):
+        if path not in used:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,120 @@
+"""
+    Dispatch table for BNIP expressions by item class id, type and quality.
+
+    Most expressions start with equality checks like `[name] == ring` or `[type] == ring && [quality] == rare`. If such
+    a check is false the transpiled expression short-circuits to False, so an item only has to be checked against the
+    expressions whose leading check can match it, plus the expressions without one. The candidates are evaluated in
+    the original order of the expressions, so the first match is the same as when checking all of them.
+"""
+
+from functools import lru_cache
+from itertools import chain
+from bnip.NTIPAliasClassID import NTIPAliasClassID
+from bnip.NTIPAliasQuality import NTIPAliasQuality
+from bnip.NTIPAliasType import NTIPAliasType
+from bnip.tokens import Token, TokenType
+from bnip.transpile import BNIPExpression
+
+# * Keyword and value token types of the checks that are indexed, the first found key of this order is used
+INDEX_KEYS = {
+    TokenType.KeywordNTIPAliasName: (TokenType.ValueNTIPAliasClassID, NTIPAliasClassID),
+    TokenType.KeywordNTIPAliasType: (TokenType.ValueNTIPAliasType, NTIPAliasType),
+    TokenType.KeywordNTIPAliasQuality: (TokenType.ValueNTIPAliasQuality, NTIPAliasQuality),
+}
+# * Number of distinct (class id, quality, types) combinations whose candidate lists are kept
+CANDIDATE_CACHE_SIZE = 4096
+
+
+def leading_predicates(tokens: list[Token]) -> dict[TokenType, int]:
+    """
+        Finds the `[keyword] == value` checks the expression starts with, i.e. the checks that all have to be true
+        before anything else of the expression is evaluated.
+        Args:
+            tokens (list[Token]): The tokens of the expression.
+        Returns:
+            dict[TokenType, int]: The value of each indexed keyword that is checked, e.g. {KeywordNTIPAliasName: 522}
+    """
+    section_end = next((i for i, token in enumerate(tokens) if token.type == TokenType.SECTIONAND), len(tokens))
+    # * With an `or` outside of parentheses, e.g. `[name] == ring && [quality] == rare || ...`, nothing is required
+    depth = 0
+    for token in tokens[:section_end]:
+        if token.type == TokenType.LPAREN:
+            depth += 1
+        elif token.type == TokenType.RPAREN:
+            depth -= 1
+        elif token.type == TokenType.OR and depth == 0:
+            return {}
+
+    predicates = {}
+    i = 0
+    while i + 2 < section_end:
+        keyword, operator, value = tokens[i:i + 3]
+        if keyword.type not in INDEX_KEYS or operator.type != TokenType.EQ:
+            break
+        value_type, alias = INDEX_KEYS[keyword.type]
+        if value.type != value_type or (i + 3 < section_end and tokens[i + 3].type != TokenType.AND):
+            break
+        try:
+            key = int(alias[value.value])
+        except (KeyError, ValueError):
+            break
+        # * `[type] == x` is transpiled to `(x in types and x or -1) == x`, which is never true for the type id 0
+        if keyword.type == TokenType.KeywordNTIPAliasType and not key:
+            break
+        predicates.setdefault(keyword.type, key)
+        i += 4
+    return predicates
+
+
+class RuleIndex:
+    def __init__(self, expressions: list[BNIPExpression]):
+        """
+            Args:
+                expressions (list[BNIPExpression]): The expressions in the order they are checked.
+        """
+        self.expressions = expressions
+        self._size = len(expressions)
+        self._buckets: dict[TokenType, dict[int, list[int]]] = {keyword: {} for keyword in INDEX_KEYS}
+        self._unindexed: list[int] = []
+        for position, expression in enumerate(expressions):
+            predicates = leading_predicates(expression.tokens)
+            for keyword in INDEX_KEYS:
+                if keyword in predicates:
+                    self._buckets[keyword].setdefault(predicates[keyword], []).append(position)
+                    break
+            else:
+                self._unindexed.append(position)
+        self._candidates = lru_cache(maxsize=CANDIDATE_CACHE_SIZE)(self._merge)
+
+    def is_current(self, expressions: list[BNIPExpression]) -> bool:
+        """
+            Returns whether the index was built from this list of expressions and the list did not grow or shrink since.
+        """
+        return expressions is self.expressions and len(expressions) == self._size
+
+    def _merge(self, class_id: int, quality: int, types: tuple) -> tuple[BNIPExpression, ...]:
+        positions = chain(
+            self._unindexed,
+            self._buckets[TokenType.KeywordNTIPAliasName].get(class_id, ()),
+            self._buckets[TokenType.KeywordNTIPAliasQuality].get(quality, ()),
+            *(self._buckets[TokenType.KeywordNTIPAliasType].get(item_type, ()) for item_type in types),
+        )
+        return tuple(self.expressions[position] for position in sorted(set(positions)))
+
+    def candidates(self, item_data: dict) -> tuple[BNIPExpression, ...] | list[BNIPExpression]:
+        """
+            Returns the expressions that can match the item, in their original order.
+            Args:
+                item_data (dict): The item data.
+            Returns:
+                The candidate expressions, all expressions if the item data can not be looked up in the index.
+        """
+        try:
+            return self._candidates(
+                int(item_data["NTIPAliasClassID"]),
+                int(item_data["NTIPAliasQuality"]),
+                tuple(item_data["NTIPAliasType"]),
+            )
+        except (KeyError, TypeError, ValueError):
+            # * Evaluating all expressions raises or not exactly like before the index existed
+            return self.expressions
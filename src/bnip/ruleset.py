@@ -0,0 +1,278 @@
+"""
+    Compiles the whole loaded ruleset into one generated python module with the entry points keep(), pickup() and id(),
+    which return the same as should_keep(), should_pickup() and should_id() of bnip.actions.
+
+    Item lookups that the transpiled expressions repeat in every expression, like int(item_data['NTIPAliasQuality'])
+    or the stat reads, are done once per item at the start of each entry point, alias table lookups are replaced by
+    their values and the stat section of an expression is only evaluated if its property section matched (shared by
+    consecutive expressions with the same property section). If one of the up front lookups fails for an item, the
+    entry point evaluates the expressions again without them, so errors are raised exactly where the expressions
+    raise them.
+
+    The module is written to a cache directory next to the rule files, named by a hash of the rule files and of the
+    bnip sources, so starting with unchanged rule files imports it instead of lexing and transpiling the rules. The
+    errors of the rule file lines are stored in it to print them again.
+"""
+
+import glob
+import hashlib
+import importlib.util
+import os
+import re
+from dataclasses import dataclass
+from types import ModuleType
+from logger import Logger
+from bnip.NTIPAliasClass import NTIPAliasClass
+from bnip.NTIPAliasClassID import NTIPAliasClassID
+from bnip.NTIPAliasQuality import NTIPAliasQuality
+from bnip.NTIPAliasStat import NTIPAliasStat
+from bnip.NTIPAliasType import NTIPAliasType
+from bnip.rule_cache import TRANSPILER_MODULES, source_hash
+from bnip.transpile import BNIPExpression
+
+# * Modules whose code decides the generated module, part of its cache key: the alias tables are folded into the
+# * conditions, the conditions come from actions._rule_plan() and the code around them from this module
+RULESET_MODULES = TRANSPILER_MODULES + ("bnip.actions", "bnip.rule_cache", "bnip.rule_index", "bnip.ruleset")
+RULESET_CACHE_DIR = "__bnipcache__"
+# * Pickup condition of an expression whose property section did not transpile, raises like calling None did
+NO_CONDITION = "_no_condition()"
+# * Item lookups of the transpiled expressions that are done once per item: (expression, local name)
+HOISTED_LOOKUPS = [
+    ("int(item_data['NTIPAliasClassID'])", "_class_id"),
+    ("int(item_data['NTIPAliasClass'])", "_class"),
+    ("int(item_data['NTIPAliasQuality'])", "_quality"),
+    ("item_data['NTIPAliasType']", "_types"),
+    ("item_data['NTIPAliasFlag']", "_flags"),
+    ("str(item_data['NTIPAliasIdName']).lower()", "_id_name"),
+]
+STATS_LOOKUP = "{key: int(value) for key, value in item_data.get('NTIPAliasStat', {}).items()}"
+_STAT_RE = re.compile(r"int\(item_data\.get\('NTIPAliasStat', \{\}\)\.get\('([^']*)', 0\)\)")
+_ALIAS_RE = re.compile(r"int\((NTIPAlias\w+)\['([^']*)'\]\)")
+_LOWER_RE = re.compile(r"str\('([^']*)'\)\.lower\(\)")
+_ALIAS_TABLES = {
+    "NTIPAliasClass": NTIPAliasClass,
+    "NTIPAliasClassID": NTIPAliasClassID,
+    "NTIPAliasQuality": NTIPAliasQuality,
+    "NTIPAliasStat": NTIPAliasStat,
+    "NTIPAliasType": NTIPAliasType,
+}
+_HEADER = '''"""
+    Generated by bnip.ruleset from {files}, do not edit
+"""
+from logger import Logger
+
+RAW = {raw!r}
+ERRORS = {errors!r}
+
+def _no_condition():
+    raise TypeError("'NoneType' object is not callable")
+
+def _gold_amount(item_data):
+    if item_data.get("Amount") is None:
+        return None
+    try:
+        return int(item_data["Amount"])
+    except Exception as e:
+        Logger.warning(f"Error evaluating gold pickup condition: {{e}}")
+        return None
+'''
+
+
+@dataclass
+class RulePlan:
+    # * What the entry points evaluate for one expression, all conditions are transpiled python expressions
+    raw: str
+    # * property and stat section of the keep condition, stat is None if the expression has no stat section
+    prop: str
+    stat: str | None
+    # * should_id() returns True at this expression ([idname] expressions)
+    identify: bool
+    # * should_id() returns False if this condition is true, None if the expression is not checked
+    id_condition: str | None
+    # * comparison of the gold amount, e.g. ">= 500", None if the expression has no gold condition
+    gold: str | None
+    # * pickup condition for white, gray and all other ("") items, None if the expression ignores the color
+    pickup: dict[str, str | None]
+
+
+def _fold_constants(condition: str) -> str:
+    def alias_value(match: re.Match) -> str:
+        try:
+            return str(int(_ALIAS_TABLES[match.group(1)][match.group(2)]))
+        except (KeyError, ValueError):
+            return match.group(0)
+    condition = _ALIAS_RE.sub(alias_value, condition)
+    return _LOWER_RE.sub(lambda match: repr(match.group(1).lower()), condition)
+
+
+def _hoist(condition: str) -> str:
+    for lookup, name in HOISTED_LOOKUPS:
+        condition = condition.replace(lookup, name)
+    return _STAT_RE.sub(r"_stats.get('\1', 0)", condition)
+
+
+class _FunctionWriter:
+    def __init__(self, name: str, hoisted: bool):
+        self.name = name
+        self.hoisted = hoisted
+        self.lines: list[str] = []
+
+    def condition(self, condition: str) -> str:
+        condition = _fold_constants(condition)
+        return _hoist(condition) if self.hoisted else condition
+
+    def add(self, indent: int, line: str):
+        self.lines.append("    " * indent + line)
+
+    def source(self, prologue: list[str] = ()) -> str:
+        body = "\n".join("    " + line for line in self.lines)
+        lines = [f"def {self.name}(item_data):", *("    " + line for line in prologue)]
+        if self.hoisted:
+            # * only the lookups the conditions use
+            lines += [f"    {name} = {lookup}" for lookup, name in HOISTED_LOOKUPS if re.search(rf"\b{name}\b", body)]
+            if re.search(r"\b_stats\b", body):
+                lines.append(f"    _stats = {STATS_LOOKUP}")
+        return "\n".join(lines + [body]) + "\n"
+
+
+def _keep_function(rules: list[RulePlan], hoisted: bool) -> str:
+    writer = _FunctionWriter("_keep_hoisted" if hoisted else "_keep", hoisted)
+    prev_prop = None
+    for i, rule in enumerate(rules):
+        prop = writer.condition(rule.prop)
+        if prop != prev_prop:
+            writer.add(0, f"if {prop}:")
+            prev_prop = prop
+        if rule.stat is None:
+            writer.add(1, f"return True, RAW[{i}]")
+        else:
+            writer.add(1, f"if {writer.condition(rule.stat)}:")
+            writer.add(2, f"return True, RAW[{i}]")
+    writer.add(0, "return False, ''")
+    return writer.source()
+
+
+def _pickup_function(rules: list[RulePlan], hoisted: bool) -> str:
+    writer = _FunctionWriter("_pickup_hoisted" if hoisted else "_pickup", hoisted)
+    for i, rule in enumerate(rules):
+        if rule.gold is not None:
+            writer.add(0, f"if _is_gold and (_gold := _gold_amount(item_data)) is not None:")
+            writer.add(1, f"return _gold {rule.gold}, RAW[{i}]")
+        conditions = {color: None if condition is None else writer.condition(condition) for color, condition in rule.pickup.items()}
+        if conditions["white"] == conditions["gray"] == conditions[""]:
+            writer.add(0, f"if {conditions['']}:")
+            writer.add(1, f"return True, RAW[{i}]")
+            continue
+        for keyword, color in [("if", "white"), ("elif", "gray")]:
+            writer.add(0, f"{keyword} _color == {color!r}:")
+            if conditions[color] is None:
+                writer.add(1, "pass")
+            else:
+                writer.add(1, f"if {conditions[color]}:")
+                writer.add(2, f"return True, RAW[{i}]")
+        writer.add(0, f"elif {conditions['']}:")
+        writer.add(1, f"return True, RAW[{i}]")
+    writer.add(0, "return False, ''")
+    return writer.source(["_is_gold = item_data['BaseItem']['DisplayName'] == 'Gold'", "_color = item_data['Color']"])
+
+
+def _id_function(rules: list[RulePlan], hoisted: bool) -> str:
+    writer = _FunctionWriter("_id_hoisted" if hoisted else "_id", hoisted)
+    for rule in rules:
+        if rule.identify:
+            break
+        if rule.id_condition is not None:
+            writer.add(0, f"if {writer.condition(rule.id_condition)}:")
+            writer.add(1, "return False")
+    writer.add(0, "return True")
+    return writer.source()
+
+
+def generate_ruleset_source(rules: list[RulePlan], files: list[str], errors: list[tuple[str, int, str]] | None = None) -> str:
+    """
+        Generates the source of the ruleset module.
+        Args:
+            rules (list[RulePlan]): The expressions in the order they are checked.
+            files (list[str]): The rule files, only mentioned in the module docstring.
+            errors (list[tuple[str, int, str]]): The (rule file, line number, error) of the lines that failed to load,
+                printed again when the module is loaded from the cache.
+        Returns:
+            str: The python source of the module.
+    """
+    parts = [_HEADER.format(files=", ".join(os.path.basename(file) for file in files), raw=[rule.raw for rule in rules], errors=errors or [])]
+    for name, generate in [("keep", _keep_function), ("pickup", _pickup_function), ("id", _id_function)]:
+        parts += [generate(rules, False), generate(rules, True)]
+        parts.append(f"def {name}(item_data):\n    try:\n        return _{name}_hoisted(item_data)\n    except Exception:\n        return _{name}(item_data)\n")
+    return "\n".join(parts)
+
+
+def ruleset_key(file_paths: list[str]) -> str:
+    """
+        Returns the hash of the rule files (paths and contents, in load order) and the source of RULESET_MODULES.
+    """
+    key = hashlib.sha256(source_hash(RULESET_MODULES).encode())
+    for file_path in file_paths:
+        with open(file_path, "rb") as f:
+            key.update(f"\0{file_path}\0".encode() + hashlib.sha256(f.read()).digest())
+    return key.hexdigest()[:32]
+
+
+def ruleset_path(cache_dir: str, key: str) -> str:
+    return os.path.join(cache_dir, f"ruleset_{key}.py")
+
+
+def load_ruleset_module(path: str) -> ModuleType | None:
+    """
+        Imports a generated ruleset module, None if it does not exist or can not be imported.
+    """
+    if not os.path.isfile(path):
+        return None
+    try:
+        spec = importlib.util.spec_from_file_location(f"bnip_{os.path.splitext(os.path.basename(path))[0]}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+    except Exception as e:
+        Logger.warning(f"Could not load compiled bnip ruleset {path}: {e}")
+        return None
+
+
+def write_ruleset_module(path: str, source: str) -> ModuleType | None:
+    """
+        Writes a generated ruleset module, removes the ones of other rule files and imports it.
+    """
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        for old_path in glob.glob(os.path.join(os.path.dirname(path), "ruleset_*.py")):
+            if old_path != path:
+                os.remove(old_path)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            f.write(source)
+        os.replace(f"{path}.tmp", path)
+    except OSError as e:
+        Logger.warning(f"Could not save compiled bnip ruleset {path}: {e}")
+        return None
+    return load_ruleset_module(path)
+
+
+class CompiledRuleset:
+    def __init__(self, module: ModuleType, expressions: list[BNIPExpression]):
+        """
+            Args:
+                module (ModuleType): The generated ruleset module.
+                expressions (list[BNIPExpression]): The list of expressions the ruleset stands for, empty if the
+                    module was loaded from the cache instead of the rule files.
+        """
+        self.module = module
+        self.raw: list[str] = module.RAW
+        self.expressions = expressions
+        self._size = len(expressions)
+        self.keep = module.keep
+        self.pickup = module.pickup
+        self.id = module.id
+
+    def is_current(self, expressions: list[BNIPExpression]) -> bool:
+        """
+            Returns whether the ruleset stands for this list of expressions and the list did not grow or shrink since.
+        """
+        return expressions is self.expressions and len(expressions) == self._size
@@ -8,6 +8,7 @@ from bnip.NTIPAliasType import NTIPAliasType
 # ! The above imports are necessary, they are used within the eval statements. Your text editor probably is not showing them as not in use.
 
 from dataclasses import dataclass
+from typing import Callable
 from bnip.lexer import Lexer, BNipSections
 from bnip.BNipExceptions import BNipSyntaxError
 from bnip.tokens import Token, TokenType
@@ -20,6 +21,10 @@ class BNIPExpression:
     transpiled: str
     should_pickup: str | None
     tokens: list[Token]
+    # * The transpiled expressions compiled to functions of item_data, see compile_transpiled()
+    keep_fn: Callable[[dict], bool] | None = None
+    should_id_fn: Callable[[dict], bool] | None = None
+    should_pickup_fn: Callable[[dict], bool] | None = None
 
 
 bnip_expressions: list[BNIPExpression] = []
@@ -426,6 +431,17 @@ def transpile_bnip_expression(expression: str | list[Token], isPickUpPhase=False
         if transpiled_expression:
             return transpiled_expression
 
+def compile_transpiled(transpiled_expression: str | None) -> Callable[[dict], bool] | None:
+    """
+        Compiles a transpiled expression once into a function of item_data, so checking an item is a function call
+        instead of parsing and compiling the expression string again with eval()
+    """
+    if not transpiled_expression:
+        return None
+    # * Evaluated with the globals of this module, so the NTIPAlias tables imported above are available
+    return eval(compile(f"lambda item_data: {transpiled_expression}", "<bnip>", "eval"))
+
+
 def generate_expression_object(bnip_expression: str) -> BNIPExpression | None:
     bnip_expression = prepare_bnip_expression(bnip_expression)
 
@@ -433,12 +449,17 @@ def generate_expression_object(bnip_expression: str) -> BNIPExpression | None:
         tokens = Lexer().create_tokens(bnip_expression)
         if transpiled_expression := transpile_bnip_expression(tokens):
             split_tokens = get_section_from_tokens(tokens)
+            should_id_transpiled = transpile_bnip_expression(split_tokens[BNipSections.PROP])
+            should_pickup = transpile_bnip_expression(split_tokens[BNipSections.PROP], isPickUpPhase=True) # * Some stuff gets transpiled differently in the pickup phase
             expression_obj = BNIPExpression(
                     raw=bnip_expression,
                     tokens=tokens,
                     transpiled=transpiled_expression,
-                    should_id_transpiled=transpile_bnip_expression(split_tokens[BNipSections.PROP]),
-                    should_pickup=transpile_bnip_expression(split_tokens[BNipSections.PROP], isPickUpPhase=True) # * Some stuff gets transpiled differently in the pickup phase
+                    should_id_transpiled=should_id_transpiled,
+                    should_pickup=should_pickup,
+                    keep_fn=compile_transpiled(transpiled_expression),
+                    should_id_fn=compile_transpiled(should_id_transpiled),
+                    should_pickup_fn=compile_transpiled(should_pickup),
                 )
             return expression_obj
     return None
@@ -16,8 +16,9 @@ from utils.restart import safe_exit, restart_game
 from game_stats import GameStats
 from logger import Logger
 from config import Config
-from screen import grab
+from screen import grab, frame_stats
 import template_finder
+from d2r_image import glyph_ocr, ocr
 from char import IChar
 from item.pickit import PickIt
 from item import consumables
@@ -471,6 +472,18 @@ class Bot:
     def _ending_run_helper(self, res: bool | tuple[Location, bool]):
         self._game_stats._run_counter += 1
         self._game_stats.log_exp()
+        used_templates = template_finder.template_stats(reset=True)
+        Logger.debug(f"{self._game_stats._location} run used {len(used_templates)} templates, {sum(s.misses for s in used_templates.values())} template loads")
+        unchanged = template_finder.change_stats(reset=True)
+        Logger.debug(f"Skipped {unchanged.skipped}/{unchanged.searches} searches on unchanged rois, saved {unchanged.saved_matches} matchTemplate calls")
+        search_cache = template_finder.search_cache_stats(reset=True)
+        Logger.debug(f"Search cache: {search_cache.hits} hits, {search_cache.misses} misses ({search_cache.hit_rate*100:.1f}% hit rate)")
+        ocr_cache = ocr.ocr_cache_stats(reset=True)
+        Logger.debug(f"OCR cache: {ocr_cache.hits} hits, {ocr_cache.misses} misses ({ocr_cache.hit_rate*100:.1f}% hit rate)")
+        glyphs = glyph_ocr.glyph_stats(reset=True)
+        Logger.debug(f"Fixed font OCR: {glyphs.reads} reads, {glyphs.fallbacks} Tesseract fallbacks, {glyphs.learned} glyphs learned")
+        capture = frame_stats()
+        Logger.debug(f"Screen capture: {capture.frame_id} frames, {capture.dropped} never read, last capture took {capture.capture_ms:.1f} ms")
         # either fill member variables with result data or mark run as failed
         failed_run = True
         if res:
@@ -302,8 +302,12 @@ class Config:
             "hwnd_window_process": _default_iff(Config()._select_val("advanced_options", "hwnd_window_process"), ''),
             "window_client_area_offset": tuple(map(int, Config()._select_val("advanced_options", "window_client_area_offset").split(","))),
             "ocr_during_pickit": bool(int(self._select_val("advanced_options", "ocr_during_pickit"))),
+            "ocr_workers": max(int(self._select_val("advanced_options", "ocr_workers")), 1),
             "launch_options": self._select_val("advanced_options", "launch_options").replace("<name>", only_lowercase_letters(self.general["name"].lower())),
             "override_capabilities": _default_iff(Config()._select_optional("advanced_options", "override_capabilities"), ""),
+            "template_memory_cap_mb": float(self._select_val("advanced_options", "template_memory_cap_mb")),
+            "record_replay": bool(int(self._select_val("advanced_options", "record_replay"))),
+            "bnip_compile_ruleset": bool(int(self._select_val("advanced_options", "bnip_compile_ruleset"))),
         }
 
         self.colors = {}
@@ -1,10 +1,11 @@
+import math
 import os
 import sys
 from parse import compile as compile_pattern
 from d2r_image.data_models import ItemQuality
 from d2r_image.d2data_data import ITEM_ARMOR, ITEM_MISC, ITEM_SET_ITEMS, ITEM_TYPES, ITEM_UNIQUE_ITEMS, ITEM_WEAPONS, REF_PATTERNS
-from d2r_image.strings_store import base_items
-from utils.misc import find_best_match
+from d2r_image.strings_store import base_items, base_items_index
+from utils.fuzzy_index import FuzzyIndex
 from logger import Logger
 
 item_lookup: dict = {
@@ -28,6 +29,11 @@ bases_by_name: dict = {}
 consumables_by_name: dict = {}
 gems_by_name: dict = {}
 runes_by_name: dict ={}
+# fuzzy lookup indexes, built by load_lookup()
+name_index_by_quality: dict[int, FuzzyIndex] = {}
+correct_name_index: FuzzyIndex = None
+# base names sorted by length, longest first
+_bases_by_length: list[str] = []
 
 if getattr(sys, 'frozen', False):
     application_path = os.path.dirname(sys.executable)
@@ -37,8 +43,8 @@ elif __file__:
 d2data_path = os.path.join(application_path, 'd2data')
 
 def magic_name(name: str):
-    magic_names = [base_item_name for base_item_name in bases_by_name if base_item_name in name]
-    return find_best_match(name, magic_names).match
+    # the levenshtein distance of name to a contained base name is the length difference, so the closest one is the longest
+    return next((base_item_name for base_item_name in _bases_by_length if base_item_name in name), None)
 
 def load_lookup():
     for key, val in item_lookup.items():
@@ -100,7 +106,11 @@ def load_lookup():
     for misc_item in item_lookup_by_display_name['misc']:
         if 'rune' in misc_item:
             runes_by_name[misc_item.upper().replace(' ', '')] = item_lookup_by_display_name['misc'][misc_item]
-    pass
+    global correct_name_index, _bases_by_length
+    for quality, items in item_lookup_by_quality_and_display_name.items():
+        name_index_by_quality[quality] = FuzzyIndex(items)
+    correct_name_index = FuzzyIndex(bases_by_name | consumables_by_name | gems_by_name | runes_by_name)
+    _bases_by_length = sorted(bases_by_name, key=len, reverse=True)
 
 def load_parsers():
     for key, value in REF_PATTERNS.items():
@@ -123,7 +133,7 @@ def find_unique_item_by_name(name, fuzzy=False):
         if normalized_name in item_lookup_by_quality_and_display_name[quality]:
             return item_lookup_by_quality_and_display_name[quality][normalized_name]
     else:
-        best_match = find_best_match(normalized_name, item_lookup_by_quality_and_display_name[quality].keys()).match
+        best_match = name_index_by_quality[quality].best_match(normalized_name).match
         return item_lookup_by_quality_and_display_name[quality][best_match]
 
 def find_set_item_by_name(name, fuzzy=False):
@@ -133,13 +143,15 @@ def find_set_item_by_name(name, fuzzy=False):
         if normalized_name in item_lookup_by_quality_and_display_name[quality]:
             return item_lookup_by_quality_and_display_name[quality][normalized_name]
     else:
-        best_match = find_best_match(normalized_name, item_lookup_by_quality_and_display_name[quality].keys()).match
+        best_match = name_index_by_quality[quality].best_match(normalized_name).match
         return item_lookup_by_quality_and_display_name[quality][best_match]
 
 def fuzzy_base_item_match(item_name: str, normalized_threshold: float = 0.7):
     if not item_name in base_items():
-        fuzzy_res = find_best_match(item_name, list(base_items()))
-        if fuzzy_res.match != item_name:
+        # matches at or below the threshold are ignored anyway, the index can stop searching there
+        max_lev = math.ceil(len(item_name) * (1 - normalized_threshold)) - 1
+        fuzzy_res = base_items_index().best_match(item_name, score_cutoff=max(max_lev, 0))
+        if fuzzy_res is not None and fuzzy_res.match != item_name:
             if fuzzy_res.score_normalized > normalized_threshold and fuzzy_res.match in base_items():
                 Logger.debug(f"fuzzy_base_item_match: change {item_name} -> {fuzzy_res.match} (similarity: {fuzzy_res.score_normalized*100:.1f}%)")
                 return fuzzy_res.match
@@ -278,8 +290,7 @@ def normalize_name(name: str):
 
 
 def correct_name(name: str):
-    items = bases_by_name | consumables_by_name | gems_by_name | runes_by_name
-    return find_best_match(name, items).match
+    return correct_name_index.best_match(name).match
 
 
 load_lookup()
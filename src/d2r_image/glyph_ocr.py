@@ -0,0 +1,340 @@
+"""
+Template matching OCR for short texts in a fixed font and size, e.g. gold, skill charges and the experience bar.
+
+Glyphs are segmented by column projection of a binary mask and compared against glyph templates with one matrix
+product. Templates of the digits and separators are rendered from the font of the botty mod and shipped in
+GLYPH_TEMPLATES_PATH. Glyphs without a shipped template (letters, or text smaller than the rendered sizes) are learned
+per field from Tesseract fallbacks, but only once GLYPH_LEARN_AGREEMENT reads agree on them and never if they look like
+a glyph that is known under another character. Learned templates are saved to GLYPH_CACHE_DIR.
+"""
+import os
+import threading
+from dataclasses import dataclass, replace
+from functools import cache
+import cv2
+import numpy as np
+from logger import Logger
+
+GLYPH_TEMPLATES_PATH = "assets/glyphs/digits.npz"
+GLYPH_FONT_PATH = "assets/mods/botty/botty.mpq/data/hd/ui/fonts/exocetblizzardot-medium.otf"
+GLYPH_CHARSET = "0123456789,."
+GLYPH_DIGITS = "0123456789"
+# the templates are rendered at these font sizes, i.e. for digits 8 to 21 px high. Below that a 5 and a 6 are no
+# longer told apart reliably, smaller texts are read by Tesseract and their glyphs learned per field
+GLYPH_FONT_SIZES = range(13, 33)
+GLYPH_CACHE_DIR = "cache/glyphs"
+# bump when the learned templates are stored differently or have to be learned again
+GLYPH_CACHE_VERSION = 2
+# glyphs are scaled to this size (h, w) before comparing
+GLYPH_SIZE = (16, 12)
+# min correlation of every glyph with its template to accept a read
+GLYPH_MIN_SCORE = 0.9
+# only Tesseract reads with at least this mean confidence are learned from
+GLYPH_LEARN_MIN_CONFIDENCE = 80
+# number of Tesseract reads that have to agree on a glyph before it is stored as template
+GLYPH_LEARN_AGREEMENT = 3
+# glyphs with a higher correlation are the same glyph
+GLYPH_DUPLICATE_SCORE = 0.98
+GLYPH_MAX_TEMPLATES = 256
+GLYPH_MAX_CANDIDATES = 256
+# max difference of the log aspect ratio (w / h), of the height relative to the median glyph height of the text and of
+# the log median glyph height, see _features()
+GLYPH_MAX_SHAPE_DIFF = (0.3, 0.15, 0.15)
+# a gap between glyphs wider than this fraction of the median glyph height is a space
+GLYPH_SPACE_GAP = 0.85
+# column runs with fewer foreground pixels are noise
+GLYPH_MIN_PIXELS = 2
+
+
+@dataclass
+class GlyphStats:
+    reads: int = 0
+    fallbacks: int = 0
+    learned: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        return (self.reads - self.fallbacks) / self.reads if self.reads else 0.0
+
+
+@dataclass
+class _Glyph:
+    img: np.ndarray
+    space_before: bool
+
+
+@dataclass
+class _Templates:
+    labels: list[str]
+    # zero mean, unit length vectors of the scaled glyphs (n x h*w)
+    vectors: np.ndarray
+    # log aspect ratio, height relative to the median glyph height and log median glyph height (n x 3), see _features()
+    shapes: np.ndarray
+
+    @staticmethod
+    def empty() -> "_Templates":
+        return _Templates([], np.empty((0, GLYPH_SIZE[0] * GLYPH_SIZE[1]), dtype=np.float32), np.empty((0, 3), dtype=np.float32))
+
+    def __add__(self, other: "_Templates") -> "_Templates":
+        return _Templates(self.labels + other.labels, np.vstack([self.vectors, other.vectors]), np.vstack([self.shapes, other.shapes]))
+
+    def take(self, indices: list[int]) -> "_Templates":
+        return _Templates([self.labels[i] for i in indices], self.vectors[indices], self.shapes[indices])
+
+    def scores(self, vectors: np.ndarray, shapes: np.ndarray) -> np.ndarray:
+        """
+        :return: correlation of every glyph with every template (glyphs x templates), -1 for templates of another shape
+        """
+        scores = vectors @ self.vectors.T
+        shape_diff = np.abs(shapes[:, None, :] - self.shapes[None, :, :])
+        scores[(shape_diff > GLYPH_MAX_SHAPE_DIFF).any(axis=2)] = -1.0
+        return scores
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f"{path}.tmp", "wb") as f:
+            np.savez_compressed(f, labels=np.array(self.labels, dtype=str), vectors=self.vectors, shapes=self.shapes)
+        os.replace(f"{path}.tmp", path)
+
+    @staticmethod
+    def load(path: str) -> "_Templates":
+        with np.load(path) as data:
+            return _Templates([str(label) for label in data["labels"]], data["vectors"].astype(np.float32), data["shapes"].astype(np.float32))
+
+
+def _segment(mask: np.ndarray) -> list[_Glyph]:
+    cols = np.flatnonzero(mask.any(axis=0))
+    if not len(cols):
+        return []
+    # split the columns with foreground into runs of adjacent columns
+    breaks = np.flatnonzero(np.diff(cols) > 1)
+    starts = np.r_[cols[0], cols[breaks + 1]]
+    ends = np.r_[cols[breaks], cols[-1]] + 1
+    runs = []
+    for start, end in zip(starts, ends):
+        glyph = mask[:, start:end]
+        if np.count_nonzero(glyph) < GLYPH_MIN_PIXELS:
+            continue
+        glyph_rows = np.flatnonzero(glyph.any(axis=1))
+        runs.append((start, end, glyph[glyph_rows[0]:glyph_rows[-1] + 1]))
+    if not runs:
+        return []
+    space_gap = GLYPH_SPACE_GAP * np.median([img.shape[0] for _, _, img in runs])
+    return [
+        _Glyph(img=img, space_before=i > 0 and start - runs[i - 1][1] > space_gap)
+        for i, (start, _, img) in enumerate(runs)
+    ]
+
+def _features(glyphs: list[_Glyph], ref_height: float = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    :param ref_height: height the glyph heights are relative to, default is the median glyph height
+    :return: zero mean, unit length vectors of the scaled glyphs (n x h*w) and their shapes (n x 3): log aspect ratio,
+        height relative to ref_height and log ref_height. Only the last one depends on the font size, it tells apart
+        glyphs that are too small to differ in anything else, like a dot and a comma
+    """
+    vectors = np.empty((len(glyphs), GLYPH_SIZE[0] * GLYPH_SIZE[1]), dtype=np.float32)
+    for i, glyph in enumerate(glyphs):
+        # with a border, small filled glyphs like dots are not a constant image
+        img = np.pad(glyph.img.astype(np.float32), 1)
+        vectors[i] = cv2.resize(img, GLYPH_SIZE[::-1], interpolation=cv2.INTER_AREA).ravel()
+    vectors -= vectors.mean(axis=1, keepdims=True)
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-6)
+    sizes = np.array([glyph.img.shape for glyph in glyphs], dtype=np.float32).reshape(-1, 2)
+    ref_height = np.median(sizes[:, 0]) if ref_height is None else ref_height
+    ref_height = max(ref_height, 1)
+    shapes = np.stack([np.log(sizes[:, 1] / sizes[:, 0]), sizes[:, 0] / ref_height, np.full(len(glyphs), np.log(ref_height))], axis=1)
+    return vectors, shapes.astype(np.float32)
+
+@cache
+def shipped_templates(path: str = GLYPH_TEMPLATES_PATH) -> _Templates:
+    """
+    :return: The glyph templates rendered from the font of the botty mod, see render_templates()
+    """
+    try:
+        return _Templates.load(path)
+    except (OSError, KeyError, ValueError) as e:
+        Logger.warning(f"Could not load glyph templates {path}: {e}")
+        return _Templates.empty()
+
+def render_templates(font_sizes: range = GLYPH_FONT_SIZES, font_path: str = GLYPH_FONT_PATH, charset: str = GLYPH_CHARSET) -> _Templates:
+    """
+    Renders the glyph templates of charset at each font size, the heights are relative to the height of the digits.
+    Glyphs that do not come out as one column run at a size (e.g. a comma at small sizes) have no template of it.
+    Needs pillow, which is only used to build the shipped templates.
+    """
+    from PIL import Image, ImageDraw, ImageFont
+    templates = _Templates.empty()
+    for font_size in font_sizes:
+        font = ImageFont.truetype(font_path, font_size)
+        labels, glyphs = [], []
+        for char in charset:
+            img = Image.new("L", (font_size * 2, font_size * 2))
+            ImageDraw.Draw(img).text((font_size // 2, font_size // 2), char, font=font, fill=255)
+            if len(glyph := _segment(np.array(img) > 127)) == 1:
+                labels.append(char)
+                glyphs += glyph
+        digit_height = np.median([glyph.img.shape[0] for char, glyph in zip(labels, glyphs) if char.isdigit()])
+        templates = templates + _Templates(labels, *_features(glyphs, ref_height=digit_height))
+    return templates
+
+
+@dataclass(eq=False)
+class _Candidate:
+    # glyph a Tesseract read labeled, stored as template once GLYPH_LEARN_AGREEMENT reads agree
+    label: str
+    vector: np.ndarray
+    shape: np.ndarray
+    votes: int = 1
+
+
+class GlyphReader:
+    def __init__(self, name: str, cache_dir: str = GLYPH_CACHE_DIR, templates_path: str = GLYPH_TEMPLATES_PATH):
+        """
+        :param name: field name, each field learns its own templates since font and size differ between fields
+        :param cache_dir: directory the learned templates are stored in. None = keep them in memory only
+        :param templates_path: shipped templates, see shipped_templates(). None = only use learned templates
+        """
+        self.name = name
+        self._path = os.path.join(cache_dir, f"{name}_v{GLYPH_CACHE_VERSION}.npz") if cache_dir else None
+        self._shipped = shipped_templates(templates_path) if templates_path else _Templates.empty()
+        self._learned = _Templates.empty()
+        self._candidates: list[_Candidate] = []
+        self._lock = threading.Lock()
+        self._load()
+        self._templates = self._shipped + self._learned
+
+    def _load(self):
+        if self._path is None or not os.path.exists(self._path):
+            return
+        try:
+            self._learned = _Templates.load(self._path)
+        except (OSError, KeyError, ValueError) as e:
+            Logger.warning(f"Could not load glyph templates {self._path}: {e}")
+
+    def _save(self):
+        if self._path is None:
+            return
+        try:
+            self._learned.save(self._path)
+        except OSError as e:
+            Logger.warning(f"Could not save glyph templates {self._path}: {e}")
+
+    def read(self, mask: np.ndarray, charset: str = None) -> tuple[str, float] | None:
+        """
+        :param mask: binary image of the text, foreground != 0
+        :param charset: only match the templates of these characters, None = all templates
+        :return: text and the lowest glyph score, None if nothing to read or no templates
+        """
+        glyphs = _segment(mask)
+        with self._lock:
+            templates = self._templates
+        if charset is not None:
+            templates = templates.take([i for i, label in enumerate(templates.labels) if label in charset])
+        if not glyphs or not templates.labels:
+            return None
+        scores = templates.scores(*_features(glyphs))
+        best = scores.argmax(axis=1)
+        text = "".join((" " if glyph.space_before else "") + templates.labels[idx] for glyph, idx in zip(glyphs, best))
+        return text, float(scores[np.arange(len(best)), best].min())
+
+    def _vote(self, label: str, vector: np.ndarray, shape: np.ndarray, voted: set[int]) -> bool:
+        # returns True once enough reads agree on the glyph
+        same = [
+            candidate for candidate in self._candidates
+            if np.all(np.abs(candidate.shape - shape) <= GLYPH_MAX_SHAPE_DIFF)
+            and candidate.vector @ vector >= GLYPH_DUPLICATE_SCORE
+        ]
+        if any(candidate.label != label for candidate in same):
+            # reads disagree about this glyph, none of them is trusted
+            self._candidates = [candidate for candidate in self._candidates if candidate not in same]
+            return False
+        if not same:
+            same = [_Candidate(label, vector, shape, votes=0)]
+            self._candidates.append(same[0])
+            del self._candidates[:-GLYPH_MAX_CANDIDATES]
+        candidate = same[0]
+        # glyphs that occur several times in a text are one vote
+        if id(candidate) not in voted:
+            voted.add(id(candidate))
+            candidate.votes += 1
+        if candidate.votes < GLYPH_LEARN_AGREEMENT:
+            return False
+        self._candidates.remove(candidate)
+        return True
+
+    def learn(self, mask: np.ndarray, text: str) -> int:
+        """
+        Counts the glyphs of mask as read as the characters of text, if the segmentation agrees with text. Glyphs are
+        stored as templates once GLYPH_LEARN_AGREEMENT reads agreed on them.
+        :param mask: binary image of the text, foreground != 0
+        :param text: text read by Tesseract
+        :return: number of new templates
+        """
+        glyphs = _segment(mask)
+        words = text.split()
+        # same number of glyphs per word, i.e. no touching or broken glyphs and spaces where the text has them
+        glyph_words = []
+        for glyph in glyphs:
+            if glyph.space_before or not glyph_words:
+                glyph_words.append(0)
+            glyph_words[-1] += 1
+        if not glyphs or glyph_words != [len(word) for word in words]:
+            return 0
+        labels = list("".join(words))
+        vectors, shapes = _features(glyphs)
+        with self._lock:
+            known = np.array(self._templates.labels)
+            scores = self._templates.scores(vectors, shapes)
+            # a glyph that looks like a known glyph of another character, the read is wrong
+            if any(((scores[i] >= GLYPH_MIN_SCORE) & (known != label)).any() for i, label in enumerate(labels)):
+                return 0
+            new = []
+            voted = set()
+            for i, label in enumerate(labels):
+                if ((scores[i] >= GLYPH_DUPLICATE_SCORE) & (known == label)).any():
+                    continue
+                if len(self._learned.labels) + len(new) >= GLYPH_MAX_TEMPLATES:
+                    break
+                if self._vote(label, vectors[i], shapes[i], voted):
+                    new.append(i)
+            if new:
+                self._learned = self._learned + _Templates(labels, vectors, shapes).take(new)
+                self._templates = self._shipped + self._learned
+                self._save()
+        return len(new)
+
+
+_readers: dict[str, GlyphReader] = {}
+_stats = GlyphStats()
+_lock = threading.Lock()
+
+def get_reader(name: str) -> GlyphReader:
+    with _lock:
+        if (reader := _readers.get(name)) is None:
+            reader = _readers[name] = GlyphReader(name, GLYPH_CACHE_DIR, GLYPH_TEMPLATES_PATH)
+        return reader
+
+def count(fallback: bool, learned: int = 0):
+    with _lock:
+        _stats.reads += 1
+        _stats.fallbacks += fallback
+        _stats.learned += learned
+
+def glyph_stats(reset: bool = False) -> GlyphStats:
+    """
+    :param reset: Start counting from zero again after returning the current counts
+    :return: Fixed font reads, how many of them needed Tesseract and the number of glyph templates learned from that
+    """
+    global _stats
+    with _lock:
+        stats = _stats
+        if reset:
+            _stats = GlyphStats()
+        return replace(stats)
+
+
+# Render the shipped glyph templates: PYTHONPATH=./src python src/d2r_image/glyph_ocr.py
+if __name__ == "__main__":
+    templates = render_templates()
+    templates.save(GLYPH_TEMPLATES_PATH)
+    print(f"Saved {len(templates.labels)} glyph templates to {GLYPH_TEMPLATES_PATH}")
@@ -0,0 +1,120 @@
+"""
+Keeps the item name clusters of the ground loot between screenshots, so only new or changed labels are OCR'd.
+
+The labels only move with the camera, i.e. all by the same offset. The offset between two screenshots is found by
+phase correlation, then every cluster of the new screenshot is matched against the previous clusters of the same
+color at the shifted position and, if the two crops look the same, takes over the previous OCR result.
+"""
+from dataclasses import dataclass, replace
+import cv2
+import numpy as np
+from d2r_image.data_models import ItemText
+from d2r_image.processing_helpers import clean_img, read_text_clusters, text_clusters
+
+# phase correlation runs on screenshots scaled by this factor
+TRACKER_SCALE = 0.5
+# shifts with a lower phase correlation response are not trusted, all clusters are read again
+TRACKER_MIN_RESPONSE = 0.05
+# max difference in px of position and size between a cluster and the shifted previous cluster
+TRACKER_POSITION_TOLERANCE = 3
+# min normalized correlation of the two cluster crops to reuse the previous OCR result
+TRACKER_MIN_SIMILARITY = 0.98
+
+
+@dataclass
+class TrackerStats:
+    clusters: int = 0
+    reused: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.reused / self.clusters if self.clusters else 0.0
+
+
+def _similarity(prev: np.ndarray, cur: np.ndarray) -> float:
+    # the previous crop without a margin of the position tolerance, slid over the current crop
+    margin = TRACKER_POSITION_TOLERANCE
+    template = prev[margin:prev.shape[0] - margin, margin:prev.shape[1] - margin]
+    if template.shape[0] < 1 or template.shape[1] < 1 or template.shape[0] > cur.shape[0] or template.shape[1] > cur.shape[1]:
+        return 0.0
+    scores = np.nan_to_num(cv2.matchTemplate(cur, template, cv2.TM_CCOEFF_NORMED), nan=0.0)
+    return float(scores.max())
+
+
+class GroundLootTracker:
+    def __init__(self):
+        self._gray: np.ndarray = None
+        self._window: np.ndarray = None
+        self._clusters: list[ItemText] = []
+        self._stats = TrackerStats()
+
+    def reset(self):
+        """
+        Forgets the previous screenshot, e.g. when the character left the area
+        """
+        self._gray = None
+        self._clusters = []
+
+    def _shift(self, gray: np.ndarray) -> tuple[float, float] | None:
+        # (dx, dy) of the content from the previous screenshot to gray, None if unknown
+        if self._gray is None or self._gray.shape != gray.shape:
+            return None
+        if self._window is None or self._window.shape != gray.shape:
+            self._window = cv2.createHanningWindow(gray.shape[::-1], cv2.CV_32F)
+        (dx, dy), response = cv2.phaseCorrelate(self._gray, gray, self._window)
+        if response < TRACKER_MIN_RESPONSE:
+            return None
+        return dx / TRACKER_SCALE, dy / TRACKER_SCALE
+
+    def _match(self, cluster: ItemText, shift: tuple[float, float], used: set[int]) -> ItemText | None:
+        x, y, w, h = cluster.roi
+        best, best_score = None, TRACKER_MIN_SIMILARITY
+        for idx, prev in enumerate(self._clusters):
+            px, py, pw, ph = prev.roi
+            if idx in used or prev.color != cluster.color:
+                continue
+            if max(abs(px + shift[0] - x), abs(py + shift[1] - y), abs(pw - w), abs(ph - h)) > TRACKER_POSITION_TOLERANCE:
+                continue
+            if (score := _similarity(prev.clean_img, cluster.clean_img)) >= best_score:
+                best, best_score = idx, score
+        if best is None:
+            return None
+        used.add(best)
+        return self._clusters[best]
+
+    def crop_text_clusters(self, inp_img: np.ndarray, padding_y: int = 5) -> list[ItemText]:
+        """
+        Same as processing_helpers.crop_text_clusters(), but clusters that were already read on the previous
+        screenshot keep their OCR result.
+        :param inp_img: screenshot
+        :param padding_y: rows added above and below each cluster
+        :return: item name clusters with their OCR results
+        """
+        cleaned_img = clean_img(inp_img)
+        item_clusters = text_clusters(inp_img, cleaned_img, padding_y)
+        gray = cv2.resize(cv2.cvtColor(cleaned_img, cv2.COLOR_BGR2GRAY), None, fx=TRACKER_SCALE, fy=TRACKER_SCALE, interpolation=cv2.INTER_AREA).astype(np.float32)
+        to_read = item_clusters
+        if (shift := self._shift(gray)) is not None:
+            to_read = []
+            used = set()
+            for cluster in item_clusters:
+                if (prev := self._match(cluster, shift, used)) is not None:
+                    cluster.ocr_result = prev.ocr_result
+                else:
+                    to_read.append(cluster)
+        read_text_clusters(to_read)
+        self._gray = gray
+        self._clusters = item_clusters
+        self._stats.clusters += len(item_clusters)
+        self._stats.reused += len(item_clusters) - len(to_read)
+        return item_clusters
+
+    def stats(self, reset: bool = False) -> TrackerStats:
+        """
+        :param reset: Start counting from zero again after returning the current counts
+        :return: Clusters seen and how many of them reused the OCR result of the previous screenshot
+        """
+        stats = replace(self._stats)
+        if reset:
+            self._stats = TrackerStats()
+        return stats
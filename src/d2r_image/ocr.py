@@ -1,11 +1,202 @@
 from tesserocr import PyTessBaseAPI, OEM
 import numpy as np
 import cv2
-from utils.misc import erode_to_black, find_best_match
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from utils.misc import erode_to_black
+from d2r_image import glyph_ocr
 from d2r_image.data_models import OcrResult
 from d2r_image.ocr_data import ERROR_RESOLUTION_MAP, I_1, II_U, ONE_I, ONEONE_U
-from d2r_image.strings_store import all_words
+from d2r_image.strings_store import all_words_index
+from utils.fuzzy_index import FuzzyIndex
 from logger import Logger
+from utils import replay
+
+# Creating a Tesseract handle loads the model, so handles are kept in a pool per (model, psm, word_list, digits_only)
+OCR_POOL_MAX_IDLE = 4
+OCR_WARM_UP_KEYS = [
+    ("ground-eng_inconsolata_inv_th_fast", 7, "assets/word_lists/all_words.txt", False),
+    ("hover-eng_inconsolata_inv_th_fast", 6, "assets/word_lists/all_words.txt", False),
+]
+_DIGITS_ONLY_VARIABLES = {
+    "tessedit_char_blacklist": ".,!?@#$%&*()<>_-+=/:;'\"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz",
+    "tessedit_char_whitelist": "0123456789",
+    "classify_bln_numeric_mode": "1",
+}
+
+class _TessPool:
+    def __init__(self, max_idle: int):
+        self._max_idle = max_idle
+        self._idle: dict[tuple, list[PyTessBaseAPI]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _create(key: tuple) -> PyTessBaseAPI:
+        model, psm, word_list, digits_only = key
+        api = PyTessBaseAPI(psm=psm, oem=OEM.LSTM_ONLY, path=f"assets/tessdata", lang=model)
+        api.ReadConfigFile("assets/tessdata/ocr_config.txt")
+        if word_list:
+            api.SetVariable("user_words_file", word_list)
+        # digits_only is part of the key, so these never have to be reset on a pooled handle
+        if digits_only:
+            for name, value in _DIGITS_ONLY_VARIABLES.items():
+                api.SetVariable(name, value)
+        return api
+
+    @contextmanager
+    def acquire(self, key: tuple):
+        """
+        Hands out an idle handle for key or creates a new one. Each handle is only used by one thread at a time.
+        :param key: (model, psm, word_list, digits_only)
+        """
+        with self._lock:
+            idle = self._idle.get(key)
+            api = idle.pop() if idle else None
+        if api is None:
+            api = self._create(key)
+        try:
+            yield api
+        finally:
+            # drop image and recognition results of this use
+            api.Clear()
+            with self._lock:
+                idle = self._idle.setdefault(key, [])
+                if len(idle) < self._max_idle:
+                    idle.append(api)
+                    api = None
+            if api is not None:
+                api.End()
+
+    def warm_up(self, keys: list[tuple]):
+        for key in keys:
+            with self.acquire(key):
+                pass
+
+_tess_pool = _TessPool(OCR_POOL_MAX_IDLE)
+
+def warm_up(keys: list[tuple] = OCR_WARM_UP_KEYS):
+    """
+    Creates Tesseract handles for the commonly used OCR settings, so the first OCR during a run does not pay for model loading.
+    :param keys: list of (model, psm, word_list, digits_only)
+    """
+    _tess_pool.warm_up(keys)
+
+# Below this many images the inter-process overhead costs more than the parallel OCR saves
+OCR_PARALLEL_MIN_IMAGES = 4
+
+_process_pool: ProcessPoolExecutor | None = None
+_process_pool_workers = 0
+_process_pool_lock = threading.Lock()
+
+def _get_process_pool(workers: int) -> ProcessPoolExecutor:
+    global _process_pool, _process_pool_workers
+    with _process_pool_lock:
+        if _process_pool is None or _process_pool_workers != workers:
+            if _process_pool is not None:
+                _process_pool.shutdown(wait=False)
+            # every worker process keeps its own tesseract handles in its own _tess_pool
+            _process_pool = ProcessPoolExecutor(max_workers=workers, initializer=warm_up)
+            _process_pool_workers = workers
+        return _process_pool
+
+def start_workers(workers: int):
+    """
+    Starts the OCR worker processes ahead of the first parallel image_to_text() call.
+    :param workers: number of worker processes, see image_to_text()
+    """
+    if workers > 1:
+        pool = _get_process_pool(workers)
+        for _ in range(workers):
+            pool.submit(int)
+
+def shutdown_workers():
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False, cancel_futures=True)
+            _process_pool = None
+
+def _recognize_parallel(images: list[np.ndarray], workers: int, params: tuple) -> list[OcrResult] | None:
+    # contiguous shards, one per worker, so results can simply be concatenated in order
+    shard_size = -(-len(images) // workers)
+    shards = [images[i:i + shard_size] for i in range(0, len(images), shard_size)]
+    try:
+        pool = _get_process_pool(workers)
+        return [result for shard in pool.map(_recognize, shards, [params] * len(shards)) for result in shard]
+    except (BrokenProcessPool, OSError) as e:
+        Logger.warning(f"Parallel OCR failed ({e}), falling back to serial OCR")
+        shutdown_workers()
+        return None
+
+# Pickit reads the same labels again after every pickup, results are cached per preprocessed crop
+OCR_CACHE_SIZE = 512
+
+@dataclass
+class OcrCacheStats:
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / (self.hits + self.misses) if self.hits + self.misses else 0.0
+
+class _OcrCache:
+    """
+    LRU of OCR results. The key contains a hash of the crop after preprocessing (thresholded, cropped and padded),
+    so crops that only differ below the threshold share an entry, plus all parameters that change the text.
+    """
+    def __init__(self, size: int):
+        self._size = size
+        self._entries: OrderedDict[tuple, OcrResult] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = OcrCacheStats()
+
+    @staticmethod
+    def key(processed_img: np.ndarray, params: tuple) -> tuple:
+        digest = hashlib.blake2b(np.ascontiguousarray(processed_img).data, digest_size=16).digest()
+        return (digest, processed_img.shape, processed_img.dtype.str, params)
+
+    def get(self, key: tuple) -> OcrResult | None:
+        with self._lock:
+            if (result := self._entries.get(key)) is None:
+                self._stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats.hits += 1
+            return replace(result)
+
+    def put(self, key: tuple, result: OcrResult):
+        with self._lock:
+            self._entries[key] = replace(result)
+            if len(self._entries) > self._size:
+                self._entries.popitem(last=False)
+
+    def stats(self, reset: bool = False) -> OcrCacheStats:
+        with self._lock:
+            stats = self._stats
+            if reset:
+                self._stats = OcrCacheStats()
+            return replace(stats)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+_ocr_cache = _OcrCache(OCR_CACHE_SIZE)
+
+def ocr_cache_stats(reset: bool = False) -> OcrCacheStats:
+    """
+    :param reset: Start counting from zero again after returning the current counts
+    :return: Hits and misses of image_to_text() on already read crops
+    """
+    return _ocr_cache.stats(reset)
 
 def image_to_text(
     images: np.ndarray | list[np.ndarray],
@@ -21,6 +212,8 @@ def image_to_text(
     fix_regexps: bool = True,
     check_known_errors: bool = True,
     correct_words: bool = True,
+    workers: int = 1,
+    use_cache: bool = True,
 ) -> list[OcrResult]:
     """
     Uses Tesseract to read image(s)
@@ -39,43 +232,99 @@ def image_to_text(
     :param fix_regexps: use regex for various cases of common errors (I <-> 1, etc.)
     :param check_known_errors: check for predefined common errors and replace
     :param correct_words: check dictionary of words and match closest match
+    :param workers: number of worker processes to shard the images across. 1 = OCR all images in this process
+    :param use_cache: return the stored result for crops that were already read with the same parameters
     :return: Returns an OcrResult object
     """
     if type(images) == np.ndarray:
         images = [images]
-    results = []
+    processed_imgs = [_preprocess(image, scale, erode, crop_pad, threshold, invert) for image in images]
+    params = (model, psm, word_list, digits_only, fix_regexps, check_known_errors, correct_words)
+    results = [None] * len(images)
+    if use_cache:
+        keys = [_OcrCache.key(processed_img, params) for processed_img in processed_imgs]
+        results = [_ocr_cache.get(key) for key in keys]
+    todo = [i for i, result in enumerate(results) if result is None]
+    todo_imgs = [processed_imgs[i] for i in todo]
+    recognized = None
+    if workers > 1 and len(todo) >= OCR_PARALLEL_MIN_IMAGES:
+        recognized = _recognize_parallel(todo_imgs, min(workers, len(todo)), params)
+    if recognized is None:
+        recognized = _recognize(todo_imgs, params)
+    for i, result in zip(todo, recognized):
+        results[i] = result
+        if use_cache:
+            _ocr_cache.put(keys[i], result)
+    for result in results:
+        replay.record_decision("ocr", model=model, text=result.text, mean_confidence=result.mean_confidence)
+    return results
 
-    with PyTessBaseAPI(psm=psm, oem=OEM.LSTM_ONLY, path=f"assets/tessdata", lang=model ) as api:
-        api.ReadConfigFile("assets/tessdata/ocr_config.txt")
-        if word_list:
-            api.SetVariable("user_words_file", word_list)
+
+def image_to_text_fixed_font(field: str, image: np.ndarray, **kwargs) -> OcrResult:
+    """
+    Reads a short single line text in a fixed font (gold, skill charges, experience) by matching glyph templates,
+    see d2r_image.glyph_ocr. Falls back to image_to_text() if a glyph is not known well enough and learns unknown glyphs
+    once enough of its results agree on them.
+    :param field: name of the ui field, glyph templates are kept per field
+    :param image: image or binary mask of the text
+    :param kwargs: image_to_text() parameters for the fallback. threshold is also used to binarize the image for glyph matching,
+        with digits_only only the digit templates are matched and reads with other characters fall back to image_to_text()
+    :return: Returns an OcrResult object
+    """
+    if image.ndim == 2:
+        mask = image > 0
+    else:
+        mask = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) > kwargs.get("threshold", 25)
+    reader = glyph_ocr.get_reader(field)
+    # like the Tesseract whitelist, digits_only reads must not contain separators or spaces
+    charset = glyph_ocr.GLYPH_DIGITS if kwargs.get("digits_only") else None
+    read = reader.read(mask, charset)
+    if read is not None and read[1] >= glyph_ocr.GLYPH_MIN_SCORE and (charset is None or read[0].isdigit()):
+        glyph_ocr.count(fallback=False)
+        text, score = read
+        replay.record_decision("ocr", model=f"glyphs-{field}", text=text, mean_confidence=score * 100)
+        return OcrResult(text=text, original_text=text, word_confidences=[score * 100] * len(text.split()), mean_confidence=score * 100)
+    result = image_to_text(image, **kwargs)[0]
+    learned = 0
+    if result.mean_confidence is not None and result.mean_confidence >= glyph_ocr.GLYPH_LEARN_MIN_CONFIDENCE:
+        learned = reader.learn(mask, result.text.strip())
+    glyph_ocr.count(fallback=True, learned=learned)
+    return result
+
+
+def _preprocess(image: np.ndarray, scale: float, erode: bool, crop_pad: bool, threshold: int, invert: bool) -> np.ndarray:
+    processed_img = image
+    if scale:
+        processed_img = cv2.resize(
+            processed_img, None, fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR)
+    if erode:
+        processed_img = erode_to_black(processed_img)
+    if crop_pad:
+        processed_img = _crop_pad(processed_img)
+    image_is_binary = (image.shape[2] if len(
+        image.shape) == 3 else 1) == 1 and image.dtype == bool
+    if not image_is_binary and threshold:
+        processed_img = cv2.cvtColor(processed_img, cv2.COLOR_BGR2GRAY)
+        processed_img = cv2.threshold(
+            processed_img, threshold, 255, cv2.THRESH_BINARY)[1]
+    if invert:
+        if threshold or image_is_binary:
+            processed_img = cv2.bitwise_not(processed_img)
+        else:
+            processed_img = ~processed_img
+    return processed_img
+
+
+def _recognize(processed_imgs: list[np.ndarray], params: tuple) -> list[OcrResult]:
+    # runs in the ocr worker processes as well, see _recognize_parallel()
+    model, psm, word_list, digits_only, fix_regexps, check_known_errors, correct_words = params
+    results = []
+    if not processed_imgs:
+        return results
+    with _tess_pool.acquire((model, psm, word_list, digits_only)) as api:
         #api.SetSourceResolution(72 * scale)
-        for image in images:
-            processed_img = image
-            if scale:
-                processed_img = cv2.resize(
-                    processed_img, None, fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR)
-            if erode:
-                processed_img = erode_to_black(processed_img)
-            if crop_pad:
-                processed_img = _crop_pad(processed_img)
-            image_is_binary = (image.shape[2] if len(
-                image.shape) == 3 else 1) == 1 and image.dtype == bool
-            if not image_is_binary and threshold:
-                processed_img = cv2.cvtColor(processed_img, cv2.COLOR_BGR2GRAY)
-                processed_img = cv2.threshold(
-                    processed_img, threshold, 255, cv2.THRESH_BINARY)[1]
-            if invert:
-                if threshold or image_is_binary:
-                    processed_img = cv2.bitwise_not(processed_img)
-                else:
-                    processed_img = ~processed_img
+        for processed_img in processed_imgs:
             api.SetImageBytes(*_img_to_bytes(processed_img))
-            if digits_only:
-                api.SetVariable("tessedit_char_blacklist",
-                                ".,!?@#$%&*()<>_-+=/:;'\"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz")
-                api.SetVariable("tessedit_char_whitelist", "0123456789")
-                api.SetVariable("classify_bln_numeric_mode", "1")
             original_text = api.GetUTF8Text()
             text = original_text
             # replace newlines if image is a single line
@@ -95,7 +344,7 @@ def image_to_text(
                 word_confidences=word_confidences,
                 mean_confidence=api.MeanTextConf()
             ))
-        return results
+    return results
 
 
 def _crop_pad(image: np.ndarray = None):
@@ -124,104 +373,54 @@ def _img_to_bytes(image: np.ndarray, colorspace: str = 'BGR'):
     return image.tobytes(), width, height, bytes_per_pixel, bytes_per_line
 
 
-def _fix_regexps(ocr_output: str, repeat_count: int = 0) -> str:
+# _fix_regexps() never looks across whitespace, so it works on whitespace separated tokens
+_TOKEN_SPLIT = re.compile(r"(\s+)")
+# single characters that are read as a digit when they stand alone
+_SOLITARY_DIGITS = {"I": "1", "O": "0", "S": "5"}
+
+@lru_cache(maxsize=4096)
+def _fix_token(token: str) -> str:
     # case: two 1's within a string; e.g., "SIIPER MANA POTION"
-    try:
-        text = II_U.sub('U', ocr_output)
-    except:
-        # logging.error(f"Error _II_ -> _U_ on {ocr_output}")
-        text = ocr_output
+    token = II_U.sub('U', token)
     # case: two 1's within a string; e.g., "S11PER MANA POTION"
-    try:
-        text = ONEONE_U.sub('U', text)
-    except:
-        # logging.error(f"Error _11_ -> _U_ on {ocr_output}")
-        pass
+    token = ONEONE_U.sub('U', token)
     # case: an I within a number or by a sign; e.g., "+32I to mana attack rating"
-    try:
-        text = I_1.sub('1', text)
-    except:
-        # logging.error(f"Error I -> 1 on {ocr_output}")
-        pass
+    token = I_1.sub('1', token)
     # case: a 1 within a string; e.g., "W1RT'S LEG"
-    try:
-        text = ONE_I.sub('I', text)
-    except:
-        # logging.error(f"Error 1 -> I on {ocr_output}")
-        pass
-    # case: a solitary I; e.g., " I TO 5 DEFENSE"
-    cnt = 0
-    while True:
-        cnt += 1
-        if cnt > 30:
-            # logging.error(f"Error ' I ' -> ' 1 ' on {ocr_output}")
-            break
-        if " I " in text:
-            text = text.replace(" I ", " 1 ")
-            continue
-        elif ' I\n' in text:
-            text = text.replace(' I\n', ' 1\n')
-            continue
-        elif '\nI ' in text:
-            text = text.replace('\nI ', '\n1 ')
-            continue
-        break
-    # case: a solitary S; e.g., " 1 TO S DEFENSE"
-    cnt = 0
-    while True:
-        cnt += 1
-        if cnt > 30:
-            # logging.error(f"Error ' S ' -> ' 5 ' on {ocr_output}")
-            break
-        if " S " in text:
-            text = text.replace(" S ", " 5 ")
-            continue
-        elif ' I\n' in text:
-            text = text.replace(' S\n', ' 5\n')
-            continue
-        elif '\nI ' in text:
-            text = text.replace('\nS ', '\n5 ')
-            continue
-        break
-    # case: a solitary O; e.g., " O TO 5 DEFENSE"
-    cnt = 0
-    while True:
-        cnt += 1
-        if cnt > 30:
-            # logging.error(f"Error ' I ' -> ' 1 ' on {ocr_output}")
-            break
-        if (pattern := " O ") in text:
-            text = text.replace(pattern, " 0 ")
-            continue
-        elif (pattern := ' O\n') in text:
-            text = text.replace(pattern, ' 0\n')
-            continue
-        elif (pattern := '\nO ') in text:
-            text = text.replace(pattern, '\n0 ')
-            continue
-        break
+    token = ONE_I.sub('I', token)
     # case: consecutive I's; e.g., "DEFENSE: II"
-    repeat = False
-    cnt = 0
-    while "II" in text:
-        cnt += 1
-        if cnt > 30:
-            # logging.error(f"Error 4 on {ocr_output}")
-            break
-        text = text.replace("II", "11")
-        repeat = True
-        repeat_count += 1
-    if repeat and repeat_count < 10:
-        _fix_regexps(text)
-    return text
+    return token.replace("II", "11")
+
+def _is_solitary(char: str, left: str, right: str) -> bool:
+    # case: a solitary I or O; e.g., " I TO 5 DEFENSE", between two spaces or a space and a line break
+    # case: a solitary S; e.g., " 1 TO S DEFENSE", only between two spaces
+    if char == "S":
+        return left == " " and right == " "
+    return (left == " " and right in " \n") or (left == "\n" and right == " ")
+
+def _fix_regexps(ocr_output: str) -> str:
+    """
+    Fixes common misreads between I, 1, U, O, 0, S and 5 in one pass over the tokens of the text. Tokens are cached,
+    item labels and tooltips repeat the same words over and over.
+    :param ocr_output: text as read by Tesseract
+    :return: corrected text
+    """
+    parts = _TOKEN_SPLIT.split(ocr_output)
+    # parts alternate between tokens (even indices) and the whitespace between them
+    for i in range(0, len(parts), 2):
+        token = _fix_token(parts[i])
+        if token in _SOLITARY_DIGITS and 0 < i < len(parts) - 1 and _is_solitary(token, parts[i-1][-1], parts[i+1][0]):
+            token = _SOLITARY_DIGITS[token]
+        parts[i] = token
+    return "".join(parts)
 
 
 def _check_known_errors(text):
     for word in text.split():
-        for key in ERROR_RESOLUTION_MAP:
-            if key == word:
-                text = text.replace(key, ERROR_RESOLUTION_MAP[key])
-                Logger.debug(f"_check_known_errors: {key} -> {ERROR_RESOLUTION_MAP[key]}")
+        # keys are only found as whole words, but all occurrences of a found key are replaced
+        if (fix := ERROR_RESOLUTION_MAP.get(word)) is not None:
+            text = text.replace(word, fix)
+            Logger.debug(f"_check_known_errors: {word} -> {fix}")
     return text
 
 def _contains_characters(word):
@@ -230,9 +429,11 @@ def _contains_characters(word):
 def _ocr_result_dictionary_check(
     original_text: str,
     confidences: list,
-    word_list: set = all_words(),
+    word_list: FuzzyIndex = None,
     normalized_lev_threshold: float = 0.6
     ) -> str:
+    if word_list is None:
+        word_list = all_words_index()
     confidences = [x/100 for x in confidences]
     words_by_lines = [line.strip().split() for line in original_text.splitlines()]
     total_word_count = -1
@@ -261,7 +462,7 @@ def _ocr_result_dictionary_check(
                 result = saved_result
                 saved_result = ""
             else:
-                result = find_best_match(word, list(word_list))
+                result = word_list.best_match(word)
             # if the word is the last word on the line don't lookahead
             if word_cnt == (len(line) - 1):
                 if result.score_normalized >= normalized_lev_threshold:
@@ -281,8 +482,8 @@ def _ocr_result_dictionary_check(
                     new_line.append(word)
                 continue
             # fuzzy match the next word and a combination of both current and next words
-            next_result = find_best_match(next_word, list(word_list))
-            combined_result = find_best_match(f"{word} {next_word}", list(word_list))
+            next_result = word_list.best_match(next_word)
+            combined_result = word_list.best_match(f"{word} {next_word}")
             if combined_result.score < (result.score + next_result.score):
                 # combined lev score is superior to sum of individual lev scores, replace with combined string
                 skip_next = True
@@ -5,6 +5,7 @@ import cv2
 import numpy as np
 from d2r_image.data_models import GroundItemList, HoveredItem, ItemQuality, ItemText
 from d2r_image.bnip_helpers import parse_item
+from d2r_image.ground_loot_tracker import GroundLootTracker
 
 from d2r_image.processing_helpers import build_d2_items, crop_text_clusters, crop_item_tooltip, get_items_by_quality, consolidate_clusters, find_base_and_remove_items_without_a_base, set_set_and_unique_base_items
 import numpy as np
@@ -15,8 +16,14 @@ import os
 
 os.makedirs("./log/screenshots/info", exist_ok=True)
 
-def get_ground_loot(image: np.ndarray, consolidate: bool = False) -> GroundItemList | None:
-    crop_result = crop_text_clusters(image)
+def get_ground_loot(image: np.ndarray, consolidate: bool = False, tracker: GroundLootTracker = None) -> GroundItemList | None:
+    """
+    :param image: screenshot with the item labels shown
+    :param consolidate: merge item names that were split into several clusters
+    :param tracker: reuses the OCR results of labels that were already read on its previous screenshot
+    :return: items on the ground
+    """
+    crop_result = tracker.crop_text_clusters(image) if tracker is not None else crop_text_clusters(image)
     items_by_quality = get_items_by_quality(crop_result)
     if consolidate:
         consolidate_clusters(items_by_quality)
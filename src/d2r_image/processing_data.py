@@ -8,6 +8,12 @@ EXPECTED_HEIGHT_RANGE = [round(num) for num in [x / 1.5 for x in [14, 40]]]
 EXPECTED_WIDTH_RANGE = [round(num) for num in [x / 1.5 for x in [60, 1280]]]
 BOX_EXPECTED_WIDTH_RANGE = [200, 900]
 BOX_EXPECTED_HEIGHT_RANGE = [24, 710]
+# tooltip lines: rows with a channel above the ocr threshold, bands lower than TOOLTIP_MIN_LINE_HEIGHT are noise
+TOOLTIP_TEXT_THRESHOLD = 25
+TOOLTIP_MIN_LINE_HEIGHT = 6
+TOOLTIP_LINE_PADDING = 4
+# lines parse_item() drops, nothing below them is needed
+TOOLTIP_FOOTER_TEXTS = ['SELL VALUE', 'COST']
 
 QUALITY_COLOR_MAP = {
     'white': ItemQuality.Normal,
@@ -4,8 +4,9 @@ import re
 import time
 import math
 import copy
+from typing import Callable
 
-from d2r_image.data_models import GroundItem, GroundItemList, ItemQuality, ItemQualityKeyword, ItemText
+from d2r_image.data_models import GroundItem, GroundItemList, ItemQuality, ItemQualityKeyword, ItemText, OcrResult
 from d2r_image.bnip_data import NTIP_ALIAS_QUALITY_MAP
 from d2r_image.bnip_helpers import basename_to_types
 from d2r_image.ocr import image_to_text
@@ -13,8 +14,9 @@ from d2r_image.processing_data import Runeword
 import d2r_image.d2data_lookup as d2data_lookup
 from d2r_image.d2data_lookup import fuzzy_base_item_match
 from d2r_image.processing_data import EXPECTED_HEIGHT_RANGE, EXPECTED_WIDTH_RANGE, GAUS_FILTER, ITEM_COLORS, QUALITY_COLOR_MAP, Runeword, BOX_EXPECTED_HEIGHT_RANGE, BOX_EXPECTED_WIDTH_RANGE
+from d2r_image.processing_data import TOOLTIP_FOOTER_TEXTS, TOOLTIP_LINE_PADDING, TOOLTIP_MIN_LINE_HEIGHT, TOOLTIP_TEXT_THRESHOLD
 from d2r_image.strings_store import base_items
-from utils.misc import color_filter, erode_to_black, slugify
+from utils.misc import color_filter, color_filter_multi, erode_to_black, slugify
 from d2r_image.ocr import image_to_text
 from ui_manager import get_hud_mask
 
@@ -27,58 +29,136 @@ import template_finder
 gold_regex = re.compile(r'(^[0-9]+)\sGOLD')
 
 import time
-def crop_text_clusters(inp_img: np.ndarray, padding_y: int = 5) -> list[ItemText]:
-    cleaned_img = clean_img(inp_img)
-    # Cluster item names
-    item_clusters = []
-    for key in ITEM_COLORS:
-        _, filtered_img = color_filter(cleaned_img, Config().colors[key])
-        filtered_img_gray = cv2.cvtColor(filtered_img, cv2.COLOR_BGR2GRAY)
+def segment_text_clusters(cleaned_img: np.ndarray, padding_y: int = 5) -> list[tuple[str, list[int]]]:
+    """
+    Finds the item name clusters of all ITEM_COLORS in one pass: every pixel is classified into the item colors once,
+    the blurred text of all colors is laid out side by side in one image and a single findContours() over it yields
+    the clusters already tagged with their color.
+    :param cleaned_img: screenshot as returned by clean_img()
+    :param padding_y: rows added above and below each cluster
+    :return: color and roi [x, y, w, h] of each cluster, grouped by color in ITEM_COLORS order
+    """
+    height, width = cleaned_img.shape[:2]
+    cleaned_gray = cv2.cvtColor(cleaned_img, cv2.COLOR_BGR2GRAY)
+    color_masks = color_filter_multi(cleaned_img, [Config().colors[key] for key in ITEM_COLORS])
+    # brightness of the pixels of each color and its blurred text, colors side by side with an empty column in
+    # between, so contours never join across colors
+    planes = np.zeros((height, len(ITEM_COLORS), width + 1), dtype=np.uint8)
+    blurred = np.zeros_like(planes)
+    text_planes = []
+    for idx, key in enumerate(ITEM_COLORS):
+        text_plane = cv2.bitwise_and(cleaned_gray, cleaned_gray, mask=color_masks[idx], dst=planes[:, idx, :width])
         gaus = GAUS_FILTER
         if key == "gray":
             # white text has some gray on border of glyphs, erode
-            filtered_img_gray = cv2.erode(filtered_img_gray, np.ones((2, 1), 'uint8'), None, iterations=1)
+            text_plane = cv2.erode(text_plane, np.ones((2, 1), 'uint8'), None, iterations=1)
             gaus = (GAUS_FILTER[0] + 4, GAUS_FILTER[1])
-        blured_img = np.clip(cv2.GaussianBlur(
-            filtered_img_gray, gaus, cv2.BORDER_DEFAULT), 0, 255)
-        contours = cv2.findContours(
-            blured_img, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        contours = contours[0] if len(contours) == 2 else contours[1]
-        for cntr in contours:
-            x, y, w, h = cv2.boundingRect(cntr)
-            expected_height = EXPECTED_HEIGHT_RANGE[0] < h < EXPECTED_HEIGHT_RANGE[1]
-            expected_width = EXPECTED_WIDTH_RANGE[0] < w < EXPECTED_WIDTH_RANGE[1]
-            if not (expected_height and expected_width): continue
-            # increase height a bit to make sure we have the full item name in the cluster
-            y = y - padding_y if y > padding_y else 0
-            h += padding_y * 2
-            cropped_item = filtered_img[y:y+h, x:x+w]
-            avg = int(np.average(filtered_img_gray[y:y+h, x:x+w]))
-            contains_black = np.min(cropped_item) < 14
-            mostly_dark = avg < 35
-            if contains_black and mostly_dark:
-                # double-check item color
-                color_averages = []
-                for key2 in ITEM_COLORS:
-                    _, extracted_img = color_filter(cropped_item, Config().colors[key2])
-                    extr_avg = np.average(cv2.cvtColor(
-                        extracted_img, cv2.COLOR_BGR2GRAY))
-                    color_averages.append(extr_avg)
-                max_idx = color_averages.index(max(color_averages))
-                if key == ITEM_COLORS[max_idx]:
-                    item_clusters.append(ItemText(
-                        color=key,
-                        quality=QUALITY_COLOR_MAP[key],
-                        roi=[x, y, w, h],
-                        img=inp_img[y:y+h, x:x+w],
-                        clean_img=cleaned_img[y:y+h, x:x+w]
-                    ))
+        text_planes.append(text_plane)
+        if cv2.countNonZero(text_plane):
+            cv2.GaussianBlur(text_plane, gaus, cv2.BORDER_DEFAULT, dst=blurred[:, idx, :width])
+    contours = cv2.findContours(
+        blurred.reshape(height, -1), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    contours = contours[0] if len(contours) == 2 else contours[1]
+    rois = []
+    for cntr in contours:
+        left, y, w, h = cv2.boundingRect(cntr)
+        rois.append((*divmod(left, width + 1), y, w, h))
+    clusters = []
+    # stable sort, so clusters of a color keep the order findContours() returns them in
+    for color_idx, x, y, w, h in sorted(rois, key=lambda roi: roi[0]):
+        expected_height = EXPECTED_HEIGHT_RANGE[0] < h < EXPECTED_HEIGHT_RANGE[1]
+        expected_width = EXPECTED_WIDTH_RANGE[0] < w < EXPECTED_WIDTH_RANGE[1]
+        if not (expected_height and expected_width): continue
+        # increase height a bit to make sure we have the full item name in the cluster
+        y = y - padding_y if y > padding_y else 0
+        h += padding_y * 2
+        cluster_mask = color_masks[color_idx, y:y+h, x:x+w]
+        avg = int(np.average(text_planes[color_idx][y:y+h, x:x+w]))
+        contains_black = np.count_nonzero(cluster_mask) < cluster_mask.size or np.min(cleaned_img[y:y+h, x:x+w]) < 14
+        mostly_dark = avg < 35
+        if contains_black and mostly_dark:
+            # double-check item color: brightness of the cluster pixels that also have each of the other colors
+            color_sums = planes[y:y+h, :, x:x+w].transpose(0, 2, 1)[cluster_mask > 0].sum(axis=0, dtype=np.int64)
+            if np.argmax(color_sums) == color_idx:
+                clusters.append((ITEM_COLORS[color_idx], [x, y, w, h]))
+    return clusters
+
+def text_clusters(inp_img: np.ndarray, cleaned_img: np.ndarray, padding_y: int = 5) -> list[ItemText]:
+    """
+    :param inp_img: screenshot
+    :param cleaned_img: clean_img(inp_img)
+    :param padding_y: rows added above and below each cluster
+    :return: item name clusters of inp_img, not read yet
+    """
+    return [
+        ItemText(
+            color=key,
+            quality=QUALITY_COLOR_MAP[key],
+            roi=[x, y, w, h],
+            img=inp_img[y:y+h, x:x+w],
+            clean_img=cleaned_img[y:y+h, x:x+w]
+        )
+        for key, (x, y, w, h) in segment_text_clusters(cleaned_img, padding_y)
+    ]
+
+def read_text_clusters(item_clusters: list[ItemText]):
+    """
+    OCRs the clean_img of each cluster into its ocr_result
+    """
     cluster_images = [key["clean_img"] for key in item_clusters]
-    results = image_to_text(cluster_images, model="ground-eng_inconsolata_inv_th_fast", psm=7, erode=True)
+    results = image_to_text(cluster_images, model="ground-eng_inconsolata_inv_th_fast", psm=7, erode=True, workers=Config().advanced_options["ocr_workers"])
     for count, cluster in enumerate(item_clusters):
         setattr(cluster, "ocr_result", results[count])
+
+def crop_text_clusters(inp_img: np.ndarray, padding_y: int = 5) -> list[ItemText]:
+    item_clusters = text_clusters(inp_img, clean_img(inp_img), padding_y)
+    read_text_clusters(item_clusters)
     return item_clusters
 
+def split_tooltip_lines(box_img: np.ndarray) -> list[np.ndarray]:
+    """
+    Splits a tooltip into its text lines by row projection of the pixels brighter than the ocr threshold in any channel,
+    i.e. text of any color on the dark box.
+    :param box_img: BGR image of the tooltip box
+    :return: one image per line, cut to the text and padded with black. Lines read the same regardless of box size and position
+    """
+    mask = box_img.max(axis=2) > TOOLTIP_TEXT_THRESHOLD
+    edges = np.flatnonzero(np.diff(np.r_[0, mask.any(axis=1).astype(np.int8), 0]))
+    lines = []
+    for y0, y1 in zip(edges[::2], edges[1::2]):
+        if y1 - y0 < TOOLTIP_MIN_LINE_HEIGHT:
+            continue
+        cols = np.flatnonzero(mask[y0:y1].any(axis=0))
+        line = box_img[y0:y1, cols[0]:cols[-1] + 1]
+        lines.append(np.pad(line, [(TOOLTIP_LINE_PADDING, TOOLTIP_LINE_PADDING), (TOOLTIP_LINE_PADDING, TOOLTIP_LINE_PADDING), (0, 0)], mode='constant'))
+    return lines
+
+def tooltip_footer_reached(lines: list[str]) -> bool:
+    return any(footer in lines[-1] for footer in TOOLTIP_FOOTER_TEXTS)
+
+def read_tooltip(box_img: np.ndarray, model: str = "hover-eng_inconsolata_inv_th_fast", stop_reading: Callable[[list[str]], bool] = tooltip_footer_reached) -> OcrResult | None:
+    """
+    Reads a tooltip line by line from the top. Each line is OCR'd on its own, so lines that were read before
+    (e.g. the same item before and after identifying it) come from the ocr cache and only new lines cost an OCR.
+    :param box_img: BGR image of the tooltip box
+    :param model: which ocr model to use
+    :param stop_reading: called with the texts read so far after each line, True skips the remaining lines
+    :return: lines joined like a psm 6 read of the whole box, None if no text lines were found
+    """
+    results = []
+    for line in split_tooltip_lines(box_img):
+        results.append(image_to_text(line, psm=7, model=model, crop_pad=False)[0])
+        if stop_reading is not None and stop_reading([result.text for result in results]):
+            break
+    if not results:
+        return None
+    return OcrResult(
+        text="\n".join(result.text for result in results),
+        original_text="\n".join(result.original_text for result in results),
+        word_confidences=[conf for result in results for conf in result.word_confidences],
+        mean_confidence=float(np.mean([result.mean_confidence for result in results]))
+    )
+
 def crop_item_tooltip(image: np.ndarray, model: str = "hover-eng_inconsolata_inv_th_fast") -> tuple[ItemText, str]:
     """
     Crops visible item description boxes / tooltips
@@ -131,7 +211,9 @@ def crop_item_tooltip(image: np.ndarray, model: str = "hover-eng_inconsolata_inv
         footer_h = 720 - footer_y
         found_footer = template_finder.search(["TO_TOOLTIP"], image, threshold=0.8, roi=[x, footer_y, w, footer_h]).valid
         if found_footer:
-            res.ocr_result = image_to_text(cropped_item, psm=6, model=model)[0]
+            if (ocr_result := read_tooltip(cropped_item, model)) is None:
+                ocr_result = image_to_text(cropped_item, psm=6, model=model)[0]
+            res.ocr_result = ocr_result
             first_row = cut_roi(copy.deepcopy(cropped_item), (0, 0, w, 26))
             if _contains_color(first_row, "green"):
                 quality = ItemQuality.Set.value
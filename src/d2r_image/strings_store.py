@@ -1,4 +1,5 @@
 from functools import cache
+from utils.fuzzy_index import FuzzyIndex
 
 _WORD_LIST_DIR = "assets/word_lists"
 
@@ -20,4 +21,12 @@ def magic_prefixes():
 @cache
 def magic_suffixes():
     with open(f"{_WORD_LIST_DIR}/magic_suffixes.txt", 'r') as f:
-        return set(line.strip() for line in f.read().splitlines())
\ No newline at end of file
+        return set(line.strip() for line in f.read().splitlines())
+
+@cache
+def all_words_index() -> FuzzyIndex:
+    return FuzzyIndex(all_words())
+
+@cache
+def base_items_index() -> FuzzyIndex:
+    return FuzzyIndex(base_items())
@@ -5,6 +5,7 @@ import cv2
 from utils.auto_settings import check_settings
 from bot import Bot
 from config import Config
+from d2r_image import ocr
 from death_manager import DeathManager
 from game_recovery import GameRecovery
 from game_stats import GameStats
@@ -14,6 +15,7 @@ from messages import Messenger
 from screen import grab, get_offset_state
 from utils.restart import restart_game, safe_exit
 from utils.misc import kill_thread, set_d2r_always_on_top, restore_d2r_window_visibility
+from utils.replay import ReplayRecorder
 
 
 class GameController:
@@ -30,6 +32,10 @@ class GameController:
         self.bot = None
 
     def run_bot(self):
+        # Record one replay per game, see utils.replay
+        recorder = ReplayRecorder() if Config().advanced_options["record_replay"] else None
+        if recorder:
+            recorder.start()
         # Start bot thread
         self.bot = Bot(self.game_stats)
         self.bot_thread = threading.Thread(target=self.bot.start)
@@ -68,6 +74,8 @@ class GameController:
                 break
             time.sleep(0.5)
         self.bot_thread.join()
+        if recorder:
+            recorder.stop()
         if do_restart:
             # Reset flags before running a new bot
             self.death_manager.reset_death_flag()
@@ -104,6 +112,9 @@ class GameController:
             Logger.warning("Your D2R settings differ from the requiered ones. Please use Auto Settings to adjust them. The differences are:")
             Logger.warning(f"{diff}")
         set_d2r_always_on_top()
+        # create the tesseract handles while the game is still loading, the first pickit / hover ocr is then fast
+        threading.Thread(target=ocr.warm_up).start()
+        ocr.start_workers(Config().advanced_options["ocr_workers"])
         self.setup_screen()
         self.start_health_manager_thread()
         self.start_death_manager_thread()
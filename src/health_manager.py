@@ -6,7 +6,7 @@ import keyboard
 from utils.custom_mouse import mouse
 from utils.misc import wait
 from logger import Logger
-from screen import grab
+from screen import grab, grab_partial
 import time
 from config import Config
 from inventory import common
@@ -64,7 +64,9 @@ class HealthManager:
         self._did_chicken = False
         set_pause_state(True)
 
-    def _do_chicken(self, img):
+    def _do_chicken(self):
+        # the monitor loop only captures its regions, the screenshot shows the whole screen at the time of the chicken
+        img = grab() if Config().general["info_screenshots"] else None
         if self._callback is not None:
             self._callback()
             self._callback = None
@@ -85,13 +87,16 @@ class HealthManager:
         self._do_monitor = True
         self._did_chicken = False
         start = time.time()
+        # only these regions are looked at, no need to capture the whole screen for the health and mana checks
+        monitor_rois = [Config().ui_roi[obj.roi] for obj in (ScreenObjects.InGame, ScreenObjects.MercIcon, ScreenObjects.LeftPanel, ScreenObjects.RightPanel)]
+        monitor_rois += [Config().ui_roi["health_slice"], Config().ui_roi["mana_slice"], meters.merc_health_roi()]
 
         while self._do_monitor:
             if self._did_chicken or get_pause_state():
                 wait(1)
                 continue
             fn_start = time.perf_counter()
-            img = grab()
+            img = grab_partial(monitor_rois)
             if is_visible(ScreenObjects.InGame, img):
                 health_percentage = meters.get_health(img)
                 mana_percentage = meters.get_mana(img)
@@ -116,7 +121,7 @@ class HealthManager:
                     # give the chicken a 6 sec delay to give time for a healing pot and avoid endless loop of chicken
                     elif health_percentage <= Config().char["chicken"] and (time.time() - start) > 6:
                         Logger.warning(f"Trying to chicken, player HP {(health_percentage*100):.1f}%!")
-                        self._do_chicken(img)
+                        self._do_chicken()
                     # check mana
                     last_drink = time.time() - self._last_mana
                     if mana_percentage <= Config().char["take_mana_potion"] and last_drink > lp_mp_potion_delay:
@@ -130,7 +135,7 @@ class HealthManager:
                         last_drink = time.time() - self._last_merc_heal
                         if Config().char["merc_chicken"] and (merc_health_percentage <= Config().char["merc_chicken"]):
                             Logger.warning(f"Trying to chicken, merc HP {(merc_health_percentage*100):.1f}%!")
-                            self._do_chicken(img)
+                            self._do_chicken()
                         if Config().char["heal_rejuv_merc"] and (merc_health_percentage <= Config().char["heal_rejuv_merc"] and last_drink > 4.0):
                             belt.drink_potion("rejuv", merc=True, stats=[merc_health_percentage])
                             self._last_merc_heal = time.time()
@@ -143,7 +148,7 @@ class HealthManager:
                     if self._count_panel_detects >= 2:
                         self._count_panel_detects = 0
                         Logger.warning(f"Found an open inventory / quest / skill / stats page again. Chicken to dismiss.")
-                        self._do_chicken(img)
+                        self._do_chicken()
                     common.close()
             fn_end = time.perf_counter()
             wait_time = 3/25 - (fn_start - fn_end)
@@ -7,9 +7,9 @@ from inventory import common, personal
 from ui import view
 from ui_manager import is_visible, wait_until_visible, ScreenObjects, wait_until_hidden
 from utils.custom_mouse import mouse
-from utils.misc import cut_roi, wait, color_filter
+from utils.misc import cut_roi, wait, color_filter_multi
 from config import Config
-from screen import convert_abs_to_monitor, convert_monitor_to_screen, convert_screen_to_monitor, grab
+from screen import convert_abs_to_monitor, convert_monitor_to_screen, convert_screen_to_monitor, grab, grab_rois
 import keyboard
 import os
 
@@ -17,7 +17,7 @@ def open(img: np.ndarray = None) -> np.ndarray:
     img = grab() if img is None else img
     if is_visible(ScreenObjects.BeltExpandable, img) and Config().char["belt_rows"] > 1:
         keyboard.send(Config().char["show_belt"])
-        if not wait_until_hidden(ScreenObjects.BeltExpandable, 1):
+        if not wait_until_hidden(ScreenObjects.BeltExpandable, 1, skip_unchanged=True):
             return None
         img = grab()
     return img
@@ -26,7 +26,7 @@ def close(img: np.ndarray = None) -> np.ndarray:
     img = grab() if img is None else img
     if not is_visible(ScreenObjects.BeltExpandable, img):
         keyboard.send("esc")
-        if not wait_until_visible(ScreenObjects.BeltExpandable, 2).valid:
+        if not wait_until_visible(ScreenObjects.BeltExpandable, 2, skip_unchanged=True).valid:
             success = view.return_to_play()
             if not success:
                 return None
@@ -44,16 +44,9 @@ def _potion_type(img: np.ndarray) -> str:
     avg_brightness = np.average(img)
     if avg_brightness < 47:
         return "empty"
-    score_list = []
-    # rejuv
-    mask, _ = color_filter(img, Config().colors["rejuv_potion"])
-    score_list.append((float(np.sum(mask)) / mask.size) * (1/255.0))
-    # health
-    mask, _ = color_filter(img, Config().colors["health_potion"])
-    score_list.append((float(np.sum(mask)) / mask.size) * (1/255.0))
-    # mana
-    mask, _ = color_filter(img, Config().colors["mana_potion"])
-    score_list.append((float(np.sum(mask)) / mask.size) * (1/255.0))
+    # rejuv, health, mana
+    masks = color_filter_multi(img, [Config().colors["rejuv_potion"], Config().colors["health_potion"], Config().colors["mana_potion"]])
+    score_list = [(float(np.sum(mask)) / mask.size) * (1/255.0) for mask in masks]
     # find max score
     max_val = np.max(score_list)
     if max_val > 0.28:
@@ -63,19 +56,21 @@ def _potion_type(img: np.ndarray) -> str:
     else:
         return "empty"
 
-def _cut_potion_img(img: np.ndarray, column: int, row: int) -> np.ndarray:
-    roi = [
+def _potion_roi(column: int, row: int) -> list[int]:
+    return [
         Config().ui_pos["potion1_x"] - (Config().ui_pos["potion_width"] // 2) + column * Config().ui_pos["potion_next"],
         Config().ui_pos["potion1_y"] - (Config().ui_pos["potion_height"] // 2) - int(row * Config().ui_pos["potion_next"] * 0.92),
         Config().ui_pos["potion_width"],
         Config().ui_pos["potion_height"]
     ]
-    return cut_roi(img, roi)
+
+def _cut_potion_img(img: np.ndarray, column: int, row: int) -> np.ndarray:
+    return cut_roi(img, _potion_roi(column, row))
 
 def drink_potion(potion_type: str, merc: bool = False, stats: list = []) -> bool:
-    img = grab()
-    for i in range(4):
-        potion_img = _cut_potion_img(img, i, 0)
+    # only the first belt row is needed, capture just these slots
+    potion_imgs = grab_rois([_potion_roi(i, 0) for i in range(4)])
+    for i, potion_img in enumerate(potion_imgs):
         if _potion_type(potion_img) == potion_type:
             key = f"potion{i+1}"
             if merc:
@@ -138,8 +138,9 @@ def read_gold(img: np.ndarray = None, type: str = "inventory"):
     img = cut_roi(img, Config().ui_roi[f"{type}_gold_digits"])
     # _, img = color_filter(img, Config().colors["gold_numbers"])
     img = np.pad(img, pad_width=[(8, 8),(8, 8),(0, 0)], mode='constant')
-    ocr_result = ocr.image_to_text(
-        images = img,
+    ocr_result = ocr.image_to_text_fixed_font(
+        f"{type}_gold",
+        img,
         model = "hover-eng_inconsolata_inv_th_fast",
         psm = 13,
         scale = 1.2,
@@ -151,7 +152,7 @@ def read_gold(img: np.ndarray = None, type: str = "inventory"):
         fix_regexps = False,
         check_known_errors = False,
         correct_words = False,
-    )[0]
+    )
     number=int(ocr_result.text.strip())
     Logger.debug(f"{type.upper()} gold: {number}")
     return number
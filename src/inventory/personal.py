@@ -162,11 +162,11 @@ def open(img: np.ndarray = None) -> np.ndarray:
     img = grab() if img is None else img
     if not common.inventory_is_open():
         keyboard.send(Config().char["inventory_screen"])
-        if not wait_until_visible(ScreenObjects.RightPanel, 1).valid:
+        if not wait_until_visible(ScreenObjects.RightPanel, 1, skip_unchanged=True).valid:
             if not view.return_to_play():
                 return None
             keyboard.send(Config().char["inventory_screen"])
-            if not wait_until_visible(ScreenObjects.RightPanel, 1).valid:
+            if not wait_until_visible(ScreenObjects.RightPanel, 1, skip_unchanged=True).valid:
                 Logger.error(f"personal.open(): Failed to open inventory")
                 return None
         img = grab()
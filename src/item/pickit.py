@@ -11,6 +11,7 @@ from char import IChar
 from config import Config
 from d2r_image import processing as d2r_image
 from d2r_image.data_models import GroundItemList, GroundItem, EnhancedJSONEncoder
+from d2r_image.ground_loot_tracker import GroundLootTracker
 from inventory import personal
 from item import consumables
 from item.consumables import ITEM_CONSUMABLES_MAP
@@ -21,6 +22,7 @@ from screen import grab, convert_abs_to_monitor
 from ui_manager import ScreenObjects, is_visible
 from utils.custom_mouse import mouse
 from utils.misc import wait
+from utils import replay
 
 
 class PickedUpResult(Enum):
@@ -37,6 +39,8 @@ class PickIt:
         self._fail_pickup_count = 0
         self._picked_up_items = []
         self._picked_up_item = False
+        # * Items left on the ground are only read again if their label changed
+        self._tracker = GroundLootTracker()
         self.timeout = 30
 
     @staticmethod
@@ -46,12 +50,12 @@ class PickIt:
             with open(f"log/screenshots/pickit/{_uuid }_{counter}.json", 'w', encoding='utf-8') as f:
                 json.dump(items, f, ensure_ascii=False, sort_keys=False, cls=EnhancedJSONEncoder, indent=2)
 
-    @staticmethod
-    def _locate_items() -> tuple[GroundItemList, ndarray]:
+    def _locate_items(self) -> tuple[GroundItemList, ndarray]:
         img = grab()
         start = time.time()
-        items = d2r_image.get_ground_loot(img).items.copy()
-        Logger.debug(f"Read {len(items)} ground items in {round(time.time() - start, 3)} seconds")
+        items = d2r_image.get_ground_loot(img, tracker=self._tracker).items.copy()
+        stats = self._tracker.stats(reset=True)
+        Logger.debug(f"Read {len(items)} ground items in {round(time.time() - start, 3)} seconds, {stats.reused}/{stats.clusters} labels tracked")
         items = sorted(items, key=lambda item: item.Distance)
         return items, img
 
@@ -61,6 +65,7 @@ class PickIt:
         self._fail_pickup_count = 0
         self._picked_up_items = []
         self._picked_up_item = False
+        self._tracker.reset()
 
     @staticmethod
     def _ignore_gold(item: GroundItem):
@@ -166,6 +171,7 @@ class PickIt:
                 if not (self._ignore_gold(item) or self._ignore_consumable(item)):
                     pickup, raw_expression = should_pickup(item_dict)
                 self._cached_pickit_items[item.ID] = pickup
+                replay.record_decision("pickit", item=item.Name, id=item.ID, pickup=pickup, expression=raw_expression)
                 if pickup:
                     pick_up_res = self._pick_up_item(char, item)
                     Logger.debug(f"Pick up expression: {raw_expression}")
@@ -1,5 +1,6 @@
 from dataclasses import dataclass
 import keyboard
+import multiprocessing
 import os
 from beautifultable import BeautifulTable
 import logging
@@ -100,6 +101,8 @@ def main():
 
 
 if __name__ == "__main__":
+    # ocr worker processes are spawned from the pyinstaller exe
+    multiprocessing.freeze_support()
     # To avoid cmd just closing down, except any errors and add a input() to the end
     try:
         game_controller = GameController()
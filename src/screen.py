@@ -1,8 +1,13 @@
+import atexit
+import cv2
 import numpy as np
+import sys
 from mss import mss
 from logger import Logger
-from utils.misc import WindowSpec, find_d2r_window, wait
+from utils.misc import WindowSpec, find_d2r_window, wait, cut_roi, share_hsv, to_hsv
 from config import Config
+from dataclasses import dataclass, field
+from typing import Callable
 import threading
 import time
 
@@ -13,9 +18,99 @@ monitor_x_range = None
 monitor_y_range = None
 detect_window = True
 detect_window_thread = None
-last_grab = None
-cached_img = None
-cached_img_lock = threading.Lock()
+
+# one producer thread captures the screen and publishes numbered frames into a small ring buffer,
+# all consumers (bot, health manager, death manager, ...) share these frames instead of capturing on their own
+CAPTURE_INTERVAL = 1 / 25
+FRAME_BUFFER_SIZE = 4
+# a frame older than this is not handed out by grab(), a fresh one is waited for instead
+FRAME_MAX_AGE = 2 * CAPTURE_INTERVAL
+# producer pauses when no frame was requested for this long
+CAPTURE_IDLE_TIMEOUT = 2.0
+# fall back to capturing in the calling thread if the producer does not deliver within this time
+FRAME_WAIT_TIMEOUT = 1.0
+
+class _BufferPool:
+    """
+    Hands out preallocated image buffers and reuses a buffer as soon as nothing references it anymore,
+    i.e. no frame in the ring buffer and no consumer holds the image or a view of it.
+    """
+    def __init__(self, size: int):
+        self._size = size
+        self._buffers: list[np.ndarray] = []
+        self._lock = threading.Lock()
+
+    def _is_free(self, i: int) -> bool:
+        # only referenced by the pool list and getrefcount()'s argument
+        return sys.getrefcount(self._buffers[i]) == 2
+
+    def get(self, shape: tuple[int, ...]) -> np.ndarray:
+        with self._lock:
+            for i in range(len(self._buffers)):
+                if self._buffers[i].shape == shape and self._is_free(i):
+                    return self._buffers[i]
+            buf = np.empty(shape, dtype=np.uint8)
+            if len(self._buffers) < self._size:
+                self._buffers.append(buf)
+            else:
+                # e.g. after a resolution change, replace a free buffer of the wrong size
+                for i in range(len(self._buffers)):
+                    if self._is_free(i):
+                        self._buffers[i] = buf
+                        break
+            return buf
+
+_bgr_buffers = _BufferPool(2 * FRAME_BUFFER_SIZE)
+_gray_buffers = _BufferPool(2 * FRAME_BUFFER_SIZE)
+
+@dataclass
+class Frame:
+    id: int
+    img: np.ndarray # contiguous BGR image, shared with all consumers so it must not be modified in place
+    timestamp: float # time.perf_counter() at start of the capture
+    _gray: np.ndarray = field(default=None, repr=False)
+
+    def __post_init__(self):
+        # color_filter() calls on the frame and its crops share one HSV conversion
+        share_hsv(self.img)
+
+    @property
+    def age(self) -> float:
+        return time.perf_counter() - self.timestamp
+
+    @property
+    def gray(self) -> np.ndarray:
+        # converted on first access, then shared like img
+        if self._gray is None:
+            self._gray = cv2.cvtColor(self.img, cv2.COLOR_BGR2GRAY, dst=_gray_buffers.get(self.img.shape[:2]))
+        return self._gray
+
+    @property
+    def hsv(self) -> np.ndarray:
+        # converted on first access, also by color_filter() on the frame, then shared like img
+        return to_hsv(self.img)
+
+@dataclass
+class FrameStats:
+    frame_id: int = 0
+    age: float = None
+    dropped: int = 0 # frames that were overwritten in the ring buffer without ever being read
+    capture_ms: float = 0.0
+
+_frames: list[Frame] = [None] * FRAME_BUFFER_SIZE
+_frames_read = [False] * FRAME_BUFFER_SIZE
+_frame_cond = threading.Condition()
+_latest_id = 0
+_dropped_frames = 0
+_capture_ms = 0.0
+_last_request = 0.0
+_capture = False
+_capture_thread = None
+_thread_sct = threading.local()
+# replaces the capture thread, e.g. to play back recorded frames (see utils.replay)
+_frame_source: Callable[[], "Frame"] = None
+# called with every frame handed out to a consumer, e.g. to record them
+_frame_listener: Callable[["Frame"], None] = None
 
 FIND_WINDOW = WindowSpec(
     title_regex=Config().advanced_options["hwnd_window_title"],
@@ -67,21 +162,229 @@ def stop_detecting_window():
     detect_window = False
     if detect_window_thread:
         detect_window_thread.join()
+    stop_capture()
+
+def _capture_img(region: dict = None) -> np.ndarray:
+    # mss keeps its device context per thread, so every capturing thread needs its own instance
+    if not hasattr(_thread_sct, "sct"):
+        _thread_sct.sct = mss()
+    shot = _thread_sct.sct.grab(monitor_roi if region is None else region)
+    # BGRA view on the raw capture, no copy
+    return np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+
+def _to_bgr(bgra: np.ndarray, pool: _BufferPool = None) -> np.ndarray:
+    # one conversion into a contiguous buffer, instead of a [:, :, :3] view that opencv copies again on every call
+    dst = pool.get(bgra.shape[:2] + (3,)) if pool is not None else None
+    return cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR, dst=dst)
+
+def _capture_frames():
+    global _latest_id, _dropped_frames, _capture_ms
+    Logger.debug("Screen capture thread started")
+    while True:
+        with _frame_cond:
+            # nobody asked for a frame in a while, sleep until the next request
+            _frame_cond.wait_for(lambda: not _capture or time.perf_counter() - _last_request < CAPTURE_IDLE_TIMEOUT)
+            if not _capture:
+                break
+        start = time.perf_counter()
+        try:
+            img = _to_bgr(_capture_img(), _bgr_buffers)
+        except Exception as e:
+            Logger.warning(f"Screen capture failed: {e}")
+            time.sleep(CAPTURE_INTERVAL)
+            continue
+        with _frame_cond:
+            _latest_id += 1
+            slot = _latest_id % FRAME_BUFFER_SIZE
+            if _frames[slot] is not None and not _frames_read[slot]:
+                _dropped_frames += 1
+            _frames[slot] = Frame(_latest_id, img, start)
+            _frames_read[slot] = False
+            _capture_ms = (time.perf_counter() - start) * 1000
+            _frame_cond.notify_all()
+        remaining = CAPTURE_INTERVAL - (time.perf_counter() - start)
+        if remaining > 0:
+            time.sleep(remaining)
+    Logger.debug("Screen capture thread stopped")
+
+def start_capture():
+    global _capture, _capture_thread
+    with _frame_cond:
+        _capture = True
+        if _capture_thread is None or not _capture_thread.is_alive():
+            _capture_thread = threading.Thread(target=_capture_frames, daemon=True)
+            _capture_thread.start()
+
+def stop_capture():
+    global _capture, _capture_thread
+    with _frame_cond:
+        _capture = False
+        _frame_cond.notify_all()
+    if _capture_thread is not None and _capture_thread is not threading.current_thread():
+        _capture_thread.join()
+    _capture_thread = None
+
+# a daemon thread killed in the middle of an opencv call at interpreter shutdown aborts the process
+atexit.register(stop_capture)
+
+def _find_frame(min_id: int, min_timestamp: float) -> Frame | None:
+    # oldest frame in the ring buffer that satisfies both bounds, caller must hold _frame_cond
+    found = None
+    for frame in _frames:
+        if frame is not None and frame.id >= min_id and frame.timestamp >= min_timestamp:
+            if found is None or frame.id < found.id:
+                found = frame
+    return found
+
+def set_frame_source(source: Callable[[], Frame] | None):
+    """
+    :param source: Called for every frame request instead of capturing the screen, None to capture again
+    """
+    global _frame_source
+    if source is not None:
+        stop_capture()
+    _frame_source = source
+
+def set_frame_listener(listener: Callable[[Frame], None] | None):
+    """
+    :param listener: Called with every frame handed out to a consumer. While set, roi grabs are cut from full frames
+        so that the listener sees everything consumers looked at. None to remove.
+    """
+    global _frame_listener
+    _frame_listener = listener
+
+def _handed_out(frame: Frame) -> Frame:
+    if _frame_listener is not None:
+        _frame_listener(frame)
+    return frame
+
+def _source_frame() -> Frame:
+    global _latest_id
+    frame = _frame_source()
+    with _frame_cond:
+        _frames[frame.id % FRAME_BUFFER_SIZE] = frame
+        _frames_read[frame.id % FRAME_BUFFER_SIZE] = True
+        _latest_id = frame.id
+    return _handed_out(frame)
+
+def _request_frame(min_id: int = 0, min_timestamp: float = 0.0, timeout: float = FRAME_WAIT_TIMEOUT) -> Frame:
+    global _last_request
+    if _frame_source is not None:
+        return _source_frame()
+    if not _capture:
+        start_capture()
+    with _frame_cond:
+        _last_request = time.perf_counter()
+        _frame_cond.notify_all()
+        frame = _frame_cond.wait_for(lambda: _find_frame(min_id, min_timestamp), timeout)
+        if frame is not None:
+            _frames_read[frame.id % FRAME_BUFFER_SIZE] = True
+    if frame is None:
+        Logger.warning(f"No frame from capture thread within {timeout}s, capturing directly")
+        frame = Frame(_latest_id, _to_bgr(_capture_img()), time.perf_counter())
+    return _handed_out(frame)
+
+def latest_frame(max_age: float = FRAME_MAX_AGE) -> Frame:
+    """
+    Newest published frame. Only waits if there is no frame younger than max_age, e.g. because capture was idle.
+    :param max_age: maximum age of the frame in seconds
+    :return: Frame, its image is shared with all other consumers
+    """
+    return _request_frame(_latest_id, time.perf_counter() - max_age)
+
+def next_frame(after_id: int, timeout: float = FRAME_WAIT_TIMEOUT) -> Frame:
+    """
+    Waits for the frame following after_id. If the consumer fell behind, the oldest frame still in the buffer is returned,
+    compare Frame.id to see how many were skipped.
+    :param after_id: id of the last frame the consumer processed
+    :param timeout: seconds to wait for the producer before capturing directly
+    :return: Frame, its image is shared with all other consumers
+    """
+    return _request_frame(after_id + 1, timeout=timeout)
+
+def frame_id(img: np.ndarray) -> int | None:
+    """
+    :param img: Image as returned by grab() / latest_frame()
+    :return: Id of the frame the image belongs to, None if it is not a frame of the ring buffer (anymore)
+    """
+    with _frame_cond:
+        for frame in _frames:
+            if frame is not None and frame.img is img:
+                return frame.id
+    return None
+
+def frame_stats() -> FrameStats:
+    with _frame_cond:
+        frame = _find_frame(_latest_id, 0.0) if _latest_id else None
+        return FrameStats(
+            frame_id=_latest_id,
+            age=frame.age if frame is not None else None,
+            dropped=_dropped_frames,
+            capture_ms=_capture_ms
+        )
 
 def grab(force_new: bool = False) -> np.ndarray:
-    global monitor_roi
-    global cached_img
-    global last_grab
-    # with 25fps we have 40ms per frame. If we check for 20ms range to make sure we can still get each frame if we want.
-    if not force_new and cached_img is not None and last_grab is not None and time.perf_counter() - last_grab < 0.04:
-        return cached_img
-    else:
-        with cached_img_lock:
-            last_grab = time.perf_counter()
-        img = np.array(sct.grab(monitor_roi))
-        with cached_img_lock:
-            cached_img = img[:, :, :3]
-        return cached_img
+    """
+    Current screen image from the shared capture thread.
+    :param force_new: wait for a frame whose capture started after this call
+    :return: BGR image, shared with all other consumers so it must not be modified in place
+    """
+    if force_new:
+        return _request_frame(min_timestamp=time.perf_counter()).img
+    return latest_frame().img
+
+def _clip_roi(roi: list[int]) -> tuple[int, int, int, int]:
+    # same bounds as cut_roi() on a full frame would give
+    x, y, w, h = (int(v) for v in roi)
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + w, monitor_roi["width"]), min(y + h, monitor_roi["height"])
+    return x0, y0, max(x1 - x0, 0), max(y1 - y0, 0)
+
+def _capture_roi(roi: tuple[int, int, int, int]) -> np.ndarray:
+    x, y, w, h = roi
+    if w == 0 or h == 0:
+        return np.zeros((h, w, 3), dtype=np.uint8)
+    region = {"left": monitor_roi["left"] + x, "top": monitor_roi["top"] + y, "width": w, "height": h}
+    return _to_bgr(_capture_img(region))
+
+def _fresh_frame(max_age: float) -> Frame | None:
+    # published frame younger than max_age, does not wake up an idle capture thread
+    if _frame_source is not None or _frame_listener is not None:
+        return latest_frame(max_age)
+    with _frame_cond:
+        frame = _find_frame(_latest_id, time.perf_counter() - max_age) if _latest_id else None
+        if frame is not None:
+            _frames_read[frame.id % FRAME_BUFFER_SIZE] = True
+    return frame
+
+def grab_rois(rois: list[list[int]]) -> list[np.ndarray]:
+    """
+    Captures only the given regions. If the capture thread has a fresh frame, the regions are cut from it instead.
+    :param rois: list of [x, y, width, height] in screen coordinates
+    :return: list of BGR images, one per roi, same as cut_roi(grab(), roi) would give
+    """
+    rois = [_clip_roi(roi) for roi in rois]
+    if (frame := _fresh_frame(FRAME_MAX_AGE)) is not None:
+        return [cut_roi(frame.img, roi) for roi in rois]
+    return [_capture_roi(roi) for roi in rois]
+
+def grab_roi(roi: list[int]) -> np.ndarray:
+    return grab_rois([roi])[0]
+
+def grab_partial(rois: list[list[int]]) -> np.ndarray:
+    """
+    Screen sized image where only the given regions are captured, everything else is black.
+    Lets consumers that work in screen coordinates (cut_roi, ScreenObject rois) run on a partial capture.
+    :param rois: list of [x, y, width, height] in screen coordinates
+    :return: BGR image, the shared frame itself if the capture thread has a fresh one
+    """
+    if (frame := _fresh_frame(FRAME_MAX_AGE)) is not None:
+        return frame.img
+    img = np.zeros((monitor_roi["height"], monitor_roi["width"], 3), dtype=np.uint8)
+    for roi in rois:
+        x, y, w, h = roi = _clip_roi(roi)
+        img[y:y+h, x:x+w] = _capture_roi(roi)
+    return img
 
 # TODO: Move the below funcs to utils(?)
 
@@ -1,7 +1,8 @@
+import atexit
 import cv2
 import threading
-from screen import convert_screen_to_monitor, grab
-from dataclasses import dataclass
+from screen import convert_screen_to_monitor, grab, frame_id
+from dataclasses import dataclass, replace
 import numpy as np
 from logger import Logger
 import time
@@ -9,6 +10,9 @@ import os
 from config import Config
 from utils.misc import cut_roi, load_template, list_files_in_folder, alpha_to_mask, roi_center, color_filter, mask_by_roi
 from functools import cache
+from collections import OrderedDict
+from collections.abc import Mapping
+from utils import template_cache, replay
 
 templates_lock = threading.Lock()
 
@@ -31,6 +35,21 @@ class TemplateMatch:
     valid: bool = False
 
 
+# pyramid mode: scale of the coarse level, number of coarse candidates refined at full resolution and
+# minimum template size at the coarse level below which exact matching is used
+PYRAMID_SCALE = 0.5
+PYRAMID_CANDIDATES = 3
+PYRAMID_MIN_TEMPLATE_SIZE = 8
+
+# change detection for searches with skip_unchanged: the roi is compared block wise (CHANGE_BLOCK_SIZE px blocks)
+# against the image of the last evaluated search with the same parameters. If no block mean changed by more than
+# CHANGE_THRESHOLD the last result is reused instead of running matchTemplate again.
+CHANGE_BLOCK_SIZE = 8
+CHANGE_THRESHOLD = 3.0
+CHANGE_CACHE_SIZE = 256
+# results of searches on captured frames are memoized per (frame id, search parameters)
+SEARCH_CACHE_SIZE = 512
+
 TEMPLATE_PATHS = [
     "assets\\templates",
     "assets\\npc",
@@ -40,25 +59,292 @@ TEMPLATE_PATHS = [
     "assets\\gamble",
 ]
 
-@cache
-def stored_templates() -> dict[Template]:
+TEMPLATE_VARIANTS = ["img_bgra", "img_bgr", "img_gray", "alpha_mask"]
+_VARIANT_FROM_BGRA = {
+    "img_bgra": lambda img: img,
+    "img_bgr": lambda img: cv2.cvtColor(img, cv2.COLOR_BGRA2BGR),
+    "img_gray": lambda img: cv2.cvtColor(img, cv2.COLOR_BGRA2GRAY),
+    "alpha_mask": alpha_to_mask,
+}
+
+def _template_file_paths() -> list[str]:
     paths = []
-    templates = {}
     for path in TEMPLATE_PATHS:
         paths += list_files_in_folder(path)
-    for file_path in paths:
-        file_name: str = os.path.basename(file_path)
-        if file_name.lower().endswith('.png'):
-            key = file_name[:-4].upper()
+    return [file_path for file_path in paths if file_path.lower().endswith('.png')]
+
+def _template_key(file_path: str) -> str:
+    return os.path.basename(file_path)[:-4].upper()
+
+def build_template_cache(paths: list[str] = None, cache_dir: str = template_cache.TEMPLATE_CACHE_DIR, stop: threading.Event = None) -> bool:
+    """
+    Decodes all template assets and writes their variants to the template cache bundle, see utils.template_cache.
+    The assets are decoded one at a time while the bundle is written.
+    :param stop: Abort writing the bundle once this is set
+    :return: True if the bundle was written
+    """
+    paths = _template_file_paths() if paths is None else paths
+    def decoded_templates():
+        for file_path in paths:
+            if stop is not None and stop.is_set():
+                raise InterruptedError("template cache rebuild stopped")
             template_img = load_template(file_path)
-            templates[key] = Template(
-                name = key,
-                img_bgra = template_img,
-                img_bgr = cv2.cvtColor(template_img, cv2.COLOR_BGRA2BGR),
-                img_gray = cv2.cvtColor(template_img, cv2.COLOR_BGRA2GRAY),
-                alpha_mask = alpha_to_mask(template_img)
-            )
-    return templates
+            yield _template_key(file_path), {variant: _VARIANT_FROM_BGRA[variant](template_img) for variant in TEMPLATE_VARIANTS}
+    return template_cache.save(decoded_templates(), template_cache.asset_signature(paths), cache_dir)
+
+@dataclass
+class TemplateStats:
+    hits: int = 0
+    misses: int = 0
+
+class _LazyVariant:
+    # non-data descriptor: once a variant is loaded it sits in the instance __dict__ and shadows the descriptor,
+    # so only the first access after loading / unloading goes through the registry
+    def __set_name__(self, owner, name: str):
+        self.name = name
+
+    def __get__(self, template: "LazyTemplate", owner=None):
+        if template is None:
+            return self
+        return template._registry.load_variant(template, self.name)
+
+class LazyTemplate(Template):
+    """
+    Template of a stored asset. Its image variants are only loaded on first access, through the TemplateRegistry.
+    """
+    img_bgra = _LazyVariant()
+    img_bgr = _LazyVariant()
+    img_gray = _LazyVariant()
+    alpha_mask = _LazyVariant()
+
+    def __init__(self, name: str, path: str, registry: "TemplateRegistry"):
+        self.name = name
+        self.path = path
+        self._registry = registry
+
+class TemplateRegistry(Mapping):
+    """
+    Read-only mapping of template key -> LazyTemplate for all assets in TEMPLATE_PATHS.
+    Variants are taken from the template cache bundle if it is up to date, otherwise decoded from the png.
+    Loaded templates are kept in an LRU and the least recently used ones are unloaded once memory_cap_mb is exceeded.
+    Only decoded variants count towards memory_cap_mb, variants of the bundle are views into the memory-mapped file
+    whose pages the OS loads and drops on its own.
+    """
+    def __init__(self, paths: list[str], memory_cap_mb: float = 0, cache_dir: str = template_cache.TEMPLATE_CACHE_DIR):
+        self._lock = threading.RLock()
+        # later paths override earlier ones with the same key
+        self._templates = {_template_key(path): LazyTemplate(_template_key(path), path, self) for path in paths}
+        self._memory_cap = memory_cap_mb * 1e6
+        self._memory_used = 0
+        self._lru = OrderedDict() # key -> bytes of loaded variants, least recently used first
+        self._stats: dict[str, TemplateStats] = {}
+        signature = template_cache.asset_signature(paths)
+        self._bundle = template_cache.load(signature, cache_dir)
+        self.rebuild_thread: threading.Thread = None
+        self._stop_rebuild = threading.Event()
+        if self._bundle is None:
+            # rebuild in the background, until then templates are decoded from png on demand. An unfinished rebuild
+            # does not keep the process alive, it is stopped at exit and the index is only written once the bundle is
+            # complete
+            self.rebuild_thread = threading.Thread(target=self._rebuild_bundle, args=(paths, signature, cache_dir), daemon=True)
+            self.rebuild_thread.start()
+            # a daemon thread killed in the middle of an opencv call at interpreter shutdown aborts the process
+            atexit.register(self.stop_rebuild)
+
+    def stop_rebuild(self):
+        self._stop_rebuild.set()
+        if self.rebuild_thread is not None:
+            self.rebuild_thread.join()
+
+    def _rebuild_bundle(self, paths: list[str], signature: str, cache_dir: str):
+        if build_template_cache(paths, cache_dir, self._stop_rebuild):
+            bundle = template_cache.load(signature, cache_dir)
+            with self._lock:
+                self._bundle = bundle
+
+    def __getitem__(self, key: str) -> LazyTemplate:
+        template = self._templates[key]
+        with self._lock:
+            stats = self._stats.setdefault(key, TemplateStats())
+            if key in self._lru:
+                stats.hits += 1
+                self._lru.move_to_end(key)
+            else:
+                stats.misses += 1
+                self._lru[key] = 0
+        return template
+
+    def __iter__(self):
+        return iter(self._templates)
+
+    def __len__(self) -> int:
+        return len(self._templates)
+
+    def load_variant(self, template: LazyTemplate, variant: str) -> np.ndarray:
+        with self._lock:
+            # might have been loaded by another thread in the meantime
+            if variant in template.__dict__:
+                return template.__dict__[variant]
+            nbytes = 0
+            if self._bundle is not None and template.name in self._bundle:
+                img = self._bundle[template.name][variant]
+            else:
+                if variant == "img_bgra":
+                    img = load_template(template.path)
+                else:
+                    img = _VARIANT_FROM_BGRA[variant](template.img_bgra)
+                nbytes = img.nbytes if img is not None else 0
+            setattr(template, variant, img)
+            self._lru[template.name] = self._lru.get(template.name, 0) + nbytes
+            self._lru.move_to_end(template.name)
+            self._memory_used += nbytes
+            self._evict(keep=template.name)
+            return img
+
+    def _evict(self, keep: str):
+        if not self._memory_cap:
+            return
+        for key in list(self._lru):
+            if self._memory_used <= self._memory_cap:
+                break
+            if key == keep:
+                continue
+            self._memory_used -= self._lru.pop(key)
+            for variant in TEMPLATE_VARIANTS:
+                self._templates[key].__dict__.pop(variant, None)
+
+    def stats(self, reset: bool = False) -> dict[str, TemplateStats]:
+        """
+        :param reset: Start counting from zero again after returning the current counts
+        :return: Hit and miss count per requested template key. A miss means the template had to be loaded.
+        """
+        with self._lock:
+            stats = self._stats
+            if reset:
+                self._stats = {}
+            return dict(stats)
+
+    def memory_used(self) -> int:
+        """
+        :return: Bytes of the currently loaded decoded variants
+        """
+        return self._memory_used
+
+@dataclass
+class ChangeStats:
+    searches: int = 0
+    skipped: int = 0
+    saved_matches: int = 0
+
+class _ChangeDetector:
+    """
+    Remembers the last result of searches per parameter set together with a block downscaled copy of the searched roi.
+    """
+    def __init__(self, size: int):
+        self._size = size
+        # key -> (roi signature, TemplateMatch, number of matchTemplate calls it took)
+        self._entries: OrderedDict[tuple, tuple[np.ndarray, TemplateMatch, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = ChangeStats()
+
+    @staticmethod
+    def signature(inp_img: np.ndarray, roi: list[float] = None) -> np.ndarray:
+        img = cut_roi(inp_img, roi) if roi is not None else inp_img
+        h, w = img.shape[:2]
+        return cv2.resize(img, (max(1, w // CHANGE_BLOCK_SIZE), max(1, h // CHANGE_BLOCK_SIZE)), interpolation=cv2.INTER_AREA)
+
+    def lookup(self, key: tuple, signature: np.ndarray) -> TemplateMatch | None:
+        with self._lock:
+            self._stats.searches += 1
+            if (entry := self._entries.get(key)) is None:
+                return None
+            last_signature, match, match_calls = entry
+            if last_signature.shape != signature.shape or cv2.norm(last_signature, signature, cv2.NORM_INF) > CHANGE_THRESHOLD:
+                return None
+            self._entries.move_to_end(key)
+            self._stats.skipped += 1
+            self._stats.saved_matches += match_calls
+            return replace(match)
+
+    def store(self, key: tuple, signature: np.ndarray, match: TemplateMatch, match_calls: int):
+        with self._lock:
+            self._entries[key] = (signature, replace(match), match_calls)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self._size:
+                self._entries.popitem(last=False)
+
+    def stats(self, reset: bool = False) -> ChangeStats:
+        with self._lock:
+            stats = self._stats
+            if reset:
+                self._stats = ChangeStats()
+            return replace(stats)
+
+_change_detector = _ChangeDetector(CHANGE_CACHE_SIZE)
+
+@dataclass
+class SearchCacheStats:
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / (self.hits + self.misses) if self.hits + self.misses else 0.0
+
+class _SearchCache:
+    """
+    LRU of search results on frames of the screen capture. Frames are never modified, so a result stays valid for its frame id.
+    """
+    def __init__(self, size: int):
+        self._size = size
+        self._entries: OrderedDict[tuple, TemplateMatch] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = SearchCacheStats()
+
+    def get(self, key: tuple) -> TemplateMatch | None:
+        with self._lock:
+            if (match := self._entries.get(key)) is None:
+                self._stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats.hits += 1
+            return replace(match)
+
+    def put(self, key: tuple, match: TemplateMatch):
+        with self._lock:
+            self._entries[key] = replace(match)
+            if len(self._entries) > self._size:
+                self._entries.popitem(last=False)
+
+    def stats(self, reset: bool = False) -> SearchCacheStats:
+        with self._lock:
+            stats = self._stats
+            if reset:
+                self._stats = SearchCacheStats()
+            return replace(stats)
+
+_search_cache = _SearchCache(SEARCH_CACHE_SIZE)
+
+def search_cache_stats(reset: bool = False) -> SearchCacheStats:
+    """
+    :param reset: Start counting from zero again after returning the current counts
+    :return: Hits and misses of search() on captured frames
+    """
+    return _search_cache.stats(reset)
+
+def change_stats(reset: bool = False) -> ChangeStats:
+    """
+    :param reset: Start counting from zero again after returning the current counts
+    :return: Number of searches with skip_unchanged, how many of them were skipped and the matchTemplate calls saved by that
+    """
+    return _change_detector.stats(reset)
+
+@cache
+def stored_templates() -> TemplateRegistry:
+    return TemplateRegistry(_template_file_paths(), Config().advanced_options["template_memory_cap_mb"])
+
+def template_stats(reset: bool = False) -> dict[str, TemplateStats]:
+    return stored_templates().stats(reset)
 
 def get_template(key):
     with templates_lock:
@@ -81,37 +367,100 @@ def _process_template_refs(ref: str | np.ndarray | list[str]) -> list[Template]:
             ))
     return templates
 
-def _single_template_match(template: Template, inp_img: np.ndarray = None, roi: list = None, color_match: list = None, use_grayscale: bool = False) -> TemplateMatch:
-    inp_img = inp_img if inp_img is not None else grab()
-    template_match = TemplateMatch()
-
+@dataclass
+class _PreparedImage:
+    img: np.ndarray = None
+    roi: list = None
+    img_coarse: np.ndarray = None
+
+    def coarse(self) -> np.ndarray:
+        # downscaled copy of img for the first pyramid level, computed on first use
+        if self.img_coarse is None:
+            self.img_coarse = cv2.resize(self.img, None, fx=PYRAMID_SCALE, fy=PYRAMID_SCALE, interpolation=cv2.INTER_AREA)
+        return self.img_coarse
+
+    def mask_region(self, region: list[int]):
+        # black out a region given in screen coordinates
+        x, y, w, h = region
+        self.img = mask_by_roi(self.img, [x - self.roi[0], y - self.roi[1], w, h], "inverse")
+        self.img_coarse = None
+
+def _prepare_image(inp_img: np.ndarray, roi: list = None, color_match: list = None, use_grayscale: bool = False) -> _PreparedImage:
     # crop image to roi
     if roi is None:
         # if no roi is provided roi = full inp_img
         roi = [0, 0, inp_img.shape[1], inp_img.shape[0]]
     rx, ry, rw, rh = roi
     img = inp_img[ry:ry + rh, rx:rx + rw]
-
     # filter for desired color or make grayscale
     if color_match:
-        template_img,  = color_filter(template.img_bgr, color_match)[1],
         img = color_filter(img, color_match)[1]
     elif use_grayscale:
-        template_img = template.img_gray
         img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    else:
-        template_img = template.img_bgr
+    return _PreparedImage(img=img, roi=roi)
+
+def _prepare_template(template: Template, color_match: list = None, use_grayscale: bool = False) -> np.ndarray:
+    if color_match:
+        return color_filter(template.img_bgr, color_match)[1]
+    elif use_grayscale:
+        return template.img_gray
+    return template.img_bgr
+
+def _exact_match(img: np.ndarray, template_img: np.ndarray, mask: np.ndarray = None) -> tuple[float, tuple[int, int]]:
+    res = cv2.matchTemplate(img, template_img, cv2.TM_CCOEFF_NORMED, mask = mask)
+    np.nan_to_num(res, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+    _, max_val, _, max_pos = cv2.minMaxLoc(res)
+    return max_val, max_pos
+
+def _pyramid_match(prepared: _PreparedImage, template_img: np.ndarray, mask: np.ndarray = None) -> tuple[float, tuple[int, int]]:
+    """
+    Coarse-to-fine matching: match downscaled image and template first, then refine the best coarse
+    candidates in small full resolution windows. Falls back to exact matching for small templates.
+    """
+    img = prepared.img
+    th, tw = template_img.shape[:2]
+    if min(th, tw) * PYRAMID_SCALE < PYRAMID_MIN_TEMPLATE_SIZE:
+        return _exact_match(img, template_img, mask)
+    template_coarse = cv2.resize(template_img, None, fx=PYRAMID_SCALE, fy=PYRAMID_SCALE, interpolation=cv2.INTER_AREA)
+    mask_coarse = None
+    if mask is not None:
+        mask_coarse = cv2.resize(mask, (template_coarse.shape[1], template_coarse.shape[0]), interpolation=cv2.INTER_NEAREST)
+    res = cv2.matchTemplate(prepared.coarse(), template_coarse, cv2.TM_CCOEFF_NORMED, mask = mask_coarse)
+    np.nan_to_num(res, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+
+    best_val, best_pos = -1.0, (0, 0)
+    # search window around a candidate covers the rounding error of one coarse pixel plus some slack
+    pad = int(round(1 / PYRAMID_SCALE)) + 2
+    ch, cw = template_coarse.shape[:2]
+    for _ in range(PYRAMID_CANDIDATES):
+        _, _, _, (cx, cy) = cv2.minMaxLoc(res)
+        x0 = max(0, int(cx / PYRAMID_SCALE) - pad)
+        y0 = max(0, int(cy / PYRAMID_SCALE) - pad)
+        window = img[y0:int(cy / PYRAMID_SCALE) + th + pad, x0:int(cx / PYRAMID_SCALE) + tw + pad]
+        if window.shape[0] >= th and window.shape[1] >= tw:
+            val, (fx, fy) = _exact_match(window, template_img, mask)
+            if val > best_val:
+                best_val, best_pos = val, (x0 + fx, y0 + fy)
+        # suppress this candidate so the next iteration picks a different area
+        res[max(0, cy - ch // 2):cy + ch // 2 + 1, max(0, cx - cw // 2):cx + cw // 2 + 1] = -1.0
+    return best_val, best_pos
+
+def _match_prepared(template: Template, prepared: _PreparedImage, color_match: list = None, use_grayscale: bool = False, use_pyramid: bool = False) -> TemplateMatch:
+    template_match = TemplateMatch()
+    template_img = _prepare_template(template, color_match, use_grayscale)
+    img, roi = prepared.img, prepared.roi
 
     if not (img.shape[0] > template_img.shape[0] and img.shape[1] > template_img.shape[1]):
         Logger.error(f"Image shape and template shape are incompatible: {template.name}. Image: {img.shape}, Template: {template_img.shape}, roi: {roi}")
     else:
-        res = cv2.matchTemplate(img, template_img, cv2.TM_CCOEFF_NORMED, mask = template.alpha_mask)
-        np.nan_to_num(res, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
-        _, max_val, _, max_pos = cv2.minMaxLoc(res)
+        if use_pyramid:
+            max_val, max_pos = _pyramid_match(prepared, template_img, template.alpha_mask)
+        else:
+            max_val, max_pos = _exact_match(img, template_img, template.alpha_mask)
 
         # save rectangle corresponding to matched region
-        rec_x = int((max_pos[0] + rx))
-        rec_y = int((max_pos[1] + ry))
+        rec_x = int((max_pos[0] + roi[0]))
+        rec_y = int((max_pos[1] + roi[1]))
         rec_w = int(template_img.shape[1])
         rec_h = int(template_img.shape[0])
         template_match.region = [rec_x, rec_y, rec_w, rec_h]
@@ -124,6 +473,36 @@ def _single_template_match(template: Template, inp_img: np.ndarray = None, roi:
 
     return template_match
 
+def _multi_template_match(
+    templates: list[Template],
+    inp_img: np.ndarray = None,
+    roi: list = None,
+    color_match: list = None,
+    use_grayscale: bool = False,
+    stop_threshold: float = None,
+    use_pyramid: bool = False
+) -> list[TemplateMatch]:
+    """
+    Match several templates against the same image. The roi crop and the color / grayscale conversion of the
+    input image are done once and shared by all templates.
+    :param templates: List of Template objects to match
+    :param stop_threshold: If set, stop matching after the first template scoring at or above this value
+    :Other params are the same as for template_finder.search()
+    :return: List with one TemplateMatch per matched template, in the order of templates
+    """
+    inp_img = inp_img if inp_img is not None else grab()
+    prepared = _prepare_image(inp_img, roi, color_match, use_grayscale)
+    matches = []
+    for template in templates:
+        match = _match_prepared(template, prepared, color_match, use_grayscale, use_pyramid)
+        matches.append(match)
+        if stop_threshold is not None and match.score >= stop_threshold:
+            break
+    return matches
+
+def _single_template_match(template: Template, inp_img: np.ndarray = None, roi: list = None, color_match: list = None, use_grayscale: bool = False, use_pyramid: bool = False) -> TemplateMatch:
+    return _multi_template_match([template], inp_img, roi, color_match, use_grayscale, use_pyramid=use_pyramid)[0]
+
 
 def search(
     ref: str | np.ndarray | list[str],
@@ -132,7 +511,9 @@ def search(
     roi: list[float] = None,
     use_grayscale: bool = False,
     color_match: list = False,
-    best_match: bool = False
+    best_match: bool = False,
+    use_pyramid: bool = False,
+    skip_unchanged: bool = False
 ) -> TemplateMatch:
     """
     Search for a template in an image
@@ -143,21 +524,42 @@ def search(
     :param use_grayscale: Use grayscale template matching for speed up
     :param color_match: Pass a color to be used by misc.color_filter to filter both image of interest and template image (format Config().colors["color"])
     :param best_match: If list input, will search for list of templates by best match. Default behavior is first match.
+    :param use_pyramid: Coarse-to-fine matching on a downscaled copy first, then refine candidates at full resolution. Faster for big rois, scores may differ slightly from exact matching.
+    :param skip_unchanged: Reuse the result of the last search with the same parameters if the roi content did not change since. Meant for polling loops.
     :return: Returns a TemplateMatch object with a valid flag
     """
+    template_match = _search(ref, inp_img, threshold, roi, use_grayscale, color_match, best_match, use_pyramid, skip_unchanged)
+    if type(ref) != np.ndarray:
+        replay.record_decision("search", ref=ref, roi=roi, name=template_match.name, score=template_match.score, valid=template_match.valid)
+    return template_match
+
+def _search(ref, inp_img, threshold, roi, use_grayscale, color_match, best_match, use_pyramid, skip_unchanged) -> TemplateMatch:
+    inp_img = inp_img if inp_img is not None else grab()
+    # searches by template key can be cached, the key identifies the template images
+    params = None
+    if all(type(r) == str for r in (ref if type(ref) == list else [ref])):
+        params = (str(ref), str(roi), threshold, use_grayscale, str(color_match), best_match, use_pyramid)
+    memo_key = None
+    if params is not None and (img_id := frame_id(inp_img)) is not None:
+        memo_key = (img_id, *params)
+        if (template_match := _search_cache.get(memo_key)) is not None:
+            return template_match
+    if skip_unchanged and params is not None:
+        signature = _change_detector.signature(inp_img, roi)
+        if (template_match := _change_detector.lookup(params, signature)) is not None:
+            if memo_key is not None:
+                _search_cache.put(memo_key, template_match)
+            return template_match
     templates = _process_template_refs(ref)
-    matches = []
-    for template in templates:
-        match = _single_template_match(template, inp_img, roi, color_match, use_grayscale)
-        if match.score >= threshold:
-            if not best_match:
-                return match
-            else:
-                matches.append(match)
-    if matches:
-        matches = sorted(matches, key=lambda obj: obj.score, reverse=True)
-        return matches[0]
-    return TemplateMatch()
+    stop_threshold = None if best_match else threshold
+    all_matches = _multi_template_match(templates, inp_img, roi, color_match, use_grayscale, stop_threshold, use_pyramid)
+    matches = [match for match in all_matches if match.score >= threshold]
+    template_match = sorted(matches, key=lambda obj: obj.score, reverse=True)[0] if matches else TemplateMatch()
+    if skip_unchanged and params is not None:
+        _change_detector.store(params, signature, template_match, len(all_matches))
+    if memo_key is not None:
+        _search_cache.put(memo_key, template_match)
+    return template_match
 
 
 def search_and_wait(
@@ -169,10 +571,14 @@ def search_and_wait(
     color_match: list = False,
     best_match: bool = False,
     suppress_debug: bool = False,
+    use_pyramid: bool = False,
+    skip_unchanged: bool = False,
 ) -> TemplateMatch:
     """
     Helper function that will loop and keep searching for a template
     :param timeout: After this amount of time the search will stop and it will return [False, None]
+    :param skip_unchanged: Reuse the result of the last search while the roi did not change. The change detection can miss
+        small shifts in dark, low contrast scenes, so only for callers that just check .valid and not the position
     :Other params are the same as for template_finder.search()
     :returns a TemplateMatch object
     """
@@ -184,7 +590,7 @@ def search_and_wait(
         img = grab()
         is_loading_black_roi = np.average(img[:, 0:Config().ui_roi["loading_left_black"][2]]) < 1.0
         if not is_loading_black_roi or "LOADING" in ref:
-            template_match = search(ref, img, roi=roi, threshold=threshold, use_grayscale=use_grayscale, color_match=color_match, best_match=best_match)
+            template_match = search(ref, img, roi=roi, threshold=threshold, use_grayscale=use_grayscale, color_match=color_match, best_match=best_match, use_pyramid=use_pyramid, skip_unchanged=skip_unchanged)
             if template_match.valid:
                 break
     if not time_remains:
@@ -201,6 +607,7 @@ def search_all(
     roi: list[float] = None,
     use_grayscale: bool = False,
     color_match: list = False,
+    use_pyramid: bool = False,
 ) -> list[TemplateMatch]:
     """
     Returns a list of all templates scoring above set threshold on the screen
@@ -209,14 +616,16 @@ def search_all(
     """
     templates = _process_template_refs(ref)
     matches = []
-    img = inp_img.copy()
+    # preprocess the roi once, found regions are then blacked out directly on the preprocessed image
+    prepared = _prepare_image(inp_img, roi, color_match, use_grayscale)
+    prepared.img = prepared.img.copy()
     while True:
         any_found = False
         for template in templates:
-            match = _single_template_match(template, img, roi, color_match, use_grayscale)
+            match = _match_prepared(template, prepared, color_match, use_grayscale, use_pyramid)
             if (ind_found := match.score >= threshold):
                 matches.append(match)
-                img = mask_by_roi(img, match.region, "inverse")
+                prepared.mask_region(match.region)
                 any_found |= ind_found
         if not any_found:
             break
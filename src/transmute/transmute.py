@@ -200,7 +200,7 @@ class Transmute:
         return self._game_stats._game_counter - self._last_game >= int(every_x_game)
 
     def run_transmutes(self, force=False) -> None:
-        if not wait_until_visible(ScreenObjects.GoldBtnStash, timeout = 8).valid:
+        if not wait_until_visible(ScreenObjects.GoldBtnStash, timeout = 8, skip_unchanged = True).valid:
             Logger.error("Could not find stash menu. Continue...")
             return
         if not force and not self.should_transmute():
@@ -17,8 +17,9 @@ def get_experience():
 
     mouse.move(x_m, y_m-50, randomize = (8,1))
     crop = cut_roi(img, Config().ui_roi["xp_bar_text"])
-    ocr_result = ocr.image_to_text(
-        images = crop,
+    ocr_result = ocr.image_to_text_fixed_font(
+        "experience",
+        crop,
         model = "ground-eng_inconsolata_inv_th_fast",
         psm = 7,
         scale = 1.3,
@@ -29,7 +30,7 @@ def get_experience():
         fix_regexps = False,
         check_known_errors = False,
         correct_words = False
-    )[0]
+    )
 
     split_text = ocr_result.text.split(' ')
 
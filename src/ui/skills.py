@@ -26,7 +26,7 @@ def has_tps() -> bool:
     """
     if Config().char["town_portal"]:
         keyboard.send(Config().char["town_portal"])
-        if not (tps_remain := wait_until_visible(ScreenObjects.TownPortalSkill, timeout=4).valid):
+        if not (tps_remain := wait_until_visible(ScreenObjects.TownPortalSkill, timeout=4, skip_unchanged=True).valid):
             Logger.warning("You are out of tps")
             if Config().general["info_screenshots"]:
                 cv2.imwrite("./log/screenshots/info/debug_out_of_tps_" + time.strftime("%Y%m%d_%H%M%S") + ".png", grab())
@@ -74,8 +74,9 @@ def get_skill_charges(img: np.ndarray = None):
     h = round(h/2 + 5)
     img = cut_roi(img, [x, y, w, h])
     mask, _ = color_filter(img, Config().colors["skill_charges"])
-    ocr_result = ocr.image_to_text(
-        images = mask,
+    ocr_result = ocr.image_to_text_fixed_font(
+        "skill_charges",
+        mask,
         model = "hover-eng_inconsolata_inv_th_fast",
         psm = 7,
         word_list = "",
@@ -88,7 +89,7 @@ def get_skill_charges(img: np.ndarray = None):
         fix_regexps = False,
         check_known_errors = False,
         correct_words = False
-    )[0]
+    )
     try:
         return int(ocr_result.text)
     except:
@@ -10,7 +10,7 @@ from utils.custom_mouse import mouse
 from utils.misc import wait, cut_roi, image_is_equal
 from logger import Logger
 from config import Config
-from screen import convert_abs_to_screen, convert_monitor_to_screen, convert_screen_to_abs, convert_screen_to_monitor, grab, convert_abs_to_monitor
+from screen import convert_abs_to_screen, convert_monitor_to_screen, convert_screen_to_abs, convert_screen_to_monitor, grab, grab_roi, grab_partial, convert_abs_to_monitor
 import template_finder
 from template_finder import TemplateMatch
 from dataclasses import dataclass
@@ -32,6 +32,7 @@ class ScreenObject:
     use_grayscale: bool = False
     color_match: list[np.array] = None
     suppress_debug: bool = False
+    use_pyramid: bool = False
 
     def __call__(self, cls):
         cls._screen_object = self
@@ -265,9 +266,10 @@ class ScreenObjects:
         threshold=0.8,
     )
 
-def detect_screen_object(screen_object: ScreenObject, img: np.ndarray = None) -> TemplateMatch:
+def detect_screen_object(screen_object: ScreenObject, img: np.ndarray = None, skip_unchanged: bool = False) -> TemplateMatch:
     roi = Config().ui_roi[screen_object.roi] if screen_object.roi else None
-    img = grab() if img is None else img
+    if img is None:
+        img = grab_partial([roi]) if roi else grab()
     return template_finder.search(
         ref = screen_object.ref,
         inp_img = img,
@@ -275,6 +277,8 @@ def detect_screen_object(screen_object: ScreenObject, img: np.ndarray = None) ->
         roi = roi,
         best_match = screen_object.best_match,
         use_grayscale = screen_object.use_grayscale,
+        use_pyramid = screen_object.use_pyramid,
+        skip_unchanged = skip_unchanged,
         )
 
 def select_screen_object_match(match: TemplateMatch, delay_factor: tuple[float, float] = (0.9, 1.1)) -> None:
@@ -286,21 +290,22 @@ def select_screen_object_match(match: TemplateMatch, delay_factor: tuple[float,
 def is_visible(screen_object: ScreenObject, img: np.ndarray = None) -> bool:
     return detect_screen_object(screen_object, img).valid
 
-def wait_until_visible(screen_object: ScreenObject, timeout: float = 30, suppress_debug: bool = False) -> TemplateMatch:
-    if not (match := _wait_until(lambda: detect_screen_object(screen_object), lambda match: match.valid, timeout)[0]).valid:
+def wait_until_visible(screen_object: ScreenObject, timeout: float = 30, suppress_debug: bool = False, skip_unchanged: bool = False) -> TemplateMatch:
+    # skip_unchanged: see template_finder.search_and_wait()
+    if not (match := _wait_until(lambda: detect_screen_object(screen_object, skip_unchanged=skip_unchanged), lambda match: match.valid, timeout)[0]).valid:
         if not suppress_debug:
             Logger.debug(f"{screen_object.ref} not found after {timeout} seconds")
     return match
 
-def wait_until_hidden(screen_object: ScreenObject, timeout: float = 3, suppress_debug: bool = False) -> bool:
-    if not (hidden := _wait_until(lambda: detect_screen_object(screen_object).valid, lambda res: not res, timeout)[1]):
+def wait_until_hidden(screen_object: ScreenObject, timeout: float = 3, suppress_debug: bool = False, skip_unchanged: bool = False) -> bool:
+    if not (hidden := _wait_until(lambda: detect_screen_object(screen_object, skip_unchanged=skip_unchanged).valid, lambda res: not res, timeout)[1]):
         if not suppress_debug:
             Logger.debug(f"{screen_object.ref} still found after {timeout} seconds")
     return hidden
 
 def wait_for_update(img: np.ndarray, roi: list[int] = None, timeout: float = 3, suppress_debug: bool = False) -> bool:
     roi = roi if roi is not None else [0, 0, img.shape[0]-1, img.shape[1] -1]
-    if not (change := _wait_until(lambda: cut_roi(grab(), roi), lambda res: not image_is_equal(cut_roi(img, roi), res), timeout)[1]):
+    if not (change := _wait_until(lambda: grab_roi(roi), lambda res: not image_is_equal(cut_roi(img, roi), res), timeout)[1]):
         if not suppress_debug:
             Logger.debug(f"ROI: '{roi}' unchanged after {timeout} seconds")
     return change
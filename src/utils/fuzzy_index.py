@@ -0,0 +1,67 @@
+from typing import Iterable
+from rapidfuzz.process import extractOne
+from rapidfuzz.string_metric import levenshtein
+from utils.misc import BestMatchResult
+
+# Words within this levenshtein distance are found through the delete index, larger distances fall back to a full scan
+FUZZY_INDEX_MAX_DISTANCE = 2
+
+
+def _deletes(word: str, max_distance: int) -> set[str]:
+    deletes = frontier = {word}
+    for _ in range(max_distance):
+        frontier = {w[:i] + w[i+1:] for w in frontier for i in range(len(w))}
+        deletes = deletes | frontier
+    return deletes
+
+
+class FuzzyIndex:
+    """
+    Symmetric delete index (SymSpell) over a fixed word list. Two strings within levenshtein distance d always share
+    a string that is reachable from both by deleting at most d characters, so the closest word within
+    FUZZY_INDEX_MAX_DISTANCE is found with a few dict lookups instead of comparing against every word.
+    best_match() returns the same distance as find_best_match() over the whole list.
+    """
+    def __init__(self, words: Iterable[str], max_distance: int = FUZZY_INDEX_MAX_DISTANCE):
+        # sorted, so ties resolve the same way on every run
+        self._words = sorted(set(words))
+        self._word_set = frozenset(self._words)
+        self._max_distance = max_distance
+        self._deletes: dict[str, list[int]] = {}
+        for idx, word in enumerate(self._words):
+            for delete in _deletes(word, max_distance):
+                self._deletes.setdefault(delete, []).append(idx)
+
+    def __contains__(self, word: str) -> bool:
+        return word in self._word_set
+
+    def __len__(self) -> int:
+        return len(self._words)
+
+    def best_match(self, in_str: str, score_cutoff: int = None) -> BestMatchResult | None:
+        """
+        :param in_str: string to look up
+        :param score_cutoff: max levenshtein distance of interest. None = always return the closest word
+        :return: closest word and its distance, None if no word is within score_cutoff
+        """
+        if in_str in self._word_set:
+            return BestMatchResult(in_str, 0, 1.0)
+        best_idx, best_lev = None, None
+        candidates = set()
+        for delete in _deletes(in_str, self._max_distance):
+            candidates.update(self._deletes.get(delete, ()))
+        for idx in sorted(candidates):
+            lev = levenshtein(in_str, self._words[idx])
+            if best_lev is None or lev < best_lev:
+                best_idx, best_lev = idx, lev
+        if best_lev is not None and best_lev <= self._max_distance:
+            best_match = self._words[best_idx]
+        elif score_cutoff is not None and score_cutoff <= self._max_distance:
+            return None
+        elif (res := extractOne(in_str, self._words, scorer=levenshtein, score_cutoff=score_cutoff)) is not None:
+            best_match, best_lev, _ = res
+        else:
+            return None
+        if score_cutoff is not None and best_lev > score_cutoff:
+            return None
+        return BestMatchResult(best_match, best_lev, 1 - best_lev / max(1, len(in_str)))
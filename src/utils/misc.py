@@ -1,6 +1,10 @@
+from collections import OrderedDict
 from dataclasses import dataclass
 from decimal import InvalidOperation
+from functools import lru_cache
+import threading
 import time
+import weakref
 import random
 import ctypes
 import numpy as np
@@ -144,7 +148,66 @@ def roi_center(roi: list[float] = None):
     x, y, w, h = roi
     return round(x + w/2), round(y + h/2)
 
-def color_filter(img, color_range):
+# HSV conversions of images registered with share_hsv() (the screen frames) are kept for this many images
+HSV_CACHE_SIZE = 8
+
+_hsv_cache: OrderedDict[int, tuple[weakref.ref, np.ndarray | None]] = OrderedDict()
+_hsv_lock = threading.Lock()
+
+def share_hsv(img: np.ndarray):
+    """
+    Lets color_filter() calls on img and on crops of it share one HSV conversion. img must not be modified in place
+    afterwards, registering the same array again (e.g. a reused frame buffer) drops its previous conversion.
+    :param img: contiguous BGR image
+    """
+    with _hsv_lock:
+        _hsv_cache.pop(id(img), None)
+        _hsv_cache[id(img)] = (weakref.ref(img), None)
+        while len(_hsv_cache) > HSV_CACHE_SIZE:
+            _hsv_cache.popitem(last=False)
+
+def _view_offset(img: np.ndarray, base: np.ndarray) -> tuple[int, int] | None:
+    # (y, x) of the crop img within base, None if img is not a plain 2d crop of base
+    if img.ndim != 3 or img.strides != base.strides or img.shape[2] != base.shape[2]:
+        return None
+    offset = img.__array_interface__["data"][0] - base.__array_interface__["data"][0]
+    y, rest = divmod(offset, base.strides[0])
+    x, channel = divmod(rest, base.strides[1])
+    if channel or y + img.shape[0] > base.shape[0] or x + img.shape[1] > base.shape[1]:
+        return None
+    return y, x
+
+def to_hsv(img: np.ndarray) -> np.ndarray:
+    """
+    :param img: BGR image
+    :return: img converted to HSV. For images registered with share_hsv() and crops of them the conversion of the
+        whole image is reused once it exists, it is only made for a whole image though, a crop converts just itself.
+    """
+    base = img
+    while isinstance(base.base, np.ndarray):
+        base = base.base
+    with _hsv_lock:
+        entry = _hsv_cache.get(id(base))
+        if entry is not None and entry[0]() is base:
+            _hsv_cache.move_to_end(id(base))
+            if entry[1] is not None:
+                if base is img:
+                    return entry[1]
+                if (offset := _view_offset(img, base)) is not None:
+                    y, x = offset
+                    return entry[1][y:y + img.shape[0], x:x + img.shape[1]]
+        else:
+            entry = None
+    hsv_img = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
+    if entry is not None and base is img:
+        with _hsv_lock:
+            # unless the image was registered again in the meantime
+            if _hsv_cache.get(id(base)) is entry:
+                _hsv_cache[id(base)] = (entry[0], hsv_img)
+    return hsv_img
+
+def _split_hue_range(color_range) -> list:
+    # opencv hues are in [0, 180), ranges reaching beyond are split into two ranges at the wraparound
     color_ranges=[]
     # ex: [array([ -9, 201,  25]), array([ 9, 237,  61])]
     if color_range[0][0] < 0:
@@ -166,15 +229,83 @@ def color_filter(img, color_range):
         color_ranges.append(lower_range)
     else:
         color_ranges.append(color_range)
+    return color_ranges
+
+def color_filter(img, color_range):
+    hsv_img = to_hsv(img)
     color_masks = []
-    for color_range in color_ranges:
-        hsv_img = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
+    for color_range in _split_hue_range(color_range):
         mask = cv2.inRange(hsv_img, color_range[0], color_range[1])
         color_masks.append(mask)
     color_mask = np.bitwise_or.reduce(color_masks) if len(color_masks) > 0 else color_masks[0]
     filtered_img = cv2.bitwise_and(img, img, mask=color_mask)
     return color_mask, filtered_img
 
+@lru_cache(maxsize=32)
+def _color_luts(bounds: tuple[tuple[int, ...], ...]) -> list[tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    # per 8 ranges one lookup table for each of h, s and v: bit i of lut[v] is set if value v is within range i
+    values = np.arange(256)
+    luts = []
+    for group in range(0, len(bounds), 8):
+        lut = np.zeros((256, 3), dtype=np.uint8)
+        for bit, color_range in enumerate(bounds[group:group + 8]):
+            lower, upper = np.split(np.array(color_range), 2)
+            in_range = np.zeros((256, 3), dtype=bool)
+            for part in _split_hue_range([lower, upper]):
+                in_range[:, 0] |= (values >= part[0][0]) & (values <= part[1][0])
+            in_range[:, 1:] = (values[:, None] >= lower[1:]) & (values[:, None] <= upper[1:])
+            lut |= (in_range << bit).astype(np.uint8)
+        luts.append(tuple(np.ascontiguousarray(lut[:, channel]) for channel in range(3)))
+    return luts
+
+def _group_bits(img: np.ndarray, color_ranges: list) -> list[np.ndarray]:
+    # bit i of group_bits[g] is set for pixels within color_ranges[8 * g + i]
+    channels = cv2.split(to_hsv(img))
+    bounds = tuple(tuple(int(v) for v in np.concatenate(color_range)) for color_range in color_ranges)
+    return [
+        cv2.bitwise_and(cv2.bitwise_and(cv2.LUT(channels[0], lut_h), cv2.LUT(channels[1], lut_s)), cv2.LUT(channels[2], lut_v))
+        for lut_h, lut_s, lut_v in _color_luts(bounds)
+    ]
+
+def color_bits(img: np.ndarray, color_ranges: list) -> np.ndarray:
+    """
+    Classifies every pixel against all color ranges in one pass: one HSV conversion and three table lookups per
+    8 ranges instead of a conversion and an inRange() per range.
+    :param img: BGR image
+    :param color_ranges: color ranges in the format of Config().colors values
+    :return: label image, bit i of a pixel is set if it is within color_ranges[i]. dtype is the smallest unsigned int
+        with a bit per range
+    """
+    if len(color_ranges) > 64:
+        raise ValueError(f"At most 64 color ranges, got {len(color_ranges)}")
+    if not color_ranges:
+        return np.zeros(img.shape[:2], dtype=np.uint8)
+    group_bits = _group_bits(img, color_ranges)
+    if len(group_bits) == 1:
+        return group_bits[0]
+    dtype = next(t for t in (np.uint16, np.uint32, np.uint64) if np.iinfo(t).bits >= len(color_ranges))
+    bits = group_bits[0].astype(dtype)
+    for group in range(1, len(group_bits)):
+        bits |= group_bits[group].astype(dtype) << dtype(8 * group)
+    return bits
+
+def color_filter_multi(img: np.ndarray, color_ranges: list) -> np.ndarray:
+    """
+    color_filter() for several color ranges at once, e.g. list(Config().colors.values())
+    :param img: BGR image
+    :param color_ranges: color ranges in the format of Config().colors values
+    :return: stack of masks (len(color_ranges) x h x w), the same masks color_filter() returns for each range
+    """
+    masks = np.empty((len(color_ranges),) + img.shape[:2], dtype=np.uint8)
+    if not color_ranges:
+        return masks
+    for idx, bits in enumerate(_group_bits(img, color_ranges)):
+        for bit in range(min(8, len(color_ranges) - 8 * idx)):
+            mask = masks[8 * idx + bit]
+            cv2.bitwise_and(bits, 1 << bit, dst=mask)
+            cv2.threshold(mask, 0, 255, cv2.THRESH_BINARY, dst=mask)
+    return masks
+
 def hms(seconds: int):
     seconds = int(seconds)
     h = seconds // 3600
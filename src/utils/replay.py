@@ -0,0 +1,258 @@
+"""
+Record and play back what the bot saw and did.
+
+A recording is a zip file containing
+    meta.json       format version, window position and screen size
+    events.jsonl    one event per line, "t" is seconds since start of the recording:
+                    frame (a new frame was captured), read (a consumer got a frame), action (mouse / keyboard input),
+                    decision (template scores, ocr text, pickit verdicts, see record_decision())
+    frames/<id>.png every frame that was handed out to a consumer
+
+ReplayPlayer feeds the recorded frames back through screen.grab() in the order they were read and stubs out
+mouse and keyboard, so pather, pickit or health logic can be run and profiled without the game.
+"""
+import json
+import os
+import queue
+import threading
+import time
+import zipfile
+import cv2
+import keyboard
+import numpy as np
+import screen
+from logger import Logger
+
+REPLAY_FORMAT_VERSION = 1
+REPLAY_DIR = "log/replays"
+
+_KEYBOARD_FUNCTIONS = ["send", "press", "release", "write"]
+_MOUSE_FUNCTIONS = ["move", "click", "press", "release", "wheel"]
+
+# active ReplayRecorder or ReplayPlayer, receives record_decision() calls
+_session = None
+
+
+class ReplayFinished(Exception):
+    pass
+
+
+def record_decision(kind: str, **data):
+    """
+    Adds a decision to the active recording (or to ReplayPlayer.decisions during playback). Does nothing otherwise.
+    :param kind: e.g. "search", "ocr", "pickit"
+    :param data: json serializable values describing the decision
+    """
+    if _session is not None:
+        _session.decision(kind, data)
+
+def _to_json(obj):
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    return str(obj)
+
+def _hook_inputs(on_action, call_through: bool) -> list[tuple]:
+    # custom_mouse imports template_finder which records its decisions here, import late to avoid the cycle
+    from utils.custom_mouse import mouse
+    originals = []
+    for owner, device, names in [(keyboard, "keyboard", _KEYBOARD_FUNCTIONS), (mouse, "mouse", _MOUSE_FUNCTIONS)]:
+        for name in names:
+            # mouse is a class with (mostly) static methods, keyboard a module
+            original = owner.__dict__[name] if isinstance(owner, type) else getattr(owner, name)
+            func = original.__func__ if isinstance(original, staticmethod) else original
+            def hook(*args, _device=device, _name=name, _func=func, **kwargs):
+                on_action(_device, _name, args, kwargs)
+                if call_through:
+                    return _func(*args, **kwargs)
+            setattr(owner, name, staticmethod(hook) if isinstance(owner, type) else hook)
+            originals.append((owner, name, original))
+    return originals
+
+def _unhook_inputs(originals: list[tuple]):
+    for owner, name, original in originals:
+        setattr(owner, name, original)
+
+
+class ReplayRecorder:
+    def __init__(self, path: str = None):
+        """
+        :param path: zip file to write, defaults to a timestamped file in REPLAY_DIR
+        """
+        self._path = path or os.path.join(REPLAY_DIR, f"replay_{time.strftime('%Y%m%d_%H%M%S')}.zip")
+        self._events = []
+        self._seen_frames = set()
+        self._lock = threading.Lock()
+        self._frames = queue.Queue()
+        self._start = None
+        self._zip = None
+        self._writer = None
+        self._hooks = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self):
+        global _session
+        os.makedirs(os.path.dirname(self._path) or ".", exist_ok=True)
+        self._start = time.perf_counter()
+        self._zip = zipfile.ZipFile(f"{self._path}.tmp", "w")
+        # png encoding is slow, frames are written by their own thread
+        self._writer = threading.Thread(target=self._write_frames)
+        self._writer.start()
+        self._hooks = _hook_inputs(self._on_action, call_through=True)
+        screen.set_frame_listener(self._on_frame)
+        _session = self
+        Logger.debug(f"Recording replay to {self._path}")
+
+    def stop(self) -> str:
+        """
+        :return: path of the written recording
+        """
+        global _session
+        _session = None
+        screen.set_frame_listener(None)
+        _unhook_inputs(self._hooks)
+        self._frames.put(None)
+        self._writer.join()
+        meta = {
+            "version": REPLAY_FORMAT_VERSION,
+            "monitor_roi": {k: screen.monitor_roi[k] for k in ("left", "top", "width", "height")},
+            "frames": len(self._seen_frames),
+            "duration": time.perf_counter() - self._start,
+        }
+        self._zip.writestr("meta.json", json.dumps(meta), compress_type=zipfile.ZIP_DEFLATED)
+        with self._lock:
+            events = "\n".join(json.dumps(event, default=_to_json) for event in self._events)
+        self._zip.writestr("events.jsonl", events, compress_type=zipfile.ZIP_DEFLATED)
+        self._zip.close()
+        os.replace(f"{self._path}.tmp", self._path)
+        Logger.debug(f"Wrote replay with {meta['frames']} frames and {len(self._events)} events to {self._path}")
+        return self._path
+
+    def _event(self, event_type: str, t: float = None, **data):
+        event = {"t": round((t if t is not None else time.perf_counter()) - self._start, 4), "type": event_type, **data}
+        with self._lock:
+            self._events.append(event)
+
+    def _on_frame(self, frame: screen.Frame):
+        with self._lock:
+            new_frame = frame.id not in self._seen_frames
+            self._seen_frames.add(frame.id)
+        if new_frame:
+            self._event("frame", t=frame.timestamp, frame=frame.id)
+            self._frames.put(frame)
+        self._event("read", frame=frame.id, thread=threading.current_thread().name)
+
+    def _on_action(self, device: str, name: str, args: tuple, kwargs: dict):
+        self._event("action", device=device, name=name, args=list(args), kwargs=kwargs)
+
+    def decision(self, kind: str, data: dict):
+        self._event("decision", kind=kind, **data)
+
+    def _write_frames(self):
+        while (frame := self._frames.get()) is not None:
+            ok, png = cv2.imencode(".png", frame.img, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+            if ok:
+                self._zip.writestr(f"frames/{frame.id}.png", png.tobytes(), compress_type=zipfile.ZIP_STORED)
+
+
+class ReplayPlayer:
+    def __init__(self, path: str, thread: str = None, fast: bool = True):
+        """
+        :param path: recording written by ReplayRecorder
+        :param thread: only play back the frames read by this recorded thread, e.g. the bot thread. Default: all reads in recorded order
+        :param fast: skip all time.sleep() calls (incl. utils.misc.wait and mouse movement) during playback
+        """
+        self._zip = zipfile.ZipFile(path, "r")
+        self.meta = json.loads(self._zip.read("meta.json"))
+        if self.meta.get("version") != REPLAY_FORMAT_VERSION:
+            raise ValueError(f"Unsupported replay format version {self.meta.get('version')} in {path}")
+        events = [json.loads(line) for line in self._zip.read("events.jsonl").decode().splitlines() if line]
+        self._reads = [e["frame"] for e in events if e["type"] == "read" and (thread is None or e["thread"] == thread)]
+        self.recorded_actions = [e for e in events if e["type"] == "action"]
+        self.recorded_decisions = [e for e in events if e["type"] == "decision"]
+        self.actions = []
+        self.decisions = []
+        self._fast = fast
+        self._read_idx = 0
+        self._frame_cache: dict[int, screen.Frame] = {}
+        self._hooks = []
+        self._sleep = None
+        self._get_position = None
+        self._mouse_pos = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    @property
+    def frames_left(self) -> int:
+        return len(self._reads) - self._read_idx
+
+    def start(self):
+        global _session
+        from utils.custom_mouse import mouse
+        roi = self.meta["monitor_roi"]
+        screen.set_window_position(roi["left"], roi["top"])
+        self._mouse_pos = screen.convert_screen_to_monitor((roi["width"] // 2, roi["height"] // 2))
+        screen.set_frame_source(self._next_frame)
+        self._hooks = _hook_inputs(self._on_action, call_through=False)
+        self._get_position = mouse.__dict__["get_position"]
+        mouse.get_position = staticmethod(lambda: self._mouse_pos)
+        if self._fast:
+            self._sleep = time.sleep
+            time.sleep = lambda *args, **kwargs: None
+        _session = self
+
+    def stop(self):
+        global _session
+        from utils.custom_mouse import mouse
+        _session = None
+        if self._sleep is not None:
+            time.sleep = self._sleep
+            self._sleep = None
+        mouse.get_position = self._get_position
+        _unhook_inputs(self._hooks)
+        screen.set_frame_source(None)
+
+    def _next_frame(self) -> screen.Frame:
+        if self._read_idx >= len(self._reads):
+            raise ReplayFinished(f"All {len(self._reads)} recorded frame reads played back")
+        frame_id = self._reads[self._read_idx]
+        self._read_idx += 1
+        if (frame := self._frame_cache.get(frame_id)) is None:
+            img = cv2.imdecode(np.frombuffer(self._zip.read(f"frames/{frame_id}.png"), dtype=np.uint8), cv2.IMREAD_COLOR)
+            # keep identity of recently read frames, consumers (e.g. the search cache) rely on it
+            self._frame_cache = {k: v for k, v in self._frame_cache.items() if k > frame_id - screen.FRAME_BUFFER_SIZE}
+            frame = self._frame_cache[frame_id] = screen.Frame(frame_id, img, time.perf_counter())
+        frame.timestamp = time.perf_counter()
+        return frame
+
+    def _on_action(self, device: str, name: str, args: tuple, kwargs: dict):
+        if device == "mouse" and name == "move":
+            self._mouse_pos = args[:2]
+        self.actions.append({"device": device, "name": name, "args": list(args), "kwargs": kwargs})
+
+    def decision(self, kind: str, data: dict):
+        self.decisions.append({"kind": kind, **data})
+
+
+# Summary of a recording: PYTHONPATH=./src python src/utils/replay.py log/replays/replay_xxx.zip
+if __name__ == "__main__":
+    import sys
+    from collections import Counter
+    player = ReplayPlayer(sys.argv[1])
+    print(f"{player.meta['frames']} frames, {player.frames_left} reads, {player.meta['duration']:.1f} s")
+    actions = Counter(f"{a['device']}.{a['name']}" for a in player.recorded_actions)
+    decisions = Counter(d["kind"] for d in player.recorded_decisions)
+    print(f"actions: {dict(actions)}")
+    print(f"decisions: {dict(decisions)}")
@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+from collections.abc import Iterable, Mapping
+import numpy as np
+from logger import Logger
+
+# bump when the bundle layout or the stored variants change
+TEMPLATE_CACHE_VERSION = 3
+TEMPLATE_CACHE_DIR = "cache/templates"
+_INDEX_FILE = "index.json"
+# variants are stored as raw bytes, each one starts at a multiple of this to keep wider dtypes aligned
+_ALIGNMENT = 8
+
+
+def asset_signature(paths: list[str]) -> str:
+    """
+    Hash over path, mtime and size of all template files. Any added, removed or modified asset changes the signature.
+    :param paths: list of template file paths in load order
+    :return: hex digest
+    """
+    h = hashlib.sha1(f"v{TEMPLATE_CACHE_VERSION}".encode())
+    for path in paths:
+        stat = os.stat(path)
+        h.update(f"{path}|{stat.st_mtime_ns}|{stat.st_size}\n".encode())
+    return h.hexdigest()
+
+def save(templates: Mapping[str, dict[str, np.ndarray]] | Iterable[tuple[str, dict[str, np.ndarray]]], signature: str, cache_dir: str = TEMPLATE_CACHE_DIR) -> bool:
+    """
+    Writes the raw bytes of all template variants into one data file plus a json index of byte offsets, shapes and
+    dtypes. Variants of non-numeric dtype (e.g. object arrays) can not be stored and fail the save.
+    :param templates: {key: {variant_name: array or None}} or an iterable of (key, variants), which is consumed one
+        template at a time, so the templates don't have to be decoded all at once
+    :param signature: asset signature the bundle was built from, see asset_signature()
+    :return: True if the bundle was written
+    """
+    index = {"version": TEMPLATE_CACHE_VERSION, "signature": signature, "data": f"{signature}.bin", "entries": {}}
+    data_path = os.path.join(cache_dir, index["data"])
+    total_size = 0
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(f"{data_path}.tmp", "wb") as f:
+            for key, variants in (templates.items() if isinstance(templates, Mapping) else templates):
+                entry = {}
+                for variant, img in variants.items():
+                    if img is None:
+                        entry[variant] = None
+                        continue
+                    if img.dtype.kind not in "biuf":
+                        raise ValueError(f"unsupported dtype {img.dtype} of template {key}")
+                    entry[variant] = [total_size, list(img.shape), img.dtype.str]
+                    f.write(np.ascontiguousarray(img).tobytes())
+                    padding = -img.nbytes % _ALIGNMENT
+                    f.write(bytes(padding))
+                    total_size += img.nbytes + padding
+                index["entries"][key] = entry
+        os.replace(f"{data_path}.tmp", data_path)
+        # index is written last, so a bundle is only picked up once its data file is complete
+        index_path = os.path.join(cache_dir, _INDEX_FILE)
+        with open(f"{index_path}.tmp", "w") as f:
+            json.dump(index, f)
+        os.replace(f"{index_path}.tmp", index_path)
+    except (OSError, ValueError) as e:
+        Logger.warning(f"Could not write template cache: {e}")
+        return False
+    # remove bundles of older asset versions, they might still be mapped by another botty process
+    for file_name in os.listdir(cache_dir):
+        if file_name.endswith((".bin", ".npy")) and file_name != index["data"]:
+            try:
+                os.remove(os.path.join(cache_dir, file_name))
+            except OSError:
+                pass
+    Logger.debug(f"Wrote template cache with {len(index['entries'])} templates ({total_size / 1e6:.1f} MB)")
+    return True
+
+def load(signature: str, cache_dir: str = TEMPLATE_CACHE_DIR) -> dict[str, dict[str, np.ndarray]] | None:
+    """
+    Maps the template bundle read-only into memory. The returned arrays are views into the mapped file,
+    no decoding or copying takes place.
+    :param signature: expected asset signature, see asset_signature()
+    :return: {key: {variant_name: array or None}} or None if there is no valid bundle for this signature
+    """
+    try:
+        with open(os.path.join(cache_dir, _INDEX_FILE), "r") as f:
+            index = json.load(f)
+        if index.get("version") != TEMPLATE_CACHE_VERSION or index.get("signature") != signature:
+            return None
+        data = np.memmap(os.path.join(cache_dir, index["data"]), dtype=np.uint8, mode="r")
+    except (OSError, ValueError, KeyError):
+        return None
+    templates = {}
+    for key, entry in index["entries"].items():
+        variants = {}
+        for variant, location in entry.items():
+            if location is None:
+                variants[variant] = None
+            else:
+                offset, shape, dtype = location
+                dtype = np.dtype(dtype)
+                size = int(np.prod(shape)) * dtype.itemsize
+                variants[variant] = np.asarray(data[offset:offset + size]).view(dtype).reshape(shape)
+        templates[key] = variants
+    return templates
+
+
+# Rebuild the template cache: PYTHONPATH=./src python src/utils/template_cache.py
+if __name__ == "__main__":
+    import template_finder
+    if template_finder.build_template_cache():
+        print(f"Built template cache in {TEMPLATE_CACHE_DIR}")
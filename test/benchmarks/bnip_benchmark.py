@@ -0,0 +1,56 @@
+"""
+Compares the previous eval() of the transpiled expression strings, the compiled expression functions checked in order,
+bnip.actions.should_keep() with its rule index and keep() of the ruleset compiled into one module (bnip.ruleset),
+with the expressions of test/nip/keep_item_test_cases.py as ruleset and random items (test/nip/bnip_items.py).
+Reports us per item and checks that they keep the same items by the same expression.
+
+Run from the repo root:
+    PYTHONPATH=./src python test/benchmarks/bnip_benchmark.py [items]
+"""
+import sys
+import tempfile
+import time
+sys.path.append("test/nip")
+import bnip.actions as bnip_actions
+import bnip.transpile as transpile
+from bnip.ruleset import CompiledRuleset, generate_ruleset_source, ruleset_path, write_ruleset_module
+from bnip_items import random_items
+from keep_item_test_cases import BNIP_KEEP_TESTS
+
+DEFAULT_ITEMS = 500
+
+def legacy_should_keep(item_data: dict) -> tuple[bool, str]:
+    for expression in bnip_actions.bnip_expressions:
+        if eval(expression.transpiled, vars(transpile), {"item_data": item_data}):
+            return True, expression.raw
+    return False, ""
+
+def compiled_should_keep(item_data: dict) -> tuple[bool, str]:
+    for expression in bnip_actions.bnip_expressions:
+        if expression.keep_fn(item_data):
+            return True, expression.raw
+    return False, ""
+
+def run(should_keep, items: list[dict]) -> tuple[float, list[tuple[bool, str]]]:
+    start = time.perf_counter()
+    results = [should_keep(item) for item in items]
+    return (time.perf_counter() - start) / len(items), results
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ITEMS
+    raw_expressions = {test["expression"] for tests in BNIP_KEEP_TESTS.values() for test in tests}
+    expressions = [transpile.generate_expression_object(raw) for raw in sorted(raw_expressions)]
+    bnip_actions.bnip_expressions = sorted([e for e in expressions if e is not None], key=lambda x: len(x.raw))
+    items = random_items(count)
+    t_legacy, legacy = run(legacy_should_keep, items)
+    t_compiled, compiled = run(compiled_should_keep, items)
+    t_indexed, indexed = run(bnip_actions.should_keep, items)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        source = generate_ruleset_source([bnip_actions._rule_plan(e) for e in bnip_actions.bnip_expressions], [])
+        ruleset = CompiledRuleset(write_ruleset_module(ruleset_path(cache_dir, "benchmark"), source), bnip_actions.bnip_expressions)
+    t_ruleset, compiled_ruleset = run(ruleset.keep, items)
+    print(f"{len(bnip_actions.bnip_expressions)} expressions, {len(items)} items, {sum(keep for keep, _ in indexed)} kept")
+    print(f"{'eval':<10}{t_legacy*1e6:>10.1f} us/item")
+    print(f"{'compiled':<10}{t_compiled*1e6:>10.1f} us/item  ({t_legacy/t_compiled:.1f}x, same verdicts: {legacy == compiled})")
+    print(f"{'indexed':<10}{t_indexed*1e6:>10.1f} us/item  ({t_legacy/t_indexed:.1f}x, same verdicts: {legacy == indexed})")
+    print(f"{'ruleset':<10}{t_ruleset*1e6:>10.1f} us/item  ({t_legacy/t_ruleset:.1f}x, same verdicts: {legacy == compiled_ruleset})")
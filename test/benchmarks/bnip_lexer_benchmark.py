@@ -0,0 +1,44 @@
+"""
+Compares the previous character by character bnip lexer (test/nip/legacy_lexer.py) against the master regex scanner
+of bnip.lexer.Lexer on the lines of config/default.bnip and all test rules (test/nip/bnip_items.py lexer_inputs()).
+Reports the throughput of both and checks that they return the same tokens and error codes.
+
+Run from the repo root:
+    PYTHONPATH=./src python test/benchmarks/bnip_lexer_benchmark.py [repeats]
+"""
+import logging
+import sys
+import time
+sys.path.append("test/nip")
+from bnip.BNipExceptions import BNipSyntaxError
+from bnip.lexer import Lexer
+from bnip_items import lexer_inputs
+from legacy_lexer import LegacyLexer
+from logger import Logger
+
+DEFAULT_REPEATS = 5
+
+def run(lexer_class, inputs: list, repeats: int) -> tuple[float, list]:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        results = []
+        for text, section in inputs:
+            try:
+                results.append(lexer_class().create_tokens(text, section))
+            except BNipSyntaxError as e:
+                results.append(e.error_code)
+            except Exception as e:
+                results.append(type(e))
+    return (time.perf_counter() - start) / repeats, results
+
+if __name__ == "__main__":
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_REPEATS
+    # * unknown property lookups are logged as warnings by both lexers
+    Logger.init(logging.ERROR)
+    inputs = lexer_inputs()
+    chars = sum(len(text) for text, _ in inputs)
+    t_legacy, legacy = run(LegacyLexer, inputs, repeats)
+    t_new, new = run(Lexer, inputs, repeats)
+    print(f"{len(inputs)} expressions, {chars} chars, {repeats} repeats")
+    print(f"{'legacy':<10}{chars/t_legacy/1e3:>10.1f} kchars/s")
+    print(f"{'regex':<10}{chars/t_new/1e3:>10.1f} kchars/s  ({t_legacy/t_new:.1f}x, same tokens: {legacy == new})")
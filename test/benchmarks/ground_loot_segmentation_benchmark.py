@@ -0,0 +1,43 @@
+"""
+Compares the previous per color cluster search (test/nip/legacy_text_clusters.py) against
+processing_helpers.segment_text_clusters() on the ground loot screenshots of the nip tests.
+Reports ms per screenshot for both and checks that they find the same clusters.
+
+Run from the repo root:
+    PYTHONPATH=./src python test/benchmarks/ground_loot_segmentation_benchmark.py [repeats]
+"""
+import os
+import sys
+import time
+import cv2
+import numpy as np
+sys.path.append("test/nip")
+from d2r_image import processing_helpers
+from legacy_text_clusters import legacy_text_clusters
+import utils.download_test_assets # downloads assets if they don't already exist, doesn't need to be called
+
+PATH = "test/assets/ground_loot"
+DEFAULT_REPEATS = 5
+
+def load_screenshots() -> dict[str, np.ndarray]:
+    return {
+        filename[:-4]: processing_helpers.clean_img(cv2.imread(f"{PATH}/{filename}"))
+        for filename in sorted(os.listdir(PATH)) if filename.lower().endswith(".png")
+    }
+
+def run(segment, screenshots: dict[str, np.ndarray], repeats: int) -> tuple[float, dict[str, list]]:
+    clusters = {}
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for name, img in screenshots.items():
+            clusters[name] = segment(img)
+    return (time.perf_counter() - start) / repeats / len(screenshots), clusters
+
+if __name__ == "__main__":
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_REPEATS
+    screenshots = load_screenshots()
+    t_legacy, legacy = run(legacy_text_clusters, screenshots, repeats)
+    t_new, new = run(processing_helpers.segment_text_clusters, screenshots, repeats)
+    print(f"{len(screenshots)} screenshots, {sum(len(c) for c in new.values())} clusters, {repeats} repeats")
+    print(f"{'legacy':<10}{t_legacy*1000:>10.1f} ms/screenshot")
+    print(f"{'new':<10}{t_new*1000:>10.1f} ms/screenshot  ({t_legacy/t_new:.1f}x, same clusters: {legacy == new})")
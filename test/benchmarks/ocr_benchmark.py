@@ -0,0 +1,61 @@
+"""
+Compares serial OCR of the ground loot text clusters against image_to_text(workers=n) for the ground loot screenshots
+of the nip tests. Clusters are cropped once per screenshot, then OCR'd with each worker count. Reports ms per
+screenshot and whether the parallel results equal the serial ones.
+The worker processes are started and warmed up before timing, like ocr.start_workers() does at bot start.
+
+Run from the repo root:
+    PYTHONPATH=./src python test/benchmarks/ocr_benchmark.py [workers ...]
+"""
+import os
+import sys
+import time
+import cv2
+import numpy as np
+import screen
+from d2r_image import ocr, processing_helpers
+import utils.download_test_assets # downloads assets if they don't already exist, doesn't need to be called
+
+PATH = "test/assets/ground_loot"
+DEFAULT_WORKERS = [2, 4]
+REPEATS = 3
+OCR_KWARGS = dict(model="ground-eng_inconsolata_inv_th_fast", psm=7, erode=True)
+
+def load_clusters() -> dict[str, list[np.ndarray]]:
+    clusters = {}
+    original = processing_helpers.image_to_text
+    # only collect the cluster images, no ocr
+    processing_helpers.image_to_text = lambda images, **kwargs: [None] * len(images)
+    try:
+        for filename in sorted(os.listdir(PATH)):
+            if filename.lower().endswith(".png"):
+                items = processing_helpers.crop_text_clusters(cv2.imread(f"{PATH}/{filename}"))
+                clusters[filename[:-4]] = [item.clean_img for item in items]
+    finally:
+        processing_helpers.image_to_text = original
+    return clusters
+
+def run(clusters: dict[str, list[np.ndarray]], workers: int) -> tuple[float, dict[str, list[str]]]:
+    texts = {}
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        for name, images in clusters.items():
+            texts[name] = [result.text for result in ocr.image_to_text(images, workers=workers, **OCR_KWARGS)]
+    return (time.perf_counter() - start) / REPEATS / len(clusters), texts
+
+if __name__ == "__main__":
+    screen.set_window_position(0, 0)
+    worker_counts = [int(x) for x in sys.argv[1:]] or DEFAULT_WORKERS
+    clusters = load_clusters()
+    counts = [len(images) for images in clusters.values()]
+    print(f"{len(clusters)} screenshots, {sum(counts)} clusters, max {max(counts)} per screenshot")
+    ocr.warm_up()
+    t_serial, serial = run(clusters, 1)
+    print(f"{'workers':<10}{'ms/screenshot':>15}{'speedup':>9}{'same text':>11}")
+    print(f"{1:<10}{t_serial*1000:>15.1f}{1.0:>8.1f}x{'-':>11}")
+    for workers in worker_counts:
+        ocr.start_workers(workers)
+        run(clusters, workers)
+        t, texts = run(clusters, workers)
+        print(f"{workers:<10}{t*1000:>15.1f}{t_serial/t:>8.1f}x{str(texts == serial):>11}")
+    ocr.shutdown_workers()
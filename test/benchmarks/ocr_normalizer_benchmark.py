@@ -0,0 +1,39 @@
+"""
+Compares the previous _fix_regexps() / _check_known_errors() (test/nip/legacy_text_correction.py) against the single
+pass normalizer in d2r_image.ocr on typical OCR output: ground item labels and multi line item tooltips.
+Reports us per text for both and checks that they return the same text.
+
+Run from the repo root:
+    PYTHONPATH=./src python test/benchmarks/ocr_normalizer_benchmark.py [repeats]
+"""
+import sys
+import time
+sys.path.append("test/nip")
+from d2r_image import ocr
+from legacy_text_correction import legacy_check_known_errors, legacy_fix_regexps
+
+DEFAULT_REPEATS = 2000
+TEXTS = [
+    "SIIPER MANA POTION",
+    "JAR RUNE",
+    "GRAND CHARM",
+    "SUPERIOR QU AB",
+    "GRIFFON'S EYE\nDIADEM\nDEFENSE: 2IO\nDURABILITY: 2O OF 2O\nREQUIRED LEVEL: 76\n+1 TO ALL SKILLS\n"
+    "-2O% TO ENEMY LIGHTNING RESISTANCE\n+1S% TO LIGHTNING SKILL DAMAGE\n+25% FASTER CAST RATE\nSOCKETED (1)",
+    "SMALL CHARM\nKEEP IN INVENTORY TO GAIN BONUS\n+1 TO MAXIMUM DAMAGE\n+S TO ATTACK RATING\n+I TO LIFE",
+    "WIRT'S LEG\nONE-HAND DAMAGE: 2 TO 8\nDURABILITY: 6 OF 6\n+SO% DAMAGE TO UNDEAD\n1OO% CHANCE TO FIND MAGIC ITEMS",
+]
+
+def run(fix, check, repeats: int) -> tuple[float, list[str]]:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        results = [check(fix(text)) for text in TEXTS]
+    return (time.perf_counter() - start) / repeats / len(TEXTS), results
+
+if __name__ == "__main__":
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_REPEATS
+    t_legacy, legacy = run(legacy_fix_regexps, legacy_check_known_errors, repeats)
+    t_new, new = run(ocr._fix_regexps, ocr._check_known_errors, repeats)
+    print(f"{len(TEXTS)} texts, {repeats} repeats")
+    print(f"{'legacy':<10}{t_legacy*1e6:>10.1f} us/text")
+    print(f"{'new':<10}{t_new*1e6:>10.1f} us/text  ({t_legacy/t_new:.1f}x, same output: {legacy == new})")
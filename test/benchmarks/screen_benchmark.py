@@ -0,0 +1,60 @@
+"""
+Compares the old capture handling (np.array copy of the screenshot + [:, :, :3] view) against the preallocated
+BGRA -> BGR / gray conversion in screen.py. Each frame is converted and then run through a few typical consumer
+calls (gray, hsv, roi threshold). Reports latency and the peak of extra memory allocated per frame.
+The screenshot is simulated with a new BGRA bytearray per frame, like mss returns it, so no display is needed.
+
+Run from the repo root:
+    PYTHONPATH=./src python test/benchmarks/screen_benchmark.py [frames]
+"""
+import sys
+import time
+import tracemalloc
+from collections import deque
+import cv2
+import numpy as np
+import screen
+
+WIDTH, HEIGHT = 1280, 720
+DEFAULT_FRAMES = 200
+
+def _old_path(raw: bytearray) -> tuple[np.ndarray, np.ndarray]:
+    img = np.frombuffer(raw, dtype=np.uint8).reshape(HEIGHT, WIDTH, 4).copy()[:, :, :3]
+    return img, cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+def _new_path(raw: bytearray) -> tuple[np.ndarray, np.ndarray]:
+    frame = screen.Frame(0, screen._to_bgr(np.frombuffer(raw, dtype=np.uint8).reshape(HEIGHT, WIDTH, 4), screen._bgr_buffers), 0.0)
+    return frame.img, frame.gray
+
+def _consume(img: np.ndarray):
+    cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
+    cv2.inRange(img[610:711, 309:316], (0, 0, 100), (80, 80, 255))
+    img.mean()
+
+def run(convert, frames: int) -> tuple[float, float]:
+    rng = np.random.default_rng(0)
+    raws = [bytearray(rng.integers(0, 256, HEIGHT * WIDTH * 4, dtype=np.uint8).tobytes()) for _ in range(4)]
+    # frames stay referenced for a while like in the capture ring buffer
+    ring = deque(maxlen=screen.FRAME_BUFFER_SIZE)
+    elapsed, peak = 0.0, 0
+    for i in range(frames):
+        raw = bytearray(raws[i % len(raws)])
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        img, gray = convert(raw)
+        _consume(img)
+        elapsed += time.perf_counter() - start
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - before)
+        ring.append((img, gray))
+    return elapsed / frames, peak
+
+if __name__ == "__main__":
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_FRAMES
+    tracemalloc.start()
+    print(f"{WIDTH}x{HEIGHT}, {frames} frames")
+    print(f"{'path':<12}{'ms/frame':>10}{'peak alloc MB/frame':>22}")
+    for name, convert in [("old", _old_path), ("new", _new_path)]:
+        run(convert, 10)
+        t, peak = run(convert, frames)
+        print(f"{name:<12}{t*1000:>10.2f}{peak/1e6:>22.2f}")
@@ -0,0 +1,48 @@
+"""
+Compares pyramid template matching (use_pyramid=True) against the exact full resolution path.
+Reports the runtime of both, the speedup and the change in score / position per template.
+
+Run from the repo root:
+    PYTHONPATH=./src python test/benchmarks/template_finder_benchmark.py [screenshot.png] [TEMPLATE_KEY | template.png ...]
+"""
+import sys
+import time
+import cv2
+import numpy as np
+import screen
+import template_finder
+
+DEFAULT_IMAGE = "test/assets/hero_select.png"
+DEFAULT_REFS = ["CHARACTER_ACTIVE", "PLAY_BTN", "MAIN_MENU_TOP_LEFT", "CHARACTER_STATE_ONLINE"]
+REPEATS = 20
+
+def _time_search(ref, img: np.ndarray, use_pyramid: bool, use_grayscale: bool) -> tuple[float, template_finder.TemplateMatch]:
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        match = template_finder.search(ref, img, threshold=0.0, use_grayscale=use_grayscale, use_pyramid=use_pyramid)
+    return (time.perf_counter() - start) / REPEATS, match
+
+def run(img: np.ndarray, refs: list, use_grayscale: bool = False):
+    print(f"{'template':<30}{'exact ms':>10}{'pyramid ms':>12}{'speedup':>9}{'exact':>8}{'pyramid':>9}{'diff':>8}{'pos diff':>10}")
+    total_exact, total_pyramid = 0, 0
+    for ref in refs:
+        name = ref
+        if ref.lower().endswith(".png"):
+            ref = cv2.imread(ref)
+        t_exact, exact = _time_search(ref, img, False, use_grayscale)
+        t_pyramid, pyramid = _time_search(ref, img, True, use_grayscale)
+        total_exact += t_exact
+        total_pyramid += t_pyramid
+        pos_diff = np.hypot(exact.region[0] - pyramid.region[0], exact.region[1] - pyramid.region[1])
+        print(f"{name[-30:]:<30}{t_exact*1000:>10.2f}{t_pyramid*1000:>12.2f}{t_exact/t_pyramid:>8.1f}x{exact.score:>8.3f}{pyramid.score:>9.3f}{pyramid.score-exact.score:>8.3f}{pos_diff:>10.1f}")
+    print(f"{'total':<30}{total_exact*1000:>10.2f}{total_pyramid*1000:>12.2f}{total_exact/total_pyramid:>8.1f}x")
+
+if __name__ == "__main__":
+    screen.set_window_position(0, 0)
+    image_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_IMAGE
+    refs = sys.argv[2:] if len(sys.argv) > 2 else DEFAULT_REFS
+    img = cv2.imread(image_path)
+    print(f"Image: {image_path} {img.shape}, {REPEATS} repeats")
+    for use_grayscale in [False, True]:
+        print(f"\n== use_grayscale={use_grayscale} ==")
+        run(img, refs, use_grayscale)
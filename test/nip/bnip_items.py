@@ -0,0 +1,83 @@
+"""
+Random items in the format of HoveredItem.as_dict() / GroundItem.as_dict(), the expressions of config/default.bnip and
+the lexer inputs of all test rules, for the bnip equivalence tests and the bnip benchmarks in test/benchmarks
+"""
+import random
+from bnip.NTIPAliasClassID import NTIPAliasClassID
+from bnip.NTIPAliasFlag import NTIPAliasFlag
+from bnip.NTIPAliasStat import NTIPAliasStat
+from bnip.NTIPAliasType import NTIPAliasType
+from bnip.lexer import BNipSections
+from bnip.transpile import BNIPExpression, generate_expression_object
+from bnip.BNipExceptions import BNipSyntaxError
+from keep_item_test_cases import BNIP_KEEP_TESTS
+from pick_item_test_cases import BNIP_PICK_TESTS
+from transpile_test_cases import GENERAL_SYNTAX_TESTS, SYNTAX_ERROR_TESTS
+
+DEFAULT_BNIP_FILE = "config/default.bnip"
+COLORS = ["white", "gray", "blue", "yellow", "gold", "green", "orange"]
+
+
+def default_expressions() -> list[BNIPExpression]:
+    expressions = []
+    with open(DEFAULT_BNIP_FILE, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line == "" or line.startswith("//"):
+                continue
+            try:
+                if (expression := generate_expression_object(line)) is not None:
+                    expressions.append(expression)
+            except BNipSyntaxError:
+                pass
+    return sorted(expressions, key=lambda x: len(x.raw))
+
+
+def lexer_inputs() -> list[tuple[str, BNipSections]]:
+    """
+    The lines of config/default.bnip and the expressions of the test cases as the lexer gets them: whole, prepared
+    like prepare_bnip_expression() (without the validation) and split into their sections.
+    Lines with a ' or a comment are only used prepared, the previous lexer never finishes on a ' outside of a word or
+    a . that does not start a number.
+    """
+    with open(DEFAULT_BNIP_FILE, "r", encoding="utf-8") as f:
+        lines = [line.strip() for line in f if line.strip() and not line.startswith("//")]
+    lines += [test["expression"] for tests in BNIP_KEEP_TESTS.values() for test in tests]
+    lines += [test["expression"] for items in BNIP_PICK_TESTS.values() for item in items for test in item["expressions"]]
+    lines += [test["raw_expression"] for test in GENERAL_SYNTAX_TESTS + SYNTAX_ERROR_TESTS]
+    inputs = []
+    for line in lines:
+        prepared = line.lower().replace("'", "").split("//")[0]
+        if "'" not in line and "//" not in line:
+            inputs.append((line, BNipSections.PROP))
+        inputs.append((prepared, BNipSections.PROP))
+        inputs += zip(prepared.split("#"), BNipSections)
+    return inputs
+
+
+def random_items(count: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    names = sorted(NTIPAliasClassID)
+    types = sorted({int(x) for x in NTIPAliasType.values()})
+    stats = sorted(set(NTIPAliasStat.values()))
+    flags = sorted(set(NTIPAliasFlag.values()))
+    items = []
+    for _ in range(count):
+        name = "gold" if rng.random() < 0.1 else rng.choice(names)
+        items.append({
+            "Name": name,
+            "Color": rng.choice(COLORS),
+            "Quality": None,
+            "Text": name.upper(),
+            "Amount": rng.randint(1, 10000) if name == "gold" else None,
+            "BaseItem": {"DisplayName": "Gold" if name == "gold" else name},
+            "Item": None,
+            "NTIPAliasIdName": rng.choice(names),
+            "NTIPAliasType": sorted(rng.sample(types, rng.randint(1, 4))),
+            "NTIPAliasClassID": int(NTIPAliasClassID[name]),
+            "NTIPAliasClass": rng.randint(0, 2),
+            "NTIPAliasQuality": rng.randint(1, 8),
+            "NTIPAliasStat": {stat: rng.randint(0, 400) for stat in rng.sample(stats, rng.randint(0, 8))},
+            "NTIPAliasFlag": {flag: rng.random() < 0.3 for flag in flags},
+        })
+    return items
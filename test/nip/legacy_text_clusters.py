@@ -0,0 +1,51 @@
+"""
+The per color cluster search of d2r_image.processing_helpers.crop_text_clusters() before it was replaced by
+segment_text_clusters(). Reference for the equivalence tests in test_text_clusters.py and for
+test/benchmarks/ground_loot_segmentation_benchmark.py
+"""
+import cv2
+import numpy as np
+from config import Config
+from d2r_image.processing_data import EXPECTED_HEIGHT_RANGE, EXPECTED_WIDTH_RANGE, GAUS_FILTER, ITEM_COLORS
+from utils.misc import color_filter
+
+
+def legacy_text_clusters(cleaned_img: np.ndarray, padding_y: int = 5) -> list[tuple[str, list[int]]]:
+    item_clusters = []
+    for key in ITEM_COLORS:
+        _, filtered_img = color_filter(cleaned_img, Config().colors[key])
+        filtered_img_gray = cv2.cvtColor(filtered_img, cv2.COLOR_BGR2GRAY)
+        gaus = GAUS_FILTER
+        if key == "gray":
+            # white text has some gray on border of glyphs, erode
+            filtered_img_gray = cv2.erode(filtered_img_gray, np.ones((2, 1), 'uint8'), None, iterations=1)
+            gaus = (GAUS_FILTER[0] + 4, GAUS_FILTER[1])
+        blured_img = np.clip(cv2.GaussianBlur(
+            filtered_img_gray, gaus, cv2.BORDER_DEFAULT), 0, 255)
+        contours = cv2.findContours(
+            blured_img, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        contours = contours[0] if len(contours) == 2 else contours[1]
+        for cntr in contours:
+            x, y, w, h = cv2.boundingRect(cntr)
+            expected_height = EXPECTED_HEIGHT_RANGE[0] < h < EXPECTED_HEIGHT_RANGE[1]
+            expected_width = EXPECTED_WIDTH_RANGE[0] < w < EXPECTED_WIDTH_RANGE[1]
+            if not (expected_height and expected_width): continue
+            # increase height a bit to make sure we have the full item name in the cluster
+            y = y - padding_y if y > padding_y else 0
+            h += padding_y * 2
+            cropped_item = filtered_img[y:y+h, x:x+w]
+            avg = int(np.average(filtered_img_gray[y:y+h, x:x+w]))
+            contains_black = np.min(cropped_item) < 14
+            mostly_dark = avg < 35
+            if contains_black and mostly_dark:
+                # double-check item color
+                color_averages = []
+                for key2 in ITEM_COLORS:
+                    _, extracted_img = color_filter(cropped_item, Config().colors[key2])
+                    extr_avg = np.average(cv2.cvtColor(
+                        extracted_img, cv2.COLOR_BGR2GRAY))
+                    color_averages.append(extr_avg)
+                max_idx = color_averages.index(max(color_averages))
+                if key == ITEM_COLORS[max_idx]:
+                    item_clusters.append((key, [x, y, w, h]))
+    return item_clusters
@@ -0,0 +1,105 @@
+"""
+_fix_regexps() and _check_known_errors() of d2r_image.ocr before they were replaced by the single pass normalizer.
+Reference for the equivalence tests in test_text_correction.py and for test/benchmarks/ocr_normalizer_benchmark.py
+"""
+from d2r_image.ocr_data import ERROR_RESOLUTION_MAP, I_1, II_U, ONE_I, ONEONE_U
+
+
+def legacy_fix_regexps(ocr_output: str, repeat_count: int = 0) -> str:
+    # case: two 1's within a string; e.g., "SIIPER MANA POTION"
+    try:
+        text = II_U.sub('U', ocr_output)
+    except:
+        # logging.error(f"Error _II_ -> _U_ on {ocr_output}")
+        text = ocr_output
+    # case: two 1's within a string; e.g., "S11PER MANA POTION"
+    try:
+        text = ONEONE_U.sub('U', text)
+    except:
+        # logging.error(f"Error _11_ -> _U_ on {ocr_output}")
+        pass
+    # case: an I within a number or by a sign; e.g., "+32I to mana attack rating"
+    try:
+        text = I_1.sub('1', text)
+    except:
+        # logging.error(f"Error I -> 1 on {ocr_output}")
+        pass
+    # case: a 1 within a string; e.g., "W1RT'S LEG"
+    try:
+        text = ONE_I.sub('I', text)
+    except:
+        # logging.error(f"Error 1 -> I on {ocr_output}")
+        pass
+    # case: a solitary I; e.g., " I TO 5 DEFENSE"
+    cnt = 0
+    while True:
+        cnt += 1
+        if cnt > 30:
+            # logging.error(f"Error ' I ' -> ' 1 ' on {ocr_output}")
+            break
+        if " I " in text:
+            text = text.replace(" I ", " 1 ")
+            continue
+        elif ' I\n' in text:
+            text = text.replace(' I\n', ' 1\n')
+            continue
+        elif '\nI ' in text:
+            text = text.replace('\nI ', '\n1 ')
+            continue
+        break
+    # case: a solitary S; e.g., " 1 TO S DEFENSE"
+    cnt = 0
+    while True:
+        cnt += 1
+        if cnt > 30:
+            # logging.error(f"Error ' S ' -> ' 5 ' on {ocr_output}")
+            break
+        if " S " in text:
+            text = text.replace(" S ", " 5 ")
+            continue
+        elif ' I\n' in text:
+            text = text.replace(' S\n', ' 5\n')
+            continue
+        elif '\nI ' in text:
+            text = text.replace('\nS ', '\n5 ')
+            continue
+        break
+    # case: a solitary O; e.g., " O TO 5 DEFENSE"
+    cnt = 0
+    while True:
+        cnt += 1
+        if cnt > 30:
+            # logging.error(f"Error ' I ' -> ' 1 ' on {ocr_output}")
+            break
+        if (pattern := " O ") in text:
+            text = text.replace(pattern, " 0 ")
+            continue
+        elif (pattern := ' O\n') in text:
+            text = text.replace(pattern, ' 0\n')
+            continue
+        elif (pattern := '\nO ') in text:
+            text = text.replace(pattern, '\n0 ')
+            continue
+        break
+    # case: consecutive I's; e.g., "DEFENSE: II"
+    repeat = False
+    cnt = 0
+    while "II" in text:
+        cnt += 1
+        if cnt > 30:
+            # logging.error(f"Error 4 on {ocr_output}")
+            break
+        text = text.replace("II", "11")
+        repeat = True
+        repeat_count += 1
+    if repeat and repeat_count < 10:
+        legacy_fix_regexps(text)
+    return text
+
+
+def legacy_check_known_errors(text):
+    for word in text.split():
+        for key in ERROR_RESOLUTION_MAP:
+            if key == word:
+                text = text.replace(key, ERROR_RESOLUTION_MAP[key])
+    return text
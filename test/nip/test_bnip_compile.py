@@ -0,0 +1,55 @@
+import pytest
+import bnip.actions as bnip_actions
+import bnip.transpile as transpile
+from bnip_items import default_expressions, random_items
+
+
+def _eval(transpiled: str, item_data: dict):
+    # how the expressions were evaluated before they were compiled
+    try:
+        return eval(transpiled, vars(transpile), {"item_data": item_data})
+    except Exception as e:
+        return type(e)
+
+def _call(fn, item_data: dict):
+    try:
+        return fn(item_data)
+    except Exception as e:
+        return type(e)
+
+@pytest.fixture(scope="module")
+def expressions():
+    return default_expressions()
+
+def test_compiled_functions_equal_eval(expressions):
+    items = random_items(20)
+    for expression in expressions:
+        for transpiled, fn in [
+            (expression.transpiled, expression.keep_fn),
+            (expression.should_id_transpiled, expression.should_id_fn),
+            (expression.should_pickup, expression.should_pickup_fn),
+        ]:
+            assert (fn is None) == (not transpiled)
+            if fn is not None:
+                for item in items:
+                    assert _call(fn, item) == _eval(transpiled, item), (expression.raw, item)
+
+def test_should_keep_reports_first_match(expressions, monkeypatch):
+    monkeypatch.setattr(bnip_actions, "bnip_expressions", expressions)
+    kept = 0
+    for item in random_items(40, seed=1):
+        expected = (False, "")
+        for expression in expressions:
+            if eval(expression.transpiled, vars(transpile), {"item_data": item}):
+                expected = (True, expression.raw)
+                break
+        assert bnip_actions.should_keep(item) == expected
+        kept += expected[0]
+    assert kept > 0
+
+def test_gold_pickup(monkeypatch):
+    expression = transpile.generate_expression_object("[name] == gold # [gold] >= 500")
+    monkeypatch.setattr(bnip_actions, "bnip_expressions", [expression])
+    gold = next(item for item in random_items(100) if item["Name"] == "gold")
+    for amount, expected in [(499, False), (500, True), (7000, True)]:
+        assert bnip_actions.should_pickup(gold | {"Amount": amount}) == (expected, expression.raw)
@@ -0,0 +1,33 @@
+import pytest
+from bnip.BNipExceptions import BNipSyntaxError
+from bnip.lexer import BNipSections, Lexer
+from bnip_items import lexer_inputs
+from legacy_lexer import LegacyLexer
+
+
+def _tokens(lexer, text: str, section: BNipSections):
+    try:
+        return lexer.create_tokens(text, section)
+    except BNipSyntaxError as e:
+        return e.error_code
+    except Exception as e:
+        return type(e)
+
+def test_same_tokens_as_legacy_lexer():
+    inputs = lexer_inputs()
+    assert len(inputs) > 1000
+    for text, section in inputs:
+        assert _tokens(Lexer(), text, section) == _tokens(LegacyLexer(), text, section), (text, section)
+
+@pytest.mark.parametrize("text, section, code", [
+    ("[sockets] 電話 1", BNipSections.STAT, "BNIP_0x1"),
+    ("[name == ring", BNipSections.PROP, "BNIP_0x2"),
+    ("[sockets] = 1", BNipSections.STAT, "BNIP_0x5"),
+    ("ring == [name]", BNipSections.PROP, "BNIP_0x20"),
+    ("'ring", BNipSections.PROP, "BNIP_0x20"),
+    # * the previous lexer never finished on these
+    ("[name] == ring && x'", BNipSections.PROP, "BNIP_0x1"),
+    ("[strength] == .", BNipSections.STAT, "BNIP_0x1"),
+])
+def test_error_codes(text: str, section: BNipSections, code: str):
+    assert _tokens(Lexer(), text, section) == code
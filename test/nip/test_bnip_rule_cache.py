@@ -0,0 +1,61 @@
+import bnip.actions as bnip_actions
+from bnip import rule_cache
+from bnip.rule_cache import load_rule_file, remove_unused_rule_files, rule_file_key
+from bnip.transpile import generate_expression_object
+
+RULES = """// comment
+[name] == ring && [quality] == rare # [strength] >= 5
+[type] == amulet && [flag] != ethereal
+[name] == notanitem
+[name] == gold # [gold] >= 500
+"""
+
+
+def _load(monkeypatch, rule_file, cache_dir) -> tuple[list, bool]:
+    expressions = []
+    monkeypatch.setattr(bnip_actions, "bnip_expressions", expressions)
+    monkeypatch.setattr(bnip_actions, "rule_file_errors", [])
+    _, from_cache = bnip_actions._load_bnip_expressions(str(rule_file), str(cache_dir))
+    return expressions, from_cache
+
+def test_cached_expressions_equal_parsed(tmp_path, monkeypatch, capsys):
+    rule_file = tmp_path / "config" / "bnip" / "rules.bnip"
+    rule_file.parent.mkdir(parents=True)
+    rule_file.write_text(RULES)
+    parsed, from_cache = _load(monkeypatch, rule_file, tmp_path / "cache")
+    error = capsys.readouterr().out.splitlines()[-1]
+    assert not from_cache and len(parsed) == 3 and error.startswith("bnip/rules.bnip:") and error.endswith("line 4")
+    cached, from_cache = _load(monkeypatch, rule_file, tmp_path / "cache")
+    assert from_cache and capsys.readouterr().out.splitlines() == [error]
+    for expression, cached_expression in zip(parsed, cached):
+        assert cached_expression.tokens == expression.tokens
+        assert cached_expression.transpiled == expression.transpiled
+        assert cached_expression.should_pickup == expression.should_pickup
+        assert cached_expression.keep_fn is not None
+    assert [e.raw for e in cached] == [e.raw for e in parsed] == [generate_expression_object(line).raw for line in RULES.splitlines()[1:3] + RULES.splitlines()[4:]]
+
+def test_changed_file_is_parsed_again(tmp_path, monkeypatch):
+    rule_file = tmp_path / "config" / "bnip" / "rules.bnip"
+    rule_file.parent.mkdir(parents=True)
+    rule_file.write_text(RULES)
+    _load(monkeypatch, rule_file, tmp_path / "cache")
+    old_key = rule_file_key(str(rule_file))
+    rule_file.write_text(RULES + "[name] == amulet\n")
+    expressions, from_cache = _load(monkeypatch, rule_file, tmp_path / "cache")
+    assert not from_cache and len(expressions) == 4
+    remove_unused_rule_files(str(tmp_path / "cache"), [rule_file_key(str(rule_file))])
+    assert load_rule_file(str(tmp_path / "cache"), old_key) is None
+    assert load_rule_file(str(tmp_path / "cache"), rule_file_key(str(rule_file))) is not None
+
+def test_key_changes_with_transpiler_source(tmp_path, monkeypatch):
+    rule_file = tmp_path / "rules.bnip"
+    rule_file.write_text(RULES)
+    alias_table = tmp_path / "NTIPAliasTest.py"
+    alias_table.write_text("NTIPAliasTest = {'ring': 1}\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setattr(rule_cache, "TRANSPILER_MODULES", rule_cache.TRANSPILER_MODULES + ("NTIPAliasTest",))
+    key = rule_file_key(str(rule_file))
+    assert rule_file_key(str(rule_file)) == key
+    alias_table.write_text("NTIPAliasTest = {'ring': 2}\n")
+    rule_cache.source_hash.cache_clear()
+    assert rule_file_key(str(rule_file)) != key
@@ -0,0 +1,42 @@
+import pytest
+import bnip.actions as bnip_actions
+from bnip.lexer import Lexer
+from bnip.rule_index import RuleIndex, leading_predicates
+from bnip.transpile import prepare_bnip_expression
+from bnip_items import default_expressions, random_items
+
+
+def _predicates(raw: str) -> dict:
+    return {keyword.name: key for keyword, key in leading_predicates(Lexer().create_tokens(prepare_bnip_expression(raw))).items()}
+
+def test_leading_predicates():
+    assert _predicates("[name] == ring && [quality] == rare # [strength] == 5") == {"KeywordNTIPAliasName": 522, "KeywordNTIPAliasQuality": 6}
+    assert _predicates("[type] == ring && ([quality] == unique || [quality] == set)") == {"KeywordNTIPAliasType": 10}
+    assert _predicates("[flag] != ethereal && [name] == ring") == {}
+    assert _predicates("[name] == ring && [quality] == rare || [quality] == set") == {}
+    assert _predicates("([type] == ring) && [quality] == rare") == {}
+    assert _predicates("[idname] == shako") == {}
+
+@pytest.fixture(scope="module")
+def expressions():
+    return default_expressions()
+
+def test_candidates_keep_order(expressions):
+    index = RuleIndex(expressions)
+    assert len(index._unindexed) < len(expressions) // 2
+    for item in random_items(200):
+        candidates = index.candidates(item)
+        positions = [expressions.index(expression) for expression in candidates]
+        assert positions == sorted(positions)
+        assert len(candidates) < len(expressions)
+    assert index.candidates({}) is expressions
+
+def test_should_keep_same_as_full_scan(expressions, monkeypatch):
+    monkeypatch.setattr(bnip_actions, "bnip_expressions", expressions)
+    kept = 0
+    for item in random_items(300, seed=2):
+        expected = next(((True, expression.raw) for expression in expressions if expression.keep_fn(item)), (False, ""))
+        assert bnip_actions.should_keep(item) == expected
+        kept += expected[0]
+    assert kept > 0
+    assert bnip_actions._get_rule_index().expressions is expressions
@@ -0,0 +1,86 @@
+import pytest
+import bnip.actions as bnip_actions
+from bnip import rule_cache, ruleset as bnip_ruleset
+from bnip.ruleset import CompiledRuleset, generate_ruleset_source, load_ruleset_module, ruleset_key, ruleset_path, write_ruleset_module
+from bnip_items import DEFAULT_BNIP_FILE, default_expressions, random_items
+
+
+def _result(fn, item_data: dict):
+    try:
+        return fn(item_data)
+    except Exception as e:
+        return type(e)
+
+@pytest.fixture(scope="module")
+def expressions():
+    return default_expressions()
+
+@pytest.fixture(scope="module")
+def ruleset(expressions, tmp_path_factory) -> CompiledRuleset:
+    source = generate_ruleset_source([bnip_actions._rule_plan(expression) for expression in expressions], [DEFAULT_BNIP_FILE])
+    module = write_ruleset_module(ruleset_path(str(tmp_path_factory.mktemp("bnip")), "test"), source)
+    return CompiledRuleset(module, expressions)
+
+def test_same_as_expressions(expressions, ruleset, monkeypatch):
+    monkeypatch.setattr(bnip_actions, "bnip_expressions", expressions)
+    items = random_items(150, seed=3)
+    # * items the up front lookups fail for, so the entry points evaluate the expressions again without them
+    items += [item | {"NTIPAliasStat": {"14": None}} for item in items[:10]]
+    items += [{key: value for key, value in item.items() if key != "NTIPAliasQuality"} for item in items[10:20]]
+    for item in items:
+        assert _result(ruleset.keep, item) == _result(bnip_actions.should_keep, item), item
+        assert _result(ruleset.pickup, item) == _result(bnip_actions.should_pickup, item), item
+        assert _result(ruleset.id, item) == _result(bnip_actions.should_id, item), item
+    assert sum(ruleset.keep(item)[0] for item in items[:150]) > 0
+    assert sum(ruleset.pickup(item)[0] for item in items[:150]) > 0
+
+def test_gold(ruleset):
+    gold = next(item for item in random_items(100) if item["Name"] == "gold")
+    assert ruleset.pickup(gold | {"Amount": 4999}) != ruleset.pickup(gold | {"Amount": 5000})
+
+def test_used_while_current(ruleset, expressions, monkeypatch):
+    monkeypatch.setattr(bnip_actions, "_ruleset", ruleset)
+    monkeypatch.setattr(bnip_actions, "bnip_expressions", expressions)
+    assert bnip_actions._current_ruleset() is ruleset
+    monkeypatch.setattr(bnip_actions, "bnip_expressions", list(expressions))
+    assert bnip_actions._current_ruleset() is None
+
+def test_cache_key(tmp_path):
+    rules = tmp_path / "a.bnip"
+    rules.write_text("[name] == ring")
+    key = ruleset_key([str(rules)])
+    assert ruleset_key([str(rules)]) == key
+    rules.write_text("[name] == amulet")
+    assert ruleset_key([str(rules)]) != key
+    write_ruleset_module(ruleset_path(str(tmp_path), key), generate_ruleset_source([], []))
+    module = write_ruleset_module(ruleset_path(str(tmp_path), "other"), generate_ruleset_source([], []))
+    assert [path.name for path in tmp_path.glob("ruleset_*.py")] == ["ruleset_other.py"]
+    assert module.keep({}) == (False, "") and module.id({}) is True
+
+def test_cache_key_changes_with_bnip_source(tmp_path, monkeypatch):
+    rules = tmp_path / "a.bnip"
+    rules.write_text("[name] == ring")
+    alias_table = tmp_path / "NTIPAliasTest.py"
+    alias_table.write_text("NTIPAliasTest = {'ring': 1}\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setattr(bnip_ruleset, "RULESET_MODULES", bnip_ruleset.RULESET_MODULES + ("NTIPAliasTest",))
+    key = ruleset_key([str(rules)])
+    alias_table.write_text("NTIPAliasTest = {'ring': 2}\n")
+    rule_cache.source_hash.cache_clear()
+    assert ruleset_key([str(rules)]) != key
+
+def test_errors_are_printed_from_cached_module(tmp_path, monkeypatch, capsys):
+    rule_file = tmp_path / "config" / "bnip" / "rules.bnip"
+    rule_file.parent.mkdir(parents=True)
+    rule_file.write_text("[name] == ring\n[name] == notanitem\n")
+    errors = []
+    monkeypatch.setattr(bnip_actions, "bnip_expressions", [])
+    monkeypatch.setattr(bnip_actions, "rule_file_errors", errors)
+    bnip_actions._load_bnip_expressions(str(rule_file))
+    printed = capsys.readouterr().out.splitlines()[-1:]
+    assert len(errors) == 1 and errors[0][:2] == ("bnip/rules.bnip", 2) and printed == [f"bnip/rules.bnip:{errors[0][2]}:line 2"]
+    write_ruleset_module(ruleset_path(str(tmp_path), "errors"), generate_ruleset_source([], [str(rule_file)], errors))
+    module = load_ruleset_module(ruleset_path(str(tmp_path), "errors"))
+    assert module.ERRORS == errors
+    bnip_actions._print_rule_file_errors(module.ERRORS)
+    assert capsys.readouterr().out.splitlines() == printed
@@ -0,0 +1,110 @@
+import cv2
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw, ImageFont
+from d2r_image import glyph_ocr, ocr
+from d2r_image.data_models import OcrResult
+
+
+def _render(text: str) -> np.ndarray:
+    # fixed advance per character like the ui fonts
+    img = np.zeros((30, 14 * len(text) + 10, 3), dtype=np.uint8)
+    for i, char in enumerate(text):
+        cv2.putText(img, char, (5 + 14 * i, 22), cv2.FONT_HERSHEY_PLAIN, 1.3, (200, 200, 200), 1)
+    return img
+
+def _render_font(text: str, font_size: int) -> np.ndarray:
+    # text in the font of the botty mod, which the shipped templates are rendered from
+    font = ImageFont.truetype(glyph_ocr.GLYPH_FONT_PATH, font_size)
+    img = Image.new("L", (font_size * len(text) + 20, font_size * 2))
+    ImageDraw.Draw(img).text((5, font_size // 3), text, font=font, fill=255)
+    return np.array(img) > 127
+
+@pytest.mark.parametrize("font_size", glyph_ocr.GLYPH_FONT_SIZES)
+def test_shipped_templates_read_digits(font_size):
+    reader = glyph_ocr.GlyphReader("test", None)
+    for text in ["1234567890", "9080", "2500000", "111", "6", "1,234,567", "3.58", "12 345"]:
+        read = reader.read(_render_font(text, font_size))
+        assert read is not None and read[0] == text and read[1] >= glyph_ocr.GLYPH_MIN_SCORE
+
+def test_shipped_templates_are_distinct():
+    templates = glyph_ocr.shipped_templates()
+    assert set(templates.labels) == set(glyph_ocr.GLYPH_CHARSET)
+    scores = templates.scores(templates.vectors, templates.shapes)
+    labels = np.array(templates.labels)
+    assert not ((scores >= glyph_ocr.GLYPH_MIN_SCORE) & (labels[:, None] != labels[None, :])).any()
+
+def test_learn_from_agreeing_fallbacks_then_read(tmp_path, monkeypatch):
+    monkeypatch.setattr(glyph_ocr, "GLYPH_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(glyph_ocr, "GLYPH_TEMPLATES_PATH", None)
+    monkeypatch.setattr(glyph_ocr, "_readers", {})
+    tesseract_reads = []
+    def image_to_text(image, **kwargs):
+        tesseract_reads.append(kwargs)
+        return [OcrResult(text=texts[id(image)], original_text=texts[id(image)], word_confidences=[95], mean_confidence=95)]
+    monkeypatch.setattr(ocr, "image_to_text", image_to_text)
+    glyph_ocr.glyph_stats(reset=True)
+
+    texts = {}
+    for _ in range(glyph_ocr.GLYPH_LEARN_AGREEMENT):
+        for text in ["0123 4567", "89"]:
+            img = _render(text)
+            texts[id(img)] = text
+            assert ocr.image_to_text_fixed_font("gold", img, threshold=76).text == text
+    assert len(tesseract_reads) == 2 * glyph_ocr.GLYPH_LEARN_AGREEMENT and tesseract_reads[0]["threshold"] == 76
+
+    result = ocr.image_to_text_fixed_font("gold", _render("9071 53"), threshold=76)
+    assert result.text == "9071 53" and result.mean_confidence >= glyph_ocr.GLYPH_MIN_SCORE * 100
+    assert len(tesseract_reads) == 2 * glyph_ocr.GLYPH_LEARN_AGREEMENT
+    stats = glyph_ocr.glyph_stats()
+    assert (stats.reads, stats.fallbacks, stats.learned) == (7, 6, 10)
+
+    # templates are stored per field and loaded again
+    mask = cv2.cvtColor(_render("42"), cv2.COLOR_BGR2GRAY) > 76
+    assert glyph_ocr.GlyphReader("gold", str(tmp_path), None).read(mask)[0] == "42"
+    assert glyph_ocr.GlyphReader("experience", str(tmp_path), None).read(mask) is None
+
+def test_no_learning_from_mismatched_text():
+    reader = glyph_ocr.GlyphReader("test", None, None)
+    mask = cv2.cvtColor(_render("12 34"), cv2.COLOR_BGR2GRAY) > 25
+    assert reader.learn(mask, "1234") == 0
+    assert reader.learn(mask, "12 345") == 0
+    assert reader.read(mask) is None
+    for _ in range(glyph_ocr.GLYPH_LEARN_AGREEMENT - 1):
+        assert reader.learn(mask, "12 34") == 0
+    assert reader.learn(mask, "12 34") == 4
+    assert reader.learn(mask, "12 34") == 0
+    assert reader.read(mask)[0] == "12 34"
+
+def test_no_learning_from_disagreeing_reads():
+    reader = glyph_ocr.GlyphReader("test", None, None)
+    mask = cv2.cvtColor(_render("56"), cv2.COLOR_BGR2GRAY) > 25
+    # a misread of a glyph discards its earlier reads, the glyph all reads agree on is learned
+    assert reader.learn(mask, "56") == 0
+    assert reader.learn(mask, "58") == 0
+    assert sum(reader.learn(mask, "56") for _ in range(glyph_ocr.GLYPH_LEARN_AGREEMENT - 1)) == 1
+    text, score = reader.read(mask)
+    assert text[0] == "5" and score < glyph_ocr.GLYPH_MIN_SCORE
+
+def test_no_learning_of_known_glyphs_under_another_character():
+    reader = glyph_ocr.GlyphReader("test", None)
+    mask = _render_font("1,234", 16)
+    assert reader.read(mask)[0] == "1,234"
+    for _ in range(glyph_ocr.GLYPH_LEARN_AGREEMENT):
+        assert reader.learn(mask, "7,234") == 0
+    assert reader.read(mask)[0] == "1,234"
+
+@pytest.mark.parametrize("text", ["1,234", "3.58", "12 345"])
+def test_digits_only_reads_no_separators(text, tmp_path, monkeypatch):
+    monkeypatch.setattr(glyph_ocr, "GLYPH_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(glyph_ocr, "_readers", {})
+    tesseract_reads = []
+    def image_to_text(image, **kwargs):
+        tesseract_reads.append(kwargs)
+        return [OcrResult(text="0", original_text="0", word_confidences=[50], mean_confidence=50)]
+    monkeypatch.setattr(ocr, "image_to_text", image_to_text)
+    mask = _render_font(text, 20)
+    assert ocr.image_to_text_fixed_font("gold", mask).text == text
+    assert ocr.image_to_text_fixed_font("gold", mask, digits_only=True).text == "0"
+    assert len(tesseract_reads) == 1 and tesseract_reads[0]["digits_only"]
+    assert ocr.image_to_text_fixed_font("gold", _render_font("1234", 20), digits_only=True).text == "1234"
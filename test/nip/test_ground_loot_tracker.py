@@ -0,0 +1,63 @@
+import cv2
+import numpy as np
+import pytest
+from d2r_image import processing_helpers
+from d2r_image.data_models import OcrResult
+from d2r_image.ground_loot_tracker import GroundLootTracker
+from test_text_clusters import TEXT_COLORS
+
+LABELS = [("white", "SHAKO", 200, 200), ("gold", "HARLEQUIN CREST", 500, 260), ("blue", "GRAND CHARM", 800, 320), ("yellow", "DEATH SPIRAL RING", 350, 420)]
+
+def _screenshot(labels: list[tuple[str, str, int, int]], dx: int = 0, dy: int = 0) -> np.ndarray:
+    img = np.zeros((720, 1280, 3), dtype=np.uint8)
+    # some floor texture, so the whole screen moves and not just the labels
+    rng = np.random.default_rng(0)
+    floor = cv2.GaussianBlur(rng.integers(0, 30, (720 + 40, 1280 + 40, 3), dtype=np.uint8), (9, 9), 0)
+    img[:] = floor[20 - dy:740 - dy, 20 - dx:1300 - dx]
+    for color, text, x, y in labels:
+        x, y = x + dx, y + dy
+        cv2.rectangle(img, (x, y - 16), (x + 12 * len(text), y + 5), (10, 10, 10), -1)
+        cv2.putText(img, text, (x + 5, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, TEXT_COLORS[color], 1)
+    return img
+
+@pytest.fixture
+def ocr_calls(monkeypatch) -> list[int]:
+    calls = []
+    def fake_image_to_text(images, **kwargs):
+        calls.append(len(images))
+        return [OcrResult(text=f"{img.shape[1]}", mean_confidence=90) for img in images]
+    monkeypatch.setattr(processing_helpers, "image_to_text", fake_image_to_text)
+    return calls
+
+def test_shifted_labels_are_not_read_again(ocr_calls: list[int]):
+    tracker = GroundLootTracker()
+    first = tracker.crop_text_clusters(_screenshot(LABELS))
+    assert ocr_calls == [len(first)] and len(first) >= len(LABELS)
+    second = tracker.crop_text_clusters(_screenshot(LABELS, dx=-14, dy=9))
+    assert ocr_calls[1:] == [0]
+    assert sorted((c.color, c.ocr_result.text) for c in second) == sorted((c.color, c.ocr_result.text) for c in first)
+    stats = tracker.stats(reset=True)
+    assert (stats.clusters, stats.reused) == (len(first) + len(second), len(second))
+    assert tracker.stats().clusters == 0
+
+def test_only_new_labels_are_read(ocr_calls: list[int]):
+    tracker = GroundLootTracker()
+    tracker.crop_text_clusters(_screenshot(LABELS))
+    # one label picked up, one dropped
+    labels = LABELS[1:] + [("green", "ANGELIC WINGS", 600, 520)]
+    clusters = tracker.crop_text_clusters(_screenshot(labels, dx=6, dy=-4))
+    assert ocr_calls[1] == len([c for c in clusters if c.color == "green"]) > 0
+
+def test_reset(ocr_calls: list[int]):
+    tracker = GroundLootTracker()
+    first = tracker.crop_text_clusters(_screenshot(LABELS))
+    tracker.reset()
+    tracker.crop_text_clusters(_screenshot(LABELS))
+    assert ocr_calls == [len(first), len(first)]
+
+def test_changed_label_is_read_again(ocr_calls: list[int]):
+    tracker = GroundLootTracker()
+    tracker.crop_text_clusters(_screenshot(LABELS))
+    labels = [label if label[0] != "blue" else ("blue", "GRAND CHORM", *label[2:]) for label in LABELS]
+    clusters = tracker.crop_text_clusters(_screenshot(labels, dx=3, dy=3))
+    assert ocr_calls[1] == len([c for c in clusters if c.color == "blue"]) > 0
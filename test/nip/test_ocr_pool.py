@@ -0,0 +1,126 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from d2r_image import ocr
+
+
+class FakeTessApi:
+    created = []
+
+    def __init__(self, psm=3, oem=None, path=None, lang=None):
+        self.lang = lang
+        self.variables = {}
+        self.ended = False
+        FakeTessApi.created.append(self)
+
+    def ReadConfigFile(self, path):
+        pass
+
+    def SetVariable(self, name, value):
+        self.variables[name] = value
+
+    def SetImageBytes(self, data, width, *args):
+        self.width = width
+
+    def GetUTF8Text(self):
+        return str(self.width)
+
+    def AllWordConfidences(self):
+        return [90]
+
+    def MeanTextConf(self):
+        return 90
+
+    def Clear(self):
+        pass
+
+    def End(self):
+        self.ended = True
+
+
+def _ocr(digits_only: bool = False):
+    img = np.zeros((20, 40, 3), dtype=np.uint8)
+    return ocr.image_to_text(img, digits_only=digits_only, fix_regexps=False, check_known_errors=False, correct_words=False)[0].text
+
+
+def test_handles_are_reused(monkeypatch):
+    FakeTessApi.created = []
+    monkeypatch.setattr(ocr, "PyTessBaseAPI", FakeTessApi)
+    monkeypatch.setattr(ocr, "_tess_pool", ocr._TessPool(max_idle=1))
+    assert _ocr() == "38"
+    assert _ocr() == "38"
+    assert len(FakeTessApi.created) == 1
+    # digits_only handles are separate, so the whitelist never leaks into other calls
+    _ocr(digits_only=True)
+    assert len(FakeTessApi.created) == 2
+    assert "tessedit_char_whitelist" not in FakeTessApi.created[0].variables
+    assert FakeTessApi.created[1].variables["tessedit_char_whitelist"] == "0123456789"
+
+
+def test_concurrent_use(monkeypatch):
+    FakeTessApi.created = []
+    monkeypatch.setattr(ocr, "PyTessBaseAPI", FakeTessApi)
+    monkeypatch.setattr(ocr, "_tess_pool", ocr._TessPool(max_idle=1))
+    key = ("model", 7, "", False)
+    acquired = threading.Barrier(2)
+    in_use = []
+    def worker():
+        with ocr._tess_pool.acquire(key) as api:
+            in_use.append(api)
+            acquired.wait()
+    threads = [threading.Thread(target=worker) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # each thread got its own handle, only one is kept idle afterwards
+    assert in_use[0] is not in_use[1]
+    assert sum(api.ended for api in FakeTessApi.created) == 1
+    ocr._tess_pool.warm_up([key])
+    assert len(FakeTessApi.created) == 2
+
+
+def test_parallel_keeps_order(monkeypatch):
+    monkeypatch.setattr(ocr, "PyTessBaseAPI", FakeTessApi)
+    monkeypatch.setattr(ocr, "_tess_pool", ocr._TessPool(max_idle=4))
+    # threads instead of processes, so the fake tesseract is used by the workers as well
+    monkeypatch.setattr(ocr, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(ocr, "_process_pool", None)
+    images = [np.zeros((20, 30 + i, 3), dtype=np.uint8) for i in range(7)]
+    kwargs = dict(psm=7, fix_regexps=False, check_known_errors=False, correct_words=False, use_cache=False)
+    serial = [r.text for r in ocr.image_to_text(images, **kwargs)]
+    parallel = [r.text for r in ocr.image_to_text(images, workers=3, **kwargs)]
+    assert parallel == serial and len(set(serial)) == len(images)
+    assert ocr._process_pool is not None
+    ocr.shutdown_workers()
+    assert ocr._process_pool is None
+
+
+def test_cache(monkeypatch):
+    FakeTessApi.created = []
+    monkeypatch.setattr(ocr, "PyTessBaseAPI", FakeTessApi)
+    monkeypatch.setattr(ocr, "_ocr_cache", ocr._OcrCache(size=2))
+    reads = []
+    monkeypatch.setattr(FakeTessApi, "GetUTF8Text", lambda self: reads.append(self.width) or str(self.width))
+    kwargs = dict(psm=7, fix_regexps=False, check_known_errors=False, correct_words=False)
+    label = np.zeros((20, 40, 3), dtype=np.uint8)
+    label[8:12, 10:30] = 200
+    noisy = label.copy()
+    # below the threshold, same crop after preprocessing
+    noisy[0:2, 0:40] = 10
+    assert ocr.image_to_text(label, **kwargs)[0].text == "38"
+    assert ocr.image_to_text(noisy, **kwargs)[0].text == "38"
+    assert len(reads) == 1
+    # different parameters are cached separately
+    ocr.image_to_text(label, **{**kwargs, "digits_only": True})
+    assert len(reads) == 2
+    stats = ocr.ocr_cache_stats(reset=True)
+    assert (stats.hits, stats.misses) == (1, 2) and ocr.ocr_cache_stats().hits == 0
+    # least recently used entry is evicted
+    ocr.image_to_text(np.zeros((20, 50, 3), dtype=np.uint8), **kwargs)
+    ocr.image_to_text(label, **kwargs)
+    assert len(reads) == 4
+    result = ocr.image_to_text(label, **kwargs)[0]
+    result.text = "changed"
+    assert ocr.image_to_text(label, **kwargs)[0].text == "38"
+    assert ocr.ocr_cache_stats().hit_rate == 0.5
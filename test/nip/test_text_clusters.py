@@ -0,0 +1,37 @@
+import cv2
+import numpy as np
+import pytest
+from d2r_image import processing_helpers
+from legacy_text_clusters import legacy_text_clusters
+
+# BGR text colors within the item color ranges of config/game.ini
+TEXT_COLORS = {
+    "white": (240, 240, 240),
+    "gray": (110, 110, 110),
+    "blue": (230, 125, 125),
+    "green": (32, 230, 32),
+    "yellow": (115, 230, 230),
+    "gold": (133, 184, 200),
+    "orange": (32, 170, 230),
+}
+def _ground_loot(seed: int) -> np.ndarray:
+    # item labels of random colors on dark boxes, some of them overlapping
+    rng = np.random.default_rng(seed)
+    img = np.zeros((720, 1280, 3), dtype=np.uint8)
+    for _ in range(40):
+        color = list(TEXT_COLORS)[rng.integers(len(TEXT_COLORS))]
+        x, y = int(rng.integers(0, 1100)), int(rng.integers(20, 700))
+        cv2.rectangle(img, (x, y - 16), (x + 170, y + 5), (10, 10, 10), -1)
+        cv2.putText(img, f"ITEM {color.upper()} {rng.integers(100)}", (x + 5, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, TEXT_COLORS[color], 1)
+    return (img + rng.integers(0, 8, img.shape, dtype=np.uint8)).clip(0, 255)
+
+@pytest.mark.parametrize("seed", range(4))
+def test_same_clusters_as_per_color_search(seed: int):
+    cleaned_img = processing_helpers.clean_img(_ground_loot(seed))
+    clusters = processing_helpers.segment_text_clusters(cleaned_img)
+    assert clusters == legacy_text_clusters(cleaned_img)
+    # the thin gray text of cv2.putText() does not survive the erosion of gray glyph borders
+    assert {color for color, _ in clusters} == set(TEXT_COLORS) - {"gray"}
+
+def test_no_clusters_on_black():
+    assert processing_helpers.segment_text_clusters(np.zeros((720, 1280, 3), dtype=np.uint8)) == []
@@ -1,5 +1,8 @@
+import random
 import pytest
 from d2r_image import ocr, processing_helpers, d2data_lookup
+from d2r_image.ocr_data import ERROR_RESOLUTION_MAP
+from legacy_text_correction import legacy_check_known_errors, legacy_fix_regexps
 
 
 @pytest.mark.parametrize("ocr_string, expected_string", [
@@ -21,4 +24,25 @@ def test_base_item_check(ocr_string, expected):
     quality, normalized_text = processing_helpers.get_normalized_normal_gray_item_text(ocr_string)
     base_item = f"{processing_helpers.fuzzy_base_item_match(normalized_text)}".strip()
     quality = quality.value if quality else None
-    assert (quality, base_item) == expected
\ No newline at end of file
+    assert (quality, base_item) == expected
+def _random_ocr_strings(count: int) -> list[str]:
+    rng = random.Random(0)
+    # the characters the normalizer cares about, plus some plain text
+    pieces = list("AIIIOS115%-+=a: \n\n") + [" ", " I ", " S ", " O ", "\nI ", " II", "TO", "DEFENSE"] + list(ERROR_RESOLUTION_MAP)
+    return ["".join(rng.choice(pieces) for _ in range(rng.randint(0, 12))) for _ in range(count)]
+
+TEXT_SAMPLES = [
+    "SIIPER MANA POTION", "S11PER MANA POTION", "+32I TO MANA ATTACK RATING", "W1RT'S LEG", " I TO 5 DEFENSE",
+    " 1 TO S DEFENSE", " O TO 5 DEFENSE", "DEFENSE: II", "DEFENSE: III", "AI1B", "I I I I", "\nI I\n", "x=a 1=b",
+    "JAR RUNE", "YO TWYO", "TWYO YO", "ARMGR CHARMER ARMER", "SUPERIOR QU AB", "QUAB :",
+]
+
+@pytest.mark.parametrize("text", TEXT_SAMPLES)
+def test_normalizer_equivalence(text):
+    assert ocr._fix_regexps(text) == legacy_fix_regexps(text)
+    assert ocr._check_known_errors(text) == legacy_check_known_errors(text)
+
+def test_normalizer_equivalence_random():
+    for text in _random_ocr_strings(5000):
+        assert ocr._fix_regexps(text) == legacy_fix_regexps(text), repr(text)
+        assert ocr._check_known_errors(text) == legacy_check_known_errors(text), repr(text)
@@ -0,0 +1,71 @@
+import cv2
+import numpy as np
+from d2r_image import ocr, processing_helpers
+
+
+class LineTessApi:
+    reads = 0
+    # text by line width
+    texts = {}
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def ReadConfigFile(self, path):
+        pass
+
+    def SetVariable(self, name, value):
+        pass
+
+    def SetImageBytes(self, data, width, height, *args):
+        self.size = (width, height)
+
+    def GetUTF8Text(self):
+        LineTessApi.reads += 1
+        return LineTessApi.texts[self.size[0]]
+
+    def AllWordConfidences(self):
+        return [90, 90]
+
+    def MeanTextConf(self):
+        return 90
+
+    def Clear(self):
+        pass
+
+    def End(self):
+        pass
+
+
+def _tooltip(lines: list[tuple[str, tuple]], width: int) -> np.ndarray:
+    img = np.full((22 * len(lines) + 10, width, 3), 5, dtype=np.uint8)
+    for i, (text, color) in enumerate(lines):
+        # centered like the game does it
+        text_w = cv2.getTextSize(text, cv2.FONT_HERSHEY_PLAIN, 1.2, 1)[0][0]
+        cv2.putText(img, text, ((width - text_w) // 2, 22 * i + 22), cv2.FONT_HERSHEY_PLAIN, 1.2, color, 1)
+    return img
+
+UNIDENTIFIED = [("GRAND CHARM", (255, 100, 100)), ("REQUIRED LEVEL: 50", (230, 230, 230)), ("UNIDENTIFIED", (40, 40, 220))]
+IDENTIFIED = [("GRAND CHARM", (255, 100, 100)), ("REQUIRED LEVEL: 50", (230, 230, 230)), ("+1 TO COMBAT SKILLS", (255, 100, 100)), ("SELL VALUE: 125", (230, 230, 230)), ("FOOTER", (230, 230, 230))]
+
+def test_split_lines():
+    lines = processing_helpers.split_tooltip_lines(_tooltip(UNIDENTIFIED, 300))
+    assert len(lines) == 3
+    assert all(line.shape[0] < 22 + 2 * processing_helpers.TOOLTIP_LINE_PADDING for line in lines)
+
+def test_read_only_new_lines(monkeypatch):
+    monkeypatch.setattr(ocr, "PyTessBaseAPI", LineTessApi)
+    monkeypatch.setattr(ocr, "_tess_pool", ocr._TessPool(max_idle=1))
+    monkeypatch.setattr(ocr, "_ocr_cache", ocr._OcrCache(size=64))
+    monkeypatch.setattr(ocr, "_ocr_result_dictionary_check", lambda text, confidences: text)
+    LineTessApi.reads = 0
+    for lines, width in [(UNIDENTIFIED, 300), (IDENTIFIED, 360)]:
+        for (text, _), line in zip(lines, processing_helpers.split_tooltip_lines(_tooltip(lines, width))):
+            LineTessApi.texts[line.shape[1]] = text
+    before = processing_helpers.read_tooltip(_tooltip(UNIDENTIFIED, 300))
+    assert LineTessApi.reads == 3 and len(before.text.splitlines()) == 3
+    # identified: wider box, one new property line. Lines below the sell value are not needed
+    after = processing_helpers.read_tooltip(_tooltip(IDENTIFIED, 360))
+    assert LineTessApi.reads == 5
+    assert before.text == "GRAND CHARM\nREQUIRED LEVEL: 50\nUNIDENTIFIED"
+    assert after.text == "GRAND CHARM\nREQUIRED LEVEL: 50\n+1 TO COMBAT SKILLS\nSELL VALUE: 125"
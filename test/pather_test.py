@@ -0,0 +1,26 @@
+import numpy as np
+import screen
+import template_finder
+from pather import Pather
+
+screen.set_window_position(0, 0)
+
+def test_find_abs_node_pos_follows_shifted_frame():
+    """
+    Test node positions after a small camera shift
+    - the same reference template is found again after the whole frame moved by a few pixels
+    - the node position moves by the same offset, no result of the previous frame is reused
+    - the scene is dark and low in contrast, so the 8px block means of the frame barely change with the shift
+    """
+    pather = Pather()
+    template = template_finder.get_template("A5_TOWN_0")
+    h, w = template.shape[:2]
+    frame = np.full((720, 1280, 3), 40, dtype=np.uint8)
+    frame[200:200 + h, 700:700 + w] = 40 + template * 0.05
+    pos = pather.find_abs_node_pos(2, frame)
+    assert pos is not None
+    for dx, dy in [(2, 2), (-4, 2)]:
+        shifted = np.roll(frame, (dy, dx), axis=(0, 1))
+        shifted_pos = pather.find_abs_node_pos(2, shifted)
+        assert shifted_pos is not None
+        assert np.allclose(shifted_pos, (pos[0] + dx, pos[1] + dy))
@@ -0,0 +1,89 @@
+import time
+import numpy as np
+import screen
+from utils.misc import cut_roi
+
+
+def _fake_capture():
+    count = {"n": 0}
+    def capture(region: dict = None):
+        count["n"] += 1
+        return np.full((4, 4, 4), count["n"] % 256, dtype=np.uint8)
+    return capture, count
+
+def test_frame_bus_shares_frames(monkeypatch):
+    capture, count = _fake_capture()
+    monkeypatch.setattr(screen, "_capture_img", capture)
+    monkeypatch.setattr(screen, "CAPTURE_INTERVAL", 0.2)
+    try:
+        frame = screen.latest_frame()
+        # consumers within the same capture interval get the very same image, no copy and no extra capture
+        assert screen.latest_frame(max_age=1.0).img is frame.img
+        nxt = screen.next_frame(frame.id)
+        assert nxt.id == frame.id + 1
+        assert nxt.img[0, 0, 0] != frame.img[0, 0, 0]
+        # force_new only returns frames captured after the call
+        t = time.perf_counter()
+        screen.grab(force_new=True)
+        assert screen.frame_stats().frame_id > nxt.id
+        assert screen.latest_frame().timestamp >= t
+        assert count["n"] >= screen.frame_stats().frame_id
+    finally:
+        screen.stop_capture()
+
+def test_frame_bus_counts_dropped_frames(monkeypatch):
+    capture, _ = _fake_capture()
+    monkeypatch.setattr(screen, "_capture_img", capture)
+    try:
+        frame = screen.latest_frame()
+        dropped = screen.frame_stats().dropped
+        time.sleep((screen.FRAME_BUFFER_SIZE + 3) * screen.CAPTURE_INTERVAL)
+        stats = screen.frame_stats()
+        assert stats.dropped > dropped
+        assert stats.age is not None and stats.age < screen.FRAME_MAX_AGE
+        # consumer fell behind, it gets the oldest frame still in the ring buffer
+        behind = screen.next_frame(frame.id)
+        assert frame.id + 1 < behind.id <= stats.frame_id
+    finally:
+        screen.stop_capture()
+
+def test_grab_roi_matches_full_frame(monkeypatch):
+    screen.set_window_position(0, 0)
+    full = np.random.default_rng(0).integers(0, 256, (720, 1280, 4), dtype=np.uint8)
+    regions = []
+    def capture(region: dict = None):
+        region = region or screen.monitor_roi
+        regions.append(region)
+        x, y = region["left"] - screen.monitor_roi["left"], region["top"] - screen.monitor_roi["top"]
+        return full[y:y+region["height"], x:x+region["width"]].copy()
+    monkeypatch.setattr(screen, "_capture_img", capture)
+    screen.stop_capture()
+    # let the last published frame go stale
+    time.sleep(screen.FRAME_MAX_AGE)
+    rois = [[309, 610, 7, 101], [1250, 700, 100, 100], [0, 0, 0, 5]]
+    imgs = screen.grab_rois(rois)
+    # without a fresh frame only the requested rectangles are captured
+    assert [(r["width"], r["height"]) for r in regions] == [(7, 101), (30, 20)]
+    for roi, img in zip(rois, imgs):
+        assert np.array_equal(img, cut_roi(full[:, :, :3], roi))
+    partial = screen.grab_partial(rois[:2])
+    assert partial.shape == (720, 1280, 3)
+    for roi in rois[:2]:
+        assert np.array_equal(cut_roi(partial, roi), cut_roi(full[:, :, :3], roi))
+    assert not partial[0:600, 0:300].any()
+
+def test_buffer_pool_reuses_only_free_buffers():
+    pool = screen._BufferPool(2)
+    a = pool.get((4, 4, 3))
+    view = a[1:2]
+    # a is referenced by a consumer, a second buffer is handed out
+    b = pool.get((4, 4, 3))
+    assert b is not a
+    del a, b
+    # the view still keeps the first buffer alive, only the second one is free
+    c = pool.get((4, 4, 3))
+    assert c.base is None and view.base is not c
+    del view
+    frame = screen.Frame(1, c, 0.0)
+    assert frame.gray.shape == (4, 4) and frame.gray.flags["C_CONTIGUOUS"]
+    assert pool.get((4, 4, 3)) is not frame.img
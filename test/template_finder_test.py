@@ -1,4 +1,5 @@
 import cv2
+import numpy as np
 import pytest
 import template_finder
 from utils.misc import is_in_roi
@@ -58,6 +59,98 @@ def test_search_all_multiple_templates():
     matches = template_finder.search_all([empty, slash], image, threshold=0.98)
     assert len(matches) == 4
 
+def test_multi_template_match_early_stop():
+    """
+    Test batched matching of several templates on one image
+    - without stop threshold every template gets a score, in the order of the input templates
+    - with stop threshold matching stops at cross, which is the first template above threshold
+    """
+    image = cv2.imread("test/assets/stash_slots.png")
+    slash = cv2.imread("test/assets/stash_slot_slash.png")
+    cross = cv2.imread("test/assets/stash_slot_cross.png")
+    templates = template_finder._process_template_refs([cross, slash])
+    matches = template_finder._multi_template_match(templates, image)
+    assert len(matches) == 2
+    assert matches[0].score < matches[1].score
+    matches = template_finder._multi_template_match(templates, image, stop_threshold=0.6)
+    assert len(matches) == 1
+
+def test_search_pyramid():
+    """
+    Test coarse-to-fine pyramid search
+    - searches for slash with exact and pyramid matching
+    - test passes if both find the same region with the same perfect score
+    """
+    image = cv2.imread("test/assets/stash_slots.png")
+    slash = cv2.imread("test/assets/stash_slot_slash.png")
+    exact = template_finder.search(slash, image, threshold=0.98)
+    pyramid = template_finder.search(slash, image, threshold=0.98, use_pyramid=True)
+    assert pyramid.valid
+    assert pyramid.region == exact.region
+
+def test_search_skip_unchanged():
+    """
+    Test reuse of search results on unchanged rois
+    - repeated search on an identical image is skipped, the result stays the same
+    - changing pixels inside the roi runs the search again, changes outside the roi don't
+    """
+    template = template_finder.get_template("GAMEBAR_ANCHOR")
+    image = np.full((720, 1280, 3), 40, dtype=np.uint8)
+    image[660:660 + template.shape[0], 610:610 + template.shape[1]] = template
+    roi = [600, 650, 90, 90]
+    template_finder.change_stats(reset=True)
+    first = template_finder.search("GAMEBAR_ANCHOR", image, roi=roi, skip_unchanged=True)
+    image[0:100, 0:100] = 255
+    second = template_finder.search("GAMEBAR_ANCHOR", image, roi=roi, skip_unchanged=True)
+    assert first.valid and second == first
+    assert template_finder.change_stats().skipped == 1
+    image[650:740, 600:690] = 0
+    assert not template_finder.search("GAMEBAR_ANCHOR", image, roi=roi, skip_unchanged=True).valid
+    stats = template_finder.change_stats(reset=True)
+    assert (stats.searches, stats.skipped, stats.saved_matches) == (3, 1, 1)
+
+def test_search_cache_per_frame(monkeypatch):
+    """
+    Test memoization of searches on captured frames
+    - the same search on the same frame is answered from the cache
+    - a copy of the frame is no frame of the capture and is searched again
+    """
+    template = template_finder.get_template("GAMEBAR_ANCHOR")
+    image = np.full((720, 1280, 4), 40, dtype=np.uint8)
+    image[660:660 + template.shape[0], 610:610 + template.shape[1], :3] = template
+    monkeypatch.setattr(screen, "_capture_img", lambda region=None: image)
+    try:
+        # captured after patching, unlike a frame that might still be in the ring buffer
+        img = screen.grab(force_new=True)
+        template_finder.search_cache_stats(reset=True)
+        first = template_finder.search("GAMEBAR_ANCHOR", img, roi=[600, 650, 90, 90])
+        second = template_finder.search("GAMEBAR_ANCHOR", img, roi=[600, 650, 90, 90])
+        template_finder.search("GAMEBAR_ANCHOR", img.copy(), roi=[600, 650, 90, 90])
+        template_finder.search("GAMEBAR_ANCHOR", img, roi=[600, 650, 90, 90], threshold=0.9)
+    finally:
+        screen.stop_capture()
+    assert first.valid and second == first
+    stats = template_finder.search_cache_stats(reset=True)
+    assert (stats.hits, stats.misses) == (1, 2)
+
+def test_search_and_wait_follows_shifted_frame(monkeypatch):
+    """
+    Test search_and_wait after a small camera shift
+    - the scene is dark and low in contrast, so the 8px block means of the roi barely change with the shift
+    - by default the second wait searches again and returns the new position instead of the previous result
+    """
+    template = template_finder.get_template("A5_TOWN_0")
+    h, w = template.shape[:2]
+    frame = np.full((720, 1280, 3), 40, dtype=np.uint8)
+    frame[200:200 + h, 700:700 + w] = 40 + template * 0.05
+    shifted = np.roll(frame, (2, 2), axis=(0, 1))
+    frames = iter([frame, shifted])
+    monkeypatch.setattr(template_finder, "grab", lambda: next(frames))
+    first = template_finder.search_and_wait("A5_TOWN_0", timeout=1)
+    second = template_finder.search_and_wait("A5_TOWN_0", timeout=1)
+    assert first.valid and second.valid
+    assert second.center == (first.center[0] + 2, first.center[1] + 2)
+
 if __name__ == "__main__":
     image = cv2.imread("test/assets/stash_slots.png")
     empty = cv2.imread("test/assets/stash_slot_empty.png")
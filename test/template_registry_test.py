@@ -0,0 +1,86 @@
+import threading
+import cv2
+import numpy as np
+import pytest
+from logger import Logger
+import template_finder
+from template_finder import TemplateRegistry
+from utils import template_cache
+
+SIZE = 10
+BGRA_BYTES = SIZE * SIZE * 4
+
+@pytest.fixture
+def paths(tmp_path) -> list[str]:
+    Logger.init()
+    Logger.remove_file_logger()
+    paths = []
+    for i, name in enumerate(["a", "b", "c"]):
+        img = np.full((SIZE, SIZE, 4), 255, dtype=np.uint8)
+        img[:, :, :3] = i * 50
+        path = str(tmp_path / f"{name}.png")
+        cv2.imwrite(path, img)
+        paths.append(path)
+    return paths
+
+def registry_without_bundle(paths: list[str], tmp_path, memory_cap_mb: float = 0) -> TemplateRegistry:
+    # the cache dir is a file, so the bundle can not be built and all variants are decoded from png
+    blocked = tmp_path / "blocked"
+    blocked.write_text("")
+    registry = TemplateRegistry(paths, memory_cap_mb, cache_dir=str(blocked))
+    registry.rebuild_thread.join()
+    return registry
+
+def test_hit_miss_stats(paths, tmp_path):
+    registry = registry_without_bundle(paths, tmp_path)
+    registry["A"].img_bgr
+    registry["A"].img_gray
+    registry["B"].img_bgr
+    stats = registry.stats(reset=True)
+    assert (stats["A"].hits, stats["A"].misses) == (1, 1)
+    assert (stats["B"].hits, stats["B"].misses) == (0, 1)
+    assert "C" not in stats
+    assert registry.stats() == {}
+
+def test_memory_cap_evicts_least_recently_used(paths, tmp_path):
+    # room for the bgra variant of two templates
+    registry = registry_without_bundle(paths, tmp_path, memory_cap_mb=2.5 * BGRA_BYTES / 1e6)
+    a = registry["A"].img_bgra
+    registry["B"].img_bgra
+    assert registry.memory_used() == 2 * BGRA_BYTES
+    registry["A"]
+    registry["C"].img_bgra
+    # B was used least recently
+    assert registry.memory_used() == 2 * BGRA_BYTES
+    # checked through the internal dict, looking up a key counts as a use
+    templates = registry._templates
+    assert "img_bgra" not in templates["B"].__dict__
+    assert "img_bgra" in templates["A"].__dict__
+    # evicted templates are loaded again on access, which evicts A now
+    assert np.array_equal(registry["B"].img_bgra, cv2.imread(paths[1], cv2.IMREAD_UNCHANGED))
+    assert "img_bgra" not in templates["A"].__dict__
+    assert np.array_equal(registry["A"].img_bgra, a)
+
+def test_newly_loaded_template_is_kept_above_cap(paths, tmp_path):
+    registry = registry_without_bundle(paths, tmp_path, memory_cap_mb=BGRA_BYTES / 2e6)
+    assert registry["A"].img_bgra is not None
+    assert registry.memory_used() == BGRA_BYTES
+
+def test_bundle_views_are_not_counted(paths, tmp_path):
+    registry = TemplateRegistry(paths, memory_cap_mb=1, cache_dir=str(tmp_path / "cache"))
+    registry.rebuild_thread.join()
+    assert not registry.rebuild_thread.is_alive() and registry.rebuild_thread.daemon
+    img = registry["A"].img_bgr
+    assert np.array_equal(img, cv2.cvtColor(cv2.imread(paths[0], cv2.IMREAD_UNCHANGED), cv2.COLOR_BGRA2BGR))
+    assert registry.memory_used() == 0
+    # a second registry maps the bundle that was just built
+    assert TemplateRegistry(paths, cache_dir=str(tmp_path / "cache")).rebuild_thread is None
+
+def test_stopped_rebuild_writes_no_bundle(paths, tmp_path):
+    registry = TemplateRegistry(paths, cache_dir=str(tmp_path / "cache"))
+    registry.stop_rebuild()
+    assert not registry.rebuild_thread.is_alive()
+    stopped = threading.Event()
+    stopped.set()
+    assert not template_finder.build_template_cache(paths, str(tmp_path / "stopped"), stopped)
+    assert template_cache.load(template_cache.asset_signature(paths), str(tmp_path / "stopped")) is None
@@ -0,0 +1,49 @@
+import cv2
+import numpy as np
+import pytest
+from config import Config
+from utils.misc import color_bits, color_filter, color_filter_multi, share_hsv, to_hsv
+
+@pytest.fixture
+def img() -> np.ndarray:
+    return np.random.default_rng(0).integers(0, 256, (90, 160, 3), dtype=np.uint8)
+
+def test_multi_equals_single_filters(img: np.ndarray):
+    color_ranges = list(Config().colors.values())
+    masks = color_filter_multi(img, color_ranges)
+    assert masks.shape == (len(color_ranges),) + img.shape[:2]
+    for color_range, mask in zip(color_ranges, masks):
+        assert np.array_equal(mask, color_filter(img, color_range)[0])
+
+def test_color_bits(img: np.ndarray):
+    color_ranges = list(Config().colors.values())
+    bits = color_bits(img, color_ranges)
+    assert bits.dtype == np.uint32
+    for i, color_range in enumerate(color_ranges):
+        assert np.array_equal((bits >> i) & 1 == 1, color_filter(img, color_range)[0] > 0)
+    assert color_bits(img, color_ranges[:3]).dtype == np.uint8
+
+def test_hue_wraparound():
+    hsv = np.stack([np.arange(180), np.full(180, 200), np.full(180, 200)], axis=1)[None].astype(np.uint8)
+    img = cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)
+    hues = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)[0, :, 0]
+    red, health_potion = color_filter_multi(img, [Config().colors["red"], Config().colors["health_potion"]])
+    assert np.array_equal(red[0] > 0, (hues <= 12) | (hues >= 171))
+    assert np.array_equal(health_potion[0] > 0, (hues <= 10) | (hues >= 170))
+
+def test_shared_hsv_is_reused_for_crops(img: np.ndarray):
+    share_hsv(img)
+    whole = to_hsv(img)
+    assert to_hsv(img) is whole
+    crop = img[10:40, 20:70]
+    assert np.shares_memory(to_hsv(crop), whole)
+    assert np.array_equal(to_hsv(crop), cv2.cvtColor(np.ascontiguousarray(crop), cv2.COLOR_BGR2HSV))
+    # registering the array again, e.g. for a reused frame buffer, drops the old conversion
+    img[:] = 0
+    share_hsv(img)
+    assert not to_hsv(img).any()
+
+def test_unshared_crops_convert_only_themselves(img: np.ndarray):
+    crop = img[10:40, 20:70]
+    assert to_hsv(crop).shape == crop.shape
+    assert not np.shares_memory(to_hsv(img), to_hsv(img))
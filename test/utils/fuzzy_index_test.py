@@ -0,0 +1,40 @@
+import random
+import pytest
+from d2r_image.strings_store import all_words
+from utils.fuzzy_index import FuzzyIndex
+from utils.misc import find_best_match
+
+def _typos(words: list[str], count: int) -> list[str]:
+    rng = random.Random(0)
+    typos = []
+    for word in rng.sample(words, count):
+        for _ in range(rng.randint(1, 4)):
+            i = rng.randrange(len(word) + 1)
+            match rng.randrange(3):
+                case 0: word = word[:i] + rng.choice("1I0OS5") + word[i+1:]
+                case 1: word = word[:i] + word[i+1:]
+                case 2: word = word[:i] + rng.choice("ABCDE ") + word[i:]
+        typos.append(word)
+    return typos
+
+@pytest.fixture(scope="module")
+def index() -> FuzzyIndex:
+    return FuzzyIndex(all_words())
+
+def test_same_distance_as_full_scan(index: FuzzyIndex):
+    words = sorted(all_words())
+    for word in _typos(words, 300) + ["", "X", "LONGSWORD OF THE LEECH"]:
+        expected = find_best_match(word, words)
+        result = index.best_match(word)
+        assert result.score == expected.score, word
+        assert result.score_normalized == expected.score_normalized
+        assert result.match in index
+
+def test_score_cutoff(index: FuzzyIndex):
+    words = sorted(all_words())
+    assert index.best_match("SWORD").match == "SWORD"
+    for word in ["SW0RDZ", "XXSWORDXXX", "XXXXXXXXXX"]:
+        expected = find_best_match(word, words).score
+        for cutoff in range(6):
+            result = index.best_match(word, score_cutoff=cutoff)
+            assert (result.score if result else None) == (expected if expected <= cutoff else None), (word, cutoff)
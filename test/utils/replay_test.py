@@ -0,0 +1,45 @@
+import keyboard
+import numpy as np
+import pytest
+import screen
+from logger import Logger
+from utils import replay
+
+class TestReplay:
+    def setup_method(self):
+        Logger.init()
+        Logger.remove_file_logger()
+
+    def test_record_and_play(self, tmp_path, monkeypatch):
+        count = {"n": 0}
+        def capture(region=None):
+            count["n"] += 1
+            return np.full((720, 1280, 4), count["n"], dtype=np.uint8)
+        monkeypatch.setattr(screen, "_capture_img", capture)
+        sent = []
+        monkeypatch.setattr(keyboard, "send", lambda key: sent.append(key))
+        screen.set_window_position(0, 0)
+        path = str(tmp_path / "replay.zip")
+        with replay.ReplayRecorder(path):
+            recorded = [screen.grab(force_new=True) for _ in range(3)]
+            recorded.append(screen.grab_roi([0, 0, 10, 10]))
+            keyboard.send("esc")
+            replay.record_decision("test", value=int(recorded[0][0, 0, 0]))
+        screen.stop_capture()
+        assert sent == ["esc"]
+
+        with replay.ReplayPlayer(path) as player:
+            assert player.frames_left == 4
+            played = [screen.grab() for _ in range(3)]
+            played.append(screen.grab_roi([0, 0, 10, 10]))
+            keyboard.send("esc")
+            replay.record_decision("test", value=int(played[0][0, 0, 0]))
+            with pytest.raises(replay.ReplayFinished):
+                screen.grab()
+        # input is stubbed during playback
+        assert sent == ["esc"]
+        for a, b in zip(recorded, played):
+            assert np.array_equal(a, b)
+        assert [(a["device"], a["name"], a["args"]) for a in player.recorded_actions] == [("keyboard", "send", ["esc"])]
+        assert [(a["device"], a["name"], a["args"]) for a in player.actions] == [("keyboard", "send", ["esc"])]
+        assert player.decisions == [{"kind": "test", "value": player.recorded_decisions[0]["value"]}]
@@ -0,0 +1,46 @@
+import numpy as np
+from logger import Logger
+from utils import template_cache
+
+class TestTemplateCache:
+    def setup_method(self):
+        Logger.init()
+        Logger.remove_file_logger()
+        self.templates = {
+            "A": {"img_bgr": np.random.randint(0, 255, (4, 5, 3), dtype=np.uint8), "alpha_mask": None},
+            "B": {"img_bgr": np.random.randint(0, 255, (7, 3, 3), dtype=np.uint8), "alpha_mask": np.full((7, 3), 255, dtype=np.uint8)},
+        }
+
+    def test_roundtrip(self, tmp_path):
+        assert template_cache.save(self.templates, "sig", cache_dir=str(tmp_path))
+        loaded = template_cache.load("sig", cache_dir=str(tmp_path))
+        assert loaded.keys() == self.templates.keys()
+        assert loaded["A"]["alpha_mask"] is None
+        for key, variants in self.templates.items():
+            for variant, img in variants.items():
+                if img is not None:
+                    assert np.array_equal(loaded[key][variant], img)
+
+    def test_signature_mismatch(self, tmp_path):
+        template_cache.save(self.templates, "sig", cache_dir=str(tmp_path))
+        assert template_cache.load("other_sig", cache_dir=str(tmp_path)) is None
+        assert template_cache.load("sig", cache_dir=str(tmp_path / "missing")) is None
+
+    def test_dtypes_are_kept(self, tmp_path):
+        templates = {
+            "C": {
+                "img_bgr": np.random.randint(0, 65535, (3, 5, 3)).astype(np.uint16),
+                "alpha_mask": np.random.rand(3, 5).astype(np.float32),
+                "gray": np.random.randint(0, 255, (3, 5), dtype=np.uint8),
+            },
+        }
+        assert template_cache.save(templates, "sig", cache_dir=str(tmp_path))
+        loaded = template_cache.load("sig", cache_dir=str(tmp_path))
+        for variant, img in templates["C"].items():
+            assert loaded["C"][variant].dtype == img.dtype
+            assert np.array_equal(loaded["C"][variant], img)
+
+    def test_unsupported_dtype(self, tmp_path):
+        templates = {"D": {"img_bgr": np.array([["a"]], dtype=object)}}
+        assert not template_cache.save(templates, "sig", cache_dir=str(tmp_path))
+        assert template_cache.load("sig", cache_dir=str(tmp_path)) is None